@@ -0,0 +1,141 @@
+
+# Description: Plays many recorded command scripts through the game without a terminal.
+# The scripts are spread across a pool of worker processes so that one interpreter
+# start-up is shared by many sessions, and the outcome of every script is reported
+# along with how many scripts and commands were played per second.
+#
+# A script is either a text file holding one command per line (every file in a
+# directory is one script), or one line of a JSONL file such as
+# {"name": "murderer_escape", "commands": ["2", "Bob", "s", "e", "f"]}
+#
+# Usage: python Batch_Runner.py scripts/ [--workers 4] [--chunk-size 16] [--json]
+
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from Story_Mode import Game
+
+
+# Reads the scripts found at path, which can be a directory of text files or a JSONL file.
+# Returns a list of (name, commands) pairs
+def load_scripts(path):
+    scripts = []
+
+    if os.path.isdir(path):
+        for file_name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, file_name)
+            if not os.path.isfile(file_path):
+                continue
+            with open(file_path, encoding="utf-8") as script_file:
+                commands = script_file.read().splitlines()
+            scripts.append((file_name, commands))
+
+    else:
+        with open(path, encoding="utf-8") as script_file:
+            for line_number, line in enumerate(script_file, start=1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if isinstance(entry, list):
+                    entry = {"commands": entry}
+                name = entry.get("name", f"{os.path.basename(path)}:{line_number}")
+                commands = entry.get("commands")
+                if not isinstance(commands, list):
+                    raise ValueError(f"{path}:{line_number} has no list of commands")
+                scripts.append((name, [str(command) for command in commands]))
+
+    return scripts
+
+
+# Plays one script through a headless game and returns what happened
+def play_script(script):
+    name, commands = script
+    game = Game(commands, None)
+    error = None
+
+    try:
+        game.run()
+
+    # A bad script should only fail itself, not the rest of the batch
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+
+    outcomes = game.get_outcomes()
+    return {
+        "name": name,
+        "commands": len(commands),
+        "outcome": outcomes[-1] if outcomes else ("error" if error else "unfinished"),
+        "outcomes": outcomes,
+        "error": error,
+    }
+
+
+# Plays every script across a pool of worker processes.
+# Scripts are handed out in chunks so each worker gets a batch of them per round trip
+def run_batch(scripts, workers=None, chunk_size=None):
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Around four chunks per worker keeps every core busy without much overhead
+        chunk_size = max(1, len(scripts) // (workers * 4))
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [play_script(script) for script in scripts]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(play_script, scripts, chunksize=chunk_size))
+    elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+# Builds the summary of a batch, counting the outcomes and working out the throughput
+def summarise(results, elapsed, workers):
+    commands = sum(result["commands"] for result in results)
+    return {
+        "scripts": len(results),
+        "workers": workers,
+        "seconds": elapsed,
+        "scripts_per_second": len(results) / elapsed if elapsed else 0.0,
+        "commands_per_second": commands / elapsed if elapsed else 0.0,
+        "outcomes": dict(Counter(result["outcome"] for result in results)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play recorded command scripts in parallel.")
+    parser.add_argument("path", help="directory of script files or a JSONL file of scripts")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="scripts handed to a worker at a time")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    scripts = load_scripts(args.path)
+    workers = args.workers or os.cpu_count() or 1
+    results, elapsed = run_batch(scripts, workers, args.chunk_size)
+    summary = summarise(results, elapsed, workers)
+
+    if args.json:
+        print(json.dumps({"results": results, "summary": summary}, indent=2))
+        return
+
+    for result in results:
+        line = f"{result['name']}: {result['outcome']}"
+        if result["error"]:
+            line += f" ({result['error']})"
+        print(line)
+
+    print(f"\n{summary['scripts']} scripts on {workers} workers in {elapsed:.3f}s "
+          f"({summary['scripts_per_second']:.0f} scripts/s, "
+          f"{summary['commands_per_second']:.0f} commands/s)")
+    for outcome, count in sorted(summary["outcomes"].items()):
+        print(f"- {outcome}: {count}")
+
+
+if __name__ == "__main__":
+    main()
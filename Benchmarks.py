@@ -0,0 +1,347 @@
+
+# Description: Measures how fast the game runs so changes that slow it down are noticed.
+# It times creating a Game, setting up a new game, each action handler on canned input,
+# whole Detective and Murderer playthroughs, and measures the memory used per live session.
+# Results are written as JSON, and can be compared with an earlier run to flag regressions.
+# Quick runs are noisy, compare full runs taken on the same machine.
+#
+# With --sizes the same is measured on generated worlds of each size, to see how loading,
+# step latency and memory grow with the number of rooms. With --startup it also measures
+# the time from starting a new process to the first prompt, run directly and through a
+# Quick_Start.py zygote.
+#
+# Usage: python Benchmarks.py [--quick] [--output results.json] [--compare baseline.json]
+#                             [--sizes 6,1000,10000] [--startup]
+
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+from Story_Mode import FLAG_RUNNING, STEPS, Game, shared_content
+from World_Generator import detective_route, generate_world, murderer_route
+from World_Loader import world_from_data
+
+
+# Answers that play each storyline to a win
+DETECTIVE_WIN = ["1", "Bench", "s", "m", "2", "e", "m", "3", "e", "i", "m", "1", "i", "1", "i", "2",
+                 "m", "4", "e", "m", "6", "e", "e", "yes", "2204", "r", "a", "1", "no"]
+MURDERER_WIN = ["2", "Bench", "s", "e", "f", "e", "f", "e", "u", "2", "f", "no", "u", "3", "f", "e",
+                "u", "4", "no"]
+
+# Canned handler calls: (name, answers that set the game up, handler to run, answers it is given)
+HANDLER_CASES = [
+    ("examine_room", ["1", "Bench", "s", "m", "3"], "examine_room", []),
+    ("examine_room_safe", ["1", "Bench", "s", "m", "6", "e"], "examine_room", ["yes", "2204"]),
+    ("move_to_room", ["1", "Bench", "s"], "move_to_room", ["3"]),
+    ("interact_with_characters", ["1", "Bench", "s"], "interact_with_characters", ["1"]),
+    ("review_clues", DETECTIVE_WIN[:25], "review_clues", []),
+    ("arrest", DETECTIVE_WIN[:25], "arrest", ["1", "no"]),
+    ("use_tool", ["2", "Bench", "s", "e", "f", "e", "f"], "use_tool", ["2"]),
+    ("move_forward", ["2", "Bench", "s", "e"], "move_forward", []),
+    ("move_back", ["2", "Bench", "s", "e", "f"], "move_back", []),
+    ("main_menu", ["1", "Bench", "s", "q"], "main_menu", ["c"]),
+]
+
+
+# Feeds queued answers to a game
+class _Answers:
+
+    def __init__(self, answers=()):
+        self.queue = deque(answers)
+
+    def __call__(self, prompt=""):
+        if self.queue:
+            return self.queue.popleft()
+        raise EOFError(prompt)
+
+
+# Runs fn `iterations` times, calling setup before each run outside the timing.
+# Returns the timing summary in microseconds
+def measure(fn, iterations, setup=None):
+    timings = []
+    clock = time.perf_counter_ns
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = clock()
+        fn()
+        timings.append(clock() - start)
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": statistics.fmean(timings) / 1000,
+        "median_us": timings[len(timings) // 2] / 1000,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000,
+    }
+
+
+# Plays answers until the game stops or they run out
+def play(answers):
+    game = Game(answers, None)
+    game.run()
+    return game
+
+
+# Returns a snapshot of the game after `answers`, set to run `handler` next
+def _prepared_snapshot(answers, handler):
+    snapshot = play(answers).snapshot()
+    return snapshot._replace(step=STEPS.index(handler), flags=snapshot.flags | FLAG_RUNNING)
+
+
+def bench_construction(iterations):
+    return measure(lambda: Game((), None), iterations)
+
+
+def bench_new_game(iterations):
+    answers = _Answers()
+    game = Game(answers, None)
+
+    def setup():
+        answers.queue.extend(("1", "Bench"))
+
+    return measure(game.new_game, iterations, setup)
+
+
+def bench_handlers(iterations):
+    results = {}
+    answers = _Answers()
+    game = Game(answers, None)
+
+    for name, setup_answers, handler, handler_answers in HANDLER_CASES:
+        snapshot = _prepared_snapshot(setup_answers, handler)
+
+        def setup():
+            game.restore(snapshot)
+            answers.queue.clear()
+            answers.queue.extend(handler_answers)
+
+        results[name] = measure(game.step, iterations, setup)
+    return results
+
+
+def bench_playthroughs(iterations):
+    return {
+        "detective_win": measure(lambda: play(DETECTIVE_WIN), iterations),
+        "murderer_win": measure(lambda: play(MURDERER_WIN), iterations),
+    }
+
+
+# Measures the memory held by live sessions part way through a game
+def bench_memory(sessions):
+    play(())  # Load the world before measuring
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games = [play(DETECTIVE_WIN[:12] if i % 2 else MURDERER_WIN[:10]) for i in range(sessions)]
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    held = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    result = {
+        "sessions": len(games),
+        "bytes_per_session": held / len(games),
+        "tracemalloc_peak_bytes": peak,
+    }
+
+    try:
+        import resource
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        result["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    except ImportError:
+        pass
+
+    return result
+
+
+# Times every step of a playthrough of world with the given answers
+def _step_timings(world, answers):
+    game = Game(answers, None, world=world)
+    timings = []
+    clock = time.perf_counter_ns
+    running = True
+    while running:
+        start = clock()
+        running = game.step()
+        timings.append(clock() - start)
+    timings.sort()
+    return {
+        "steps": len(timings),
+        "median_us": timings[len(timings) // 2] / 1000,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000,
+    }
+
+
+# Measures loading, step latency and memory per session on generated worlds of each size
+def bench_world_sizes(sizes, sessions):
+    results = {}
+    for rooms in sizes:
+        data = generate_world(rooms, seed=rooms)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        world = world_from_data(data)
+        shared_content(world)
+        load_ms = (time.perf_counter() - start) * 1000
+        shared_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        detective = detective_route(world)
+        murderer = murderer_route(world)
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        games = []
+        for i in range(sessions):
+            answers = detective if i % 2 else murderer
+            game = Game(answers[:len(answers) // 2], None, world=world)
+            game.run()
+            games.append(game)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        held = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        results[str(rooms)] = {
+            "load_ms": load_ms,
+            "shared_bytes": shared_bytes,
+            "bytes_per_session": held / len(games),
+            "detective_steps": _step_timings(world, detective),
+            "murderer_steps": _step_timings(world, murderer),
+        }
+    return results
+
+
+# Text of the first prompt a new game shows
+FIRST_PROMPT = b"Press '1' to choose Detective"
+
+# Folder the game's scripts are in
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Starts command and returns the milliseconds until it shows the first prompt
+def _time_to_first_prompt(command):
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=HERE)
+    shown = b""
+    while FIRST_PROMPT not in shown:
+        chunk = os.read(process.stdout.fileno(), 4096)
+        if not chunk:
+            raise RuntimeError(f"{command} ended before showing the first prompt")
+        shown += chunk
+    elapsed = (time.perf_counter() - start) * 1000
+
+    # No answers, so the game ends at once
+    process.stdin.close()
+    process.stdout.read()
+    process.wait()
+    return elapsed
+
+
+# Returns the timing summary of `runs` measurements in milliseconds
+def _summary(timings):
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "median_ms": timings[len(timings) // 2],
+        "min_ms": timings[0],
+        "p90_ms": timings[min(len(timings) - 1, int(len(timings) * 0.9))],
+    }
+
+
+# Measures the time to the first prompt of a new process, playing directly and through a zygote
+def bench_startup(runs):
+    python = sys.executable
+    results = {
+        "story_mode": _summary([_time_to_first_prompt([python, "Story_Mode.py"]) for _ in range(runs)]),
+        "quick_start": _summary([_time_to_first_prompt([python, "Quick_Start.py"]) for _ in range(runs)]),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "zygote.sock")
+        zygote = subprocess.Popen([python, "Quick_Start.py", "--zygote", path], cwd=HERE,
+                                  stdin=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            zygote.stderr.readline()  # Ready
+            results["zygote_connect"] = _summary(
+                [_time_to_first_prompt([python, "Quick_Start.py", "--connect", path]) for _ in range(runs)])
+        finally:
+            zygote.terminate()
+            zygote.wait()
+    return results
+
+
+# Runs every benchmark and returns the results
+def run_all(quick=False):
+    iterations = 500 if quick else 5000
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timings": {
+            "game_construction": bench_construction(iterations),
+            "new_game": bench_new_game(iterations),
+            **{f"handler.{name}": result for name, result in bench_handlers(iterations).items()},
+            **{f"playthrough.{name}": result for name, result in bench_playthroughs(iterations // 10).items()},
+        },
+        "memory": bench_memory(200 if quick else 2000),
+    }
+
+
+# Lists the timings that got slower than the baseline by more than `tolerance` (0.2 = 20%)
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, timing in results["timings"].items():
+        old = baseline.get("timings", {}).get(name)
+        if old and timing["median_us"] > old["median_us"] * (1 + tolerance):
+            regressions.append(f"{name}: {old['median_us']:.2f}us -> {timing['median_us']:.2f}us")
+
+    old_memory = baseline.get("memory", {}).get("bytes_per_session")
+    new_memory = results["memory"]["bytes_per_session"]
+    if old_memory and new_memory > old_memory * (1 + tolerance):
+        regressions.append(f"bytes_per_session: {old_memory:.0f} -> {new_memory:.0f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game engine.")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for a fast check")
+    parser.add_argument("--output", help="write the JSON results to this file instead of printing them")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slow-down allowed before flagging (0.2 = 20%%)")
+    parser.add_argument("--sizes", help="comma separated room counts of generated worlds to measure as well")
+    parser.add_argument("--startup", action="store_true", help="measure the time to the first prompt as well")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.quick)
+    if args.sizes:
+        sizes = [int(size) for size in args.sizes.split(",")]
+        results["world_sizes"] = bench_world_sizes(sizes, 20 if args.quick else 200)
+    if args.startup:
+        results["startup"] = bench_startup(10 if args.quick else 50)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
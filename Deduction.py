@@ -0,0 +1,90 @@
+
+# Description: A small forward-chaining rule engine for the Detective's deductions. The
+# rules of a case come from the world file, each one reading "when these facts are known,
+# conclude that one". Facts are short strings such as "clue 2" (clue 2 has been found),
+# "talked boyfriend" or "arrest boyfriend", and conclusions can be the premises of other rules.
+#
+# A RuleSet is built once per world and shared. Every game keeps a Deduction with the facts
+# it knows. Adding a fact only looks at the rules waiting on it, so each new clue costs the
+# same however many clues, suspects and rules the case has.
+#
+# A rule can also fire once `need` of its premises are known instead of all of them, and a
+# premise "kind *" stands for any fact of that kind, e.g. {"when": ["clue *"], "need": 4}
+# fires once any four clues have been found.
+
+
+from collections import namedtuple
+
+
+# One rule: the facts it waits on, how many of them must be known and the fact it concludes
+Rule = namedtuple("Rule", "when need then")
+
+
+# Returns the premise that stands for every fact of the same kind as fact
+def any_of_kind(fact):
+    return fact.split(" ", 1)[0] + " *"
+
+
+# The compiled rules of a case, shared by every game played in it
+class RuleSet:
+
+    # Constructor taking Rules, or (when, need, then) tuples as stored in a world
+    def __init__(self, rules):
+        self.rules = tuple(Rule(tuple(when), need, then) for when, need, then in rules)
+
+        # Premise to the numbers of the rules waiting on it
+        watchers = {}
+        for number, rule in enumerate(self.rules):
+            for premise in set(rule.when):
+                watchers.setdefault(premise, []).append(number)
+        self.watchers = {premise: tuple(numbers) for premise, numbers in watchers.items()}
+
+        # Rules that hold before anything is known
+        self.axioms = tuple(rule.then for rule in self.rules if rule.need == 0)
+
+
+# The facts one game knows, and what the rules have concluded from them
+class Deduction:
+    __slots__ = ("_rule_set", "_facts", "_waiting")
+
+    # Constructor starting from the rules that need nothing, then the given facts
+    def __init__(self, rule_set, facts=()):
+        self._rule_set = rule_set
+        self._facts = set()
+        self._waiting = {}  # Rule number to premises still missing, for rules started on
+        for fact in rule_set.axioms:
+            self.add(fact)
+        for fact in facts:
+            self.add(fact)
+
+    # Method to learn a fact and everything that follows from it.
+    # Returns False if the fact was already known
+    def add(self, fact):
+        if fact in self._facts:
+            return False
+
+        rule_set = self._rule_set
+        waiting = self._waiting
+        pending = [fact]
+        while pending:
+            fact = pending.pop()
+            if fact in self._facts:
+                continue
+            self._facts.add(fact)
+
+            for premise in (fact, any_of_kind(fact)):
+                for number in rule_set.watchers.get(premise, ()):
+                    missing = waiting.get(number)
+                    if missing is None:
+                        missing = rule_set.rules[number].need
+                    missing -= 1
+                    waiting[number] = missing
+                    if missing == 0:
+                        pending.append(rule_set.rules[number].then)
+        return True
+
+    def __contains__(self, fact):
+        return fact in self._facts
+
+    def __len__(self):
+        return len(self._facts)
@@ -0,0 +1,158 @@
+
+# Description: Dialogue trees for the characters. A character with a "tree" field in the world
+# file talks from the dialogue tree with that id instead of saying one fixed line. A tree is a
+# set of nodes keyed by id. Each node has lines, of which the character says the first whose
+# condition holds, and can offer the player choices that lead on to other nodes.
+#
+# Conditions are facts the Detective knows (see Deduction.py), e.g. a line with
+# "if": "clue 2" is only said once clue 2 has been found, and one with "unless": "clue 2"
+# only before. The last line of every node has no condition so there is always something to say.
+#
+# Trees are read from a JSON lines file next to the world, one tree per line starting with
+# its id, or from the world's own "dialogues" object for worlds made in memory. A tree is
+# only read and checked the first time somebody talks from it, and the most recently used
+# trees are kept for every game in the world, so large casts cost nothing until talked to.
+#
+#   {"id": "boyfriend", "start": "hello", "nodes": {"hello": {"lines": [{"text": "Hi"}],
+#    "choices": [{"text": "Ask about Valerie", "goto": "valerie"}]}, "valerie": {...}}}
+
+
+from collections import namedtuple
+from functools import lru_cache
+
+
+# Trees kept in memory per world
+DIALOGUE_CACHE_SIZE = 256
+
+# The id at the start of every line of a dialogue file
+TREE_ID = rb'\s*\{\s*"id"\s*:\s*"((?:[^"\\]|\\.)*)"'
+
+
+# Something a character can say, when the fact `when` is known and `unless` is not
+# (either can be None)
+Line = namedtuple("Line", "text when unless")
+
+# Something the player can say, leading to the node goto
+Choice = namedtuple("Choice", "text goto when unless")
+
+# One point in a conversation
+Node = namedtuple("Node", "lines choices")
+
+# A checked tree, nodes maps a node id to its Node
+DialogueTree = namedtuple("DialogueTree", "key start nodes")
+
+
+# Returns whether a line or choice can be used by someone knowing the facts in known
+def holds(entry, known):
+    return ((entry.when is None or entry.when in known)
+            and (entry.unless is None or entry.unless not in known))
+
+
+# Returns the line a character says at node, given the facts known
+def line_at(node, known):
+    for line in node.lines:
+        if holds(line, known):
+            return line.text
+    return node.lines[-1].text
+
+
+# Returns the choices the player has at node, given the facts known
+def choices_at(node, known):
+    return [choice for choice in node.choices if holds(choice, known)]
+
+
+# Checks the JSON of one tree and turns it into a DialogueTree.
+# Raises ValueError naming the first problem found
+def build_tree(key, data, source="dialogue"):
+    def fail(message):
+        raise ValueError(f"{source}: tree {key!r}: {message}")
+
+    def text(value, where):
+        if not isinstance(value, str) or not value:
+            fail(f"{where} must be a non-empty string")
+        return value
+
+    def condition(entry, field, where):
+        value = entry.get(field)
+        return None if value is None else text(value, f"{where}.{field}")
+
+    if not isinstance(data, dict) or not isinstance(data.get("nodes"), dict) or not data["nodes"]:
+        fail("must be an object with a 'nodes' object")
+
+    nodes = {}
+    for node_id, node in data["nodes"].items():
+        where = f"nodes[{node_id}]"
+        if not isinstance(node, dict) or not isinstance(node.get("lines"), list) or not node["lines"]:
+            fail(f"{where} must have a non-empty 'lines' list")
+        lines = []
+        for number, line in enumerate(node["lines"]):
+            line_where = f"{where}.lines[{number}]"
+            if not isinstance(line, dict):
+                fail(f"{line_where} must be an object with a text")
+            lines.append(Line(text(line.get("text"), f"{line_where}.text"), condition(line, "if", line_where),
+                              condition(line, "unless", line_where)))
+        if lines[-1].when is not None or lines[-1].unless is not None:
+            fail(f"the last line of {where} must not have a condition")
+
+        choices = []
+        for number, choice in enumerate(node.get("choices", ())):
+            choice_where = f"{where}.choices[{number}]"
+            if not isinstance(choice, dict) or choice.get("goto") not in data["nodes"]:
+                fail(f"{choice_where} must be an object with a text and the id of a node to go to")
+            choices.append(Choice(text(choice.get("text"), f"{choice_where}.text"), choice["goto"],
+                                  condition(choice, "if", choice_where), condition(choice, "unless", choice_where)))
+        nodes[node_id] = Node(tuple(lines), tuple(choices))
+
+    start = data.get("start", next(iter(nodes)))
+    if start not in nodes:
+        fail(f"start node {start!r} does not exist")
+    return DialogueTree(key, start, nodes)
+
+
+# The dialogue trees of one world, shared by every game played in it
+class DialogueLibrary:
+
+    # Constructor taking the path of a dialogue file, an object mapping tree ids to their
+    # JSON, or None for a world without trees
+    def __init__(self, source=None, cache_size=DIALOGUE_CACHE_SIZE):
+        self.__source = source
+        self.__offsets = None  # Tree id to where its line starts, found the first time a tree is read
+        self.tree = lru_cache(maxsize=cache_size)(self.__load)
+
+    # Method to return how well the cache of trees is doing
+    def cache_info(self):
+        return self.tree.cache_info()
+
+    # Method to read and check a tree, raises ValueError if the world has no such tree
+    def __load(self, key):
+        if isinstance(self.__source, str):
+            data = self.__read(key)
+        else:
+            data = (self.__source or {}).get(key)
+        if data is None:
+            raise ValueError(f"{self.__source or 'world'}: no dialogue tree {key!r}")
+        return build_tree(key, data, self.__source if isinstance(self.__source, str) else "dialogues")
+
+    # Method to read one tree from the dialogue file, only its own line is parsed
+    def __read(self, key):
+        # Only imported once somebody talks, so starting the game does not wait for them
+        import json
+        import re
+
+        with open(self.__source, "rb") as dialogue_file:
+            if self.__offsets is None:
+                offsets = {}
+                offset = 0
+                tree_id = re.compile(TREE_ID)
+                for line in dialogue_file:
+                    match = tree_id.match(line)
+                    if match:
+                        offsets[json.loads(b'"' + match.group(1) + b'"')] = offset
+                    offset += len(line)
+                self.__offsets = offsets
+
+            offset = self.__offsets.get(key)
+            if offset is None:
+                return None
+            dialogue_file.seek(offset)
+            return json.loads(dialogue_file.readline())
@@ -0,0 +1,237 @@
+
+# Description: Hosts many players in one process. Each connection gets its own Session,
+# lines are read from a local TCP or Unix socket and every line is played as one
+# non-blocking step, so thousands of mostly idle players can share one core. The server
+# keeps the latency of recent commands and reports the median and p99 while it runs, along
+# with running statistics of the endings players reach (see Outcome_Stats.py).
+#
+# With --workers the sessions are played in a Supervisor's pool of worker processes instead,
+# so a session that crashes only sets back the players sharing its worker.
+#
+# With --store every session is saved after each line in a Session_Store.SessionStore. Players
+# are given their session id, and can carry on after leaving or a restart of the server by
+# sending "resume <id>" as their first line.
+#
+# Connect with any line-based client, for example: telnet 127.0.0.1 4000
+#
+# Usage: python Game_Server.py [--host 127.0.0.1] [--port 4000] [--unix PATH] [--stats-interval 60]
+#                              [--workers 4] [--store sessions.db]
+
+
+import argparse
+import asyncio
+import secrets
+import time
+from collections import deque
+
+from Outcome_Stats import OutcomeStats
+from Session import Session
+
+
+# The longest line a player can send, which also bounds the buffer kept per connection
+MAX_LINE = 1024
+
+# Connections that can wait to be accepted, big enough for many players joining at once
+BACKLOG = 4096
+
+
+# Counters shared by every connection
+class ServerStats:
+
+    # Constructor keeping the latency of the last `window` commands
+    def __init__(self, window=10000):
+        self.sessions = 0
+        self.active = 0
+        self.commands = 0
+        self.__latencies = deque(maxlen=window)
+        # Endings reached in sessions played in this process
+        self.outcomes = OutcomeStats()
+
+    # Method to record how long one command took, in seconds
+    def record(self, seconds):
+        self.commands += 1
+        self.__latencies.append(seconds)
+
+    # Method to return the latency of recent commands at a percentile, in milliseconds
+    def percentile(self, percent):
+        if not self.__latencies:
+            return 0.0
+        ordered = sorted(self.__latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index] * 1000
+
+    # Method to return a one line summary
+    def summary(self):
+        return (f"{self.active} active / {self.sessions} total sessions, {self.commands} commands, "
+                f"p50 {self.percentile(50):.3f}ms, p99 {self.percentile(99):.3f}ms")
+
+
+# Told to a player whose session can be resumed
+SESSION_ID = "Your session id is {0}, send 'resume {0}' when you connect again to carry on.\n"
+NO_SAVED_SESSION = "There is no saved game with that id, carrying on with a new game.\n"
+
+
+# Plays one connection's game until the player leaves or the game ends, in this process or
+# in the supervisor's workers when one is given. With a store the game is saved after every
+# line (by the supervisor when there is one), and the first line can resume a saved game
+async def handle_connection(reader, writer, stats, supervisor=None, store=None):
+    stats.sessions += 1
+    stats.active += 1
+    # Saved sessions are resumed by id, so their ids must not be guessable
+    session_id = secrets.token_hex(8) if store is not None else stats.sessions
+    if supervisor is None:
+        session = Session(session_id=session_id, events=stats.outcomes.add)
+    else:
+        from Supervisor import SupervisedSession
+        session = SupervisedSession(supervisor, session_id)
+
+    # Calls into the workers wait on a pipe, so they run off the event loop
+    async def call(method, *args):
+        if supervisor is None:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    # Saves a session played in this process, the supervisor saves its own
+    def save():
+        if store is None or supervisor is not None:
+            return
+        if session.finished():
+            store.delete(session.session_id)
+        else:
+            store.save(session.session_id, session.snapshot().to_bytes(), session.pending())
+
+    try:
+        text = await call(session.start)
+        save()
+        if store is not None:
+            text = SESSION_ID.format(session_id) + text
+        writer.write(text.encode("utf-8"))
+        await writer.drain()
+
+        first_line = store is not None
+        while not session.finished():
+            try:
+                line = await reader.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                writer.write(b"\nLine too long, goodbye.\n")
+                break
+            if not line:
+                break
+
+            line = line.decode("utf-8", "replace").strip()
+            start = time.perf_counter()
+            if first_line and line.startswith("resume "):
+                session, reply = await resume(session, line[len("resume "):].strip(), store, supervisor, call,
+                                              stats.outcomes.add)
+            else:
+                reply = await call(session.feed, line)
+                save()
+            first_line = False
+            stats.record(time.perf_counter() - start)
+
+            writer.write(reply.encode("utf-8"))
+            await writer.drain()
+
+    except ConnectionError:
+        pass
+
+    finally:
+        stats.active -= 1
+        if supervisor is not None:
+            await call(session.close)
+        writer.close()
+
+
+# Swaps a connection's new session for the saved session resume_id, returns the session to
+# play and the text to show. events is given to a session resumed in this process
+async def resume(session, resume_id, store, supervisor, call, events):
+    if supervisor is None:
+        from Session_Store import resume_session
+        resumed = resume_session(store, resume_id, events)
+        if resumed is None:
+            return session, NO_SAVED_SESSION
+        store.delete(session.session_id)
+        return resumed
+
+    from Supervisor import SupervisedSession
+    state = store.load_snapshot(resume_id)
+    if state is None:
+        return session, NO_SAVED_SESSION
+    await call(session.close)
+    store.delete(session.session_id)
+    session = SupervisedSession(supervisor, resume_id)
+    return session, await call(session.start, *state)
+
+
+# Prints the statistics every `interval` seconds
+async def report_stats(stats, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(stats.summary(), flush=True)
+        if stats.outcomes.games:
+            print("\n".join(stats.outcomes.summary_lines()), flush=True)
+
+
+# Starts listening and serves players until cancelled
+async def serve(host="127.0.0.1", port=4000, unix_path=None, stats_interval=60, stats=None, supervisor=None,
+                store=None):
+    stats = stats or ServerStats()
+
+    def on_connect(reader, writer):
+        return handle_connection(reader, writer, stats, supervisor, store)
+
+    if unix_path:
+        server = await asyncio.start_unix_server(on_connect, path=unix_path, limit=MAX_LINE, backlog=BACKLOG)
+    else:
+        server = await asyncio.start_server(on_connect, host, port, limit=MAX_LINE, backlog=BACKLOG)
+
+    for sock in server.sockets:
+        print(f"Serving on {sock.getsockname()}", flush=True)
+
+    reporter = asyncio.create_task(report_stats(stats, stats_interval)) if stats_interval else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if reporter:
+            reporter.cancel()
+        print(stats.summary(), flush=True)
+        if supervisor is not None:
+            pool = supervisor.stats()
+            print(f"{len(pool['workers'])} workers, {pool['sessions']} sessions, {pool['restarts']} restarts",
+                  flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the game to many players at once.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--unix", help="listen on a Unix socket at this path instead of TCP")
+    parser.add_argument("--stats-interval", type=float, default=60, help="seconds between reports, 0 to turn off")
+    parser.add_argument("--workers", type=int, default=0, help="play sessions in this many worker processes")
+    parser.add_argument("--store", help="SQLite database to save sessions in, so they can be resumed")
+    args = parser.parse_args(argv)
+
+    store = None
+    if args.store:
+        from Session_Store import SessionStore
+        store = SessionStore(args.store)
+
+    supervisor = None
+    if args.workers:
+        from Supervisor import Supervisor
+        supervisor = Supervisor(args.workers, store=store)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.stats_interval, supervisor=supervisor, store=store))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if supervisor is not None:
+            supervisor.shutdown()
+        if store is not None:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+
+# Description: Optional timing of a game session, to find out whether a slow session spends
+# its time in the handlers, writing output or waiting for the player. Give an Instrumentation
+# to a Game and it wraps that game's handlers and its input and output functions, counting
+# calls, wall and CPU time, how deeply handlers were nested, and time spent blocked on input.
+# Games without one run the plain handlers and pay nothing.
+#
+# A game writing through a Renderer only adds lines to its batch when it outputs text, and the
+# batch is written to the terminal when the Renderer flushes. The flushes are timed too, so the
+# output time is the time spent writing to the terminal and not only the time spent batching.
+#
+# The results can be read as a metrics dictionary while the game runs, or written when the
+# session ends as a collapsed-stack file (for flamegraph.pl or speedscope) and, when cProfile
+# is turned on, as a pstats file.
+#
+# Usage: python Story_Mode.py --profile session   (writes session.folded and session.pstats)
+
+
+import time
+
+
+# Timings of one action, in nanoseconds
+class ActionStats:
+
+    __slots__ = ("calls", "wall", "cpu", "input_calls", "input_wait", "output_calls", "output_time",
+                 "max_depth")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0
+        self.cpu = 0
+        self.input_calls = 0
+        self.input_wait = 0
+        self.output_calls = 0
+        self.output_time = 0
+        self.max_depth = 0
+
+    # Method to return the timings in milliseconds
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "wall_ms": self.wall / 1e6,
+            "cpu_ms": self.cpu / 1e6,
+            # Wall time not spent waiting for the player or writing output, none outside handlers
+            "handler_ms": (self.wall - self.input_wait - self.output_time) / 1e6 if self.calls else 0.0,
+            "input_calls": self.input_calls,
+            "input_wait_ms": self.input_wait / 1e6,
+            "output_calls": self.output_calls,
+            "output_ms": self.output_time / 1e6,
+            "max_depth": self.max_depth,
+        }
+
+
+# Records where the time of one or more games goes
+class Instrumentation:
+
+    # Constructor, profile turns on cProfile while handlers run and dump_prefix is where
+    # session_end() writes its files (nothing is written without one)
+    def __init__(self, profile=False, dump_prefix=None):
+        self.__actions = {}  # Action name to ActionStats
+        self.__stacks = {}  # Tuple of frame names to the time spent in the last frame itself
+        self.__stack = []  # Names of the actions running now, outermost first
+        self.__child_time = [0]  # Time used by the children of each running frame
+        self.__started = time.perf_counter_ns()
+        self.__flush_time = 0  # Time spent in Renderer flushes so far
+        self.__dump_prefix = dump_prefix
+        self.__profiler = None
+        if profile:
+            import cProfile
+            self.__profiler = cProfile.Profile()
+
+    # Method to return the stats of an action, creating them the first time
+    def __stats(self, name):
+        stats = self.__actions.get(name)
+        if stats is None:
+            stats = self.__actions[name] = ActionStats()
+        return stats
+
+    # Method to add the time a frame spent in itself to its stack
+    def __add_stack_time(self, stack, total):
+        self_time = total - self.__child_time.pop()
+        self.__child_time[-1] += total
+        self.__stacks[stack] = self.__stacks.get(stack, 0) + self_time
+
+    # Method to return a handler that records its timings under name and then calls method
+    def wrap_action(self, name, method):
+        stats = self.__stats(name)
+        wall_clock = time.perf_counter_ns
+        cpu_clock = time.thread_time_ns
+
+        def action():
+            stack = self.__stack
+            stack.append(name)
+            self.__child_time.append(0)
+            depth = len(stack)
+            if depth > stats.max_depth:
+                stats.max_depth = depth
+
+            profiler = self.__profiler if depth == 1 else None
+            if profiler is not None:
+                profiler.enable()
+            start_cpu = cpu_clock()
+            start = wall_clock()
+            try:
+                return method()
+            finally:
+                total = wall_clock() - start
+                stats.cpu += cpu_clock() - start_cpu
+                if profiler is not None:
+                    profiler.disable()
+                stats.calls += 1
+                stats.wall += total
+                self.__add_stack_time(tuple(stack), total)
+                stack.pop()
+
+        # Snapshots find the step to resume by the handler's name
+        action.__name__ = name
+        action.__qualname__ = getattr(method, "__qualname__", name)
+        return action
+
+    # Method to return an input function that records how long the game waited on read
+    def wrap_input(self, read):
+        clock = time.perf_counter_ns
+
+        def timed_read(prompt=""):
+            flushed = self.__flush_time
+            start = clock()
+            try:
+                return read(prompt)
+            finally:
+                # A Renderer writes its batch before waiting, which is counted as output
+                self.__record_io(clock() - start - (self.__flush_time - flushed), "input")
+
+        return timed_read
+
+    # Method to return an output function that records how long write took
+    def wrap_output(self, write):
+        clock = time.perf_counter_ns
+
+        def timed_write(text):
+            start = clock()
+            try:
+                return write(text)
+            finally:
+                self.__record_io(clock() - start, "output")
+
+        return timed_write
+
+    # Method to return a Renderer's flush that records how long writing the batch took
+    def wrap_flush(self, flush):
+        clock = time.perf_counter_ns
+
+        def timed_flush(prompt=""):
+            start = clock()
+            try:
+                return flush(prompt)
+            finally:
+                elapsed = clock() - start
+                self.__flush_time += elapsed
+                self.__record_io(elapsed, "flush")
+
+        return timed_flush
+
+    # Method to charge input or output (a write or a flush) time to the action running it
+    def __record_io(self, elapsed, kind):
+        name = self.__stack[-1] if self.__stack else "<outside>"
+        stats = self.__stats(name)
+        if kind == "input":
+            stats.input_calls += 1
+            stats.input_wait += elapsed
+        else:
+            stats.output_calls += 1
+            stats.output_time += elapsed
+
+        stack = tuple(self.__stack) + (kind,)
+        self.__stacks[stack] = self.__stacks.get(stack, 0) + elapsed
+        self.__child_time[-1] += elapsed
+
+    # Method to return the metrics gathered so far
+    def metrics(self):
+        actions = {name: stats.as_dict() for name, stats in self.__actions.items() if stats.calls
+                   or stats.input_calls or stats.output_calls}
+        return {
+            "elapsed_ms": (time.perf_counter_ns() - self.__started) / 1e6,
+            "steps": sum(stats["calls"] for stats in actions.values()),
+            "wall_ms": sum(stats["wall_ms"] for stats in actions.values()),
+            "cpu_ms": sum(stats["cpu_ms"] for stats in actions.values()),
+            "input_wait_ms": sum(stats["input_wait_ms"] for stats in actions.values()),
+            "output_ms": sum(stats["output_ms"] for stats in actions.values()),
+            "actions": actions,
+        }
+
+    # Method to return the time spent in each stack, one "frame;frame microseconds" line each
+    def collapsed_stacks(self):
+        return [f"{';'.join(stack)} {elapsed // 1000}"
+                for stack, elapsed in sorted(self.__stacks.items()) if elapsed >= 1000]
+
+    # Method to write the collapsed stacks to path
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as stacks_file:
+            for line in self.collapsed_stacks():
+                stacks_file.write(line + "\n")
+
+    # Method to write the cProfile statistics to path, returns False when profiling is off
+    def write_pstats(self, path):
+        if self.__profiler is None:
+            return False
+        self.__profiler.dump_stats(path)
+        return True
+
+    # Method called when a game stops running, writes the files if a dump prefix was given
+    def session_end(self):
+        if self.__dump_prefix is None:
+            return
+        self.write_collapsed(f"{self.__dump_prefix}.folded")
+        self.write_pstats(f"{self.__dump_prefix}.pstats")
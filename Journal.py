@@ -0,0 +1,281 @@
+
+# Description: Records a session so it can be played back exactly, for reproducing bug reports.
+# A Journal given to a Game writes every answer the player gives, with the prompt it answered,
+# to an append-only binary log. The start of every turn is marked, and every few turns the log
+# also holds a checkpoint: a snapshot of the game at the start of that turn.
+#
+# The game is deterministic, so playing the same answers again gives the same game. A Replay
+# seeks to a turn by restoring the nearest checkpoint before it and only playing the answers
+# given since, so long sessions do not have to be replayed from the start.
+#
+# Each record is a one byte type, the length of its body as four bytes, then the body:
+#   A  an answer: prompt length (2 bytes), the prompt, then the answer, both UTF-8
+#   T  the start of a turn: turn number and answers given before it (4 bytes each)
+#   C  a checkpoint: as T, followed by the GameSnapshot bytes taken at the start of the turn
+#   J  the game was jumped with restore(), load() or rewind(): as C, with the snapshot jumped to
+#
+# Usage: python Story_Mode.py --journal session.journal          (record a session)
+#        python Journal.py session.journal [--turn N]             (list it, or replay from turn N)
+
+
+import argparse
+import struct
+from bisect import bisect_right
+from collections import deque, namedtuple
+
+from Story_Mode import Game, GameSnapshot
+
+
+# First bytes of every journal, the last byte is the format version
+MAGIC = b"ADVJ\x05"
+
+RECORD_HEADER = struct.Struct("<cI")
+PROMPT_LENGTH = struct.Struct("<H")
+POSITION = struct.Struct("<II")  # Turn number, answers given so far
+
+ANSWER = b"A"
+TURN = b"T"
+CHECKPOINT = b"C"
+JUMP = b"J"
+
+
+# Writes the journal of one game
+class Journal:
+
+    # Constructor creating the journal file at path, a checkpoint is written every
+    # `checkpoint_every` turns
+    def __init__(self, path, checkpoint_every=20):
+        self.__file = open(path, "wb")
+        self.__file.write(MAGIC)
+        self.__checkpoint_every = checkpoint_every
+        self.__turns = 0
+        self.__answers = 0
+        # Records of the step being run, written once it finishes so that a step
+        # that is undone leaves nothing behind
+        self.__pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Method to write one record
+    def __record(self, kind, body):
+        self.__file.write(RECORD_HEADER.pack(kind, len(body)))
+        self.__file.write(body)
+
+    # Method to return an input function that journals the answers read
+    def wrap_input(self, read):
+
+        def journaled_read(prompt=""):
+            answer = read(prompt)
+            prompt_bytes = str(prompt).encode("utf-8")
+            self.__pending.append((ANSWER, PROMPT_LENGTH.pack(len(prompt_bytes)) + prompt_bytes
+                                   + str(answer).encode("utf-8")))
+            return answer
+
+        return journaled_read
+
+    # Method called before each step, take_snapshot is given when the step starts a turn
+    def begin_step(self, take_snapshot=None):
+        self.__pending = []
+        if take_snapshot is None:
+            return
+
+        turn = self.__turns + 1
+        position = POSITION.pack(turn, self.__answers)
+        if turn % self.__checkpoint_every == 0:
+            self.__pending.append((CHECKPOINT, position + take_snapshot().to_bytes()))
+        else:
+            self.__pending.append((TURN, position))
+
+    # Method called once a step has run, or has failed in a way that ends the game
+    def end_step(self):
+        for kind, body in self.__pending:
+            self.__record(kind, body)
+            if kind == ANSWER:
+                self.__answers += 1
+            elif kind != JUMP:
+                self.__turns += 1
+        self.__pending = []
+        # Flushed every step so a crash does not lose the answers that caused it
+        self.__file.flush()
+
+    # Method called when the game is put into another state
+    def restored(self, snapshot):
+        self.__pending = []
+        self.__record(JUMP, POSITION.pack(self.__turns, self.__answers) + snapshot.to_bytes())
+        self.__file.flush()
+
+    # Method to finish writing the journal
+    def close(self):
+        if not self.__file.closed:
+            self.end_step()
+            self.__file.close()
+
+
+# A checkpoint or jump read back from a journal, with its place in the file
+Checkpoint = namedtuple("Checkpoint", "kind record turn answers snapshot")
+
+
+# Everything in a journal: the answers as (prompt, answer) pairs, where each turn starts
+# as turn number -> (record number, answers given before it), the checkpoints and jumps
+# in the order they were written, and the number of records
+JournalContents = namedtuple("JournalContents", "answers turns checkpoints records")
+
+
+# Reads a journal, raises ValueError if it is not one
+def read_journal(path):
+    with open(path, "rb") as journal_file:
+        data = journal_file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a game journal")
+
+    answers = []
+    turns = {}
+    checkpoints = []
+    offset = len(MAGIC)
+    record = 0
+    view = memoryview(data)
+
+    # A record cut short by a crash ends the journal
+    while offset + RECORD_HEADER.size <= len(data):
+        kind, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        body = view[offset:offset + length]
+        if len(body) < length:
+            break
+        offset += length
+
+        if kind == ANSWER:
+            (prompt_length,) = PROMPT_LENGTH.unpack_from(body)
+            start = PROMPT_LENGTH.size
+            answers.append((bytes(body[start:start + prompt_length]).decode("utf-8"),
+                            bytes(body[start + prompt_length:]).decode("utf-8")))
+        else:
+            turn, given = POSITION.unpack_from(body)
+            if kind in (TURN, CHECKPOINT):
+                turns[turn] = (record, given)
+            if kind in (CHECKPOINT, JUMP):
+                # Snapshots are only decoded when a replay uses them
+                checkpoints.append(Checkpoint(kind, record, turn, given, bytes(body[POSITION.size:])))
+        record += 1
+
+    return JournalContents(answers, turns, checkpoints, record)
+
+
+# Feeds the journal's answers to the game being replayed
+class _Answers:
+
+    def __init__(self):
+        self.queue = deque()
+
+    def __call__(self, prompt=""):
+        if self.queue:
+            return self.queue.popleft()
+        raise EOFError(prompt)
+
+
+# Plays a journal back
+class Replay:
+
+    # Constructor reading the journal at path, the replayed game writes to output
+    def __init__(self, path, output=None, world=None):
+        self.contents = read_journal(path)
+        self.__feeder = _Answers()
+        self.__game = Game(self.__feeder, output, world=world)
+        self.__start = self.__game.snapshot()
+        self.__record = -1  # Record number the game has been played up to
+        self.__answers = 0  # Answers played so far
+        self.__checkpoint_records = [checkpoint.record for checkpoint in self.contents.checkpoints]
+
+    # Method to return the game being replayed
+    def game(self):
+        return self.__game
+
+    # Method to return the number of turns in the journal
+    def turns(self):
+        return len(self.contents.turns)
+
+    # Method to put the game at the start of a turn, numbered from 1.
+    # Returns False if the journal has no such turn
+    def seek(self, turn):
+        if turn not in self.contents.turns:
+            return False
+        record, answers = self.contents.turns[turn]
+
+        # The nearest checkpoint or jump before the turn, which also ends any earlier jump
+        index = bisect_right(self.__checkpoint_records, record) - 1
+        checkpoint = self.contents.checkpoints[index] if index >= 0 else None
+        checkpoint_record = checkpoint.record if checkpoint else -1
+
+        # Carry on from where the game is if that is closer than the checkpoint
+        if not checkpoint_record <= self.__record <= record:
+            if checkpoint is None:
+                self.__game.restore(self.__start)
+                self.__answers = 0
+            else:
+                self.__restore(checkpoint)
+
+        self.__play(answers)
+        self.__record = record
+        return True
+
+    # Method to play every answer left in the journal, making the jumps on the way
+    def play_to_end(self):
+        for checkpoint in self.contents.checkpoints:
+            if checkpoint.kind == JUMP and checkpoint.record > self.__record:
+                self.__play(checkpoint.answers)
+                self.__restore(checkpoint)
+        self.__play(len(self.contents.answers))
+        self.__record = self.contents.records
+
+    # Method to put the game in the state of a checkpoint or jump
+    def __restore(self, checkpoint):
+        self.__game.restore(GameSnapshot.from_bytes(checkpoint.snapshot))
+        self.__answers = checkpoint.answers
+        self.__record = checkpoint.record
+
+    # Method to play the answers up to (not including) answer number `until`, the game then
+    # stops at the prompt the next answer was given to
+    def __play(self, until):
+        self.__feeder.queue.clear()
+        self.__feeder.queue.extend(answer for _, answer in self.contents.answers[self.__answers:until])
+        self.__answers = max(self.__answers, until)
+        try:
+            while self.__game.step():
+                pass
+        except EOFError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or replay a recorded game.")
+    parser.add_argument("journal", help="journal written with Story_Mode.py --journal")
+    parser.add_argument("--turn", type=int, help="replay the game from the start of this turn")
+    args = parser.parse_args(argv)
+
+    if args.turn is None:
+        contents = read_journal(args.journal)
+        starts = {answers: turn for turn, (_, answers) in contents.turns.items()}
+        for number, (prompt, answer) in enumerate(contents.answers):
+            if number in starts:
+                print(f"- - Turn {starts[number]} - -")
+            print(f"{prompt.strip()!r} -> {answer!r}")
+        print(f"{len(contents.turns)} turns, {len(contents.answers)} answers, "
+              f"{len(contents.checkpoints)} checkpoints")
+        return
+
+    output = []
+    replay = Replay(args.journal, output)
+    if not replay.seek(args.turn):
+        parser.error(f"the journal has {replay.turns()} turns")
+    # Only show the game from the turn on
+    del output[:]
+    replay.play_to_end()
+    print("\n".join(output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+
+# Description: Location packs ship many worlds (locations) in one file. A pack starts with a
+# small index of the locations it holds, followed by one blob per location: the location's
+# checked tables as World_Loader builds them, with its dialogue trees included, stored with
+# marshal.
+#
+# Opening a pack memory-maps the file and reads only the index. A location is decoded the
+# first time a game is played in it. The most recently used locations stay decoded, and the
+# others are dropped along with the content built for them. So neither startup time nor
+# resident memory grows with the number of locations in the pack, and the pages of the file
+# are shared by every process that maps it.
+#
+# Usage: python Location_Pack.py build PACK WORLD.json [WORLD.json ...]
+#        python Location_Pack.py list PACK
+#        python Story_Mode.py --pack PACK [--location NAME]
+
+
+import argparse
+import marshal
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+from World_Loader import CACHE_VERSION, _freeze, build_tables
+
+
+# The first bytes of every pack
+MAGIC = b"LPAK"
+
+# Magic, cache version of the tables inside and the length of the index
+HEADER = struct.Struct("<4sII")
+
+# Decoded locations kept in memory per pack
+LOCATION_CACHE_SIZE = 8
+
+
+# Reads the dialogue trees of a world into an object mapping tree ids to their JSON,
+# so a pack does not depend on files next to it
+def _inline_dialogues(tables, directory):
+    import json
+
+    dialogues = tables[-1]
+    if not isinstance(dialogues, str):
+        return tables
+    trees = {}
+    with open(os.path.join(directory, dialogues), encoding="utf-8") as dialogue_file:
+        for line in dialogue_file:
+            if line.strip():
+                tree = json.loads(line)
+                trees[tree["id"]] = tree
+    return tables[:-1] + (trees,)
+
+
+# Checks every world file and writes them into one pack at pack_path.
+# Raises ValueError naming the first problem found
+def build_pack(pack_path, world_paths):
+    import json
+
+    blobs = []
+    index = {}
+    offset = 0
+    for world_path in world_paths:
+        with open(world_path, "rb") as world_file:
+            tables = build_tables(json.loads(world_file.read()), world_path)
+        tables = _inline_dialogues(tables, os.path.dirname(os.path.abspath(world_path)))
+        location = tables[0]
+        if location in index:
+            raise ValueError(f"{world_path}: location {location!r} is already in the pack")
+        blob = marshal.dumps(tables)
+        index[location] = (offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+
+    # Blob offsets count from the end of the index
+    index_blob = marshal.dumps(index)
+    temporary = f"{pack_path}.{os.getpid()}"
+    with open(temporary, "wb") as pack_file:
+        pack_file.write(HEADER.pack(MAGIC, CACHE_VERSION, len(index_blob)))
+        pack_file.write(index_blob)
+        for blob in blobs:
+            pack_file.write(blob)
+    os.replace(temporary, pack_path)
+    return list(index)
+
+
+# A memory-mapped pack, decoding its locations as they are asked for
+class LocationPack:
+
+    # Constructor opening the pack at path, raises ValueError if it is not a pack this
+    # version of the game can read
+    def __init__(self, path, cache_size=LOCATION_CACHE_SIZE):
+        self.path = os.path.abspath(path)
+        self.__cache_size = cache_size
+        self.__decoded = OrderedDict()  # Location name to its World, least recently used first
+        self.__decodes = 0
+
+        with open(self.path, "rb") as pack_file:
+            self.__map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, index_length = HEADER.unpack_from(self.__map)
+            if magic != MAGIC or version != CACHE_VERSION:
+                raise ValueError(f"{path}: not a location pack for this version of the game")
+            start = HEADER.size
+            self.__index = marshal.loads(self.__map[start:start + index_length])
+            self.__start = start + index_length
+        except (struct.error, EOFError, TypeError) as error:
+            self.__map.close()
+            raise ValueError(f"{path}: not a location pack ({error})") from None
+        except ValueError:
+            self.__map.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Method to return the names of the locations in the pack, in the order they were packed
+    def locations(self):
+        return list(self.__index)
+
+    def __contains__(self, location):
+        return location in self.__index
+
+    def __len__(self):
+        return len(self.__index)
+
+    # Method to return the World of a location, decoding it the first time it is needed.
+    # Raises KeyError if the pack has no such location
+    def world(self, location):
+        world = self.__decoded.get(location)
+        if world is not None:
+            self.__decoded.move_to_end(location)
+            return world
+
+        offset, length = self.__index[location]
+        start = self.__start + offset
+        with memoryview(self.__map)[start:start + length] as blob:
+            tables = marshal.loads(blob)
+        world = self.__decoded[location] = _freeze(tables, os.path.dirname(self.path))
+        self.__decodes += 1
+
+        while len(self.__decoded) > self.__cache_size:
+            _, evicted = self.__decoded.popitem(last=False)
+            # Games still playing the location keep their own references to it
+            from Story_Mode import release_content
+            release_content(evicted)
+        return world
+
+    # Method to return how well the cache of locations is doing
+    def cache_info(self):
+        return {"locations": len(self.__index), "decoded": len(self.__decoded), "decodes": self.__decodes,
+                "cache_size": self.__cache_size}
+
+    # Method to unmap the pack, its locations that are still decoded stay usable
+    def close(self):
+        self.__map.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or list location packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="pack world files into one pack")
+    build.add_argument("pack")
+    build.add_argument("worlds", nargs="+")
+    listing = commands.add_parser("list", help="list the locations in a pack")
+    listing.add_argument("pack")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        locations = build_pack(args.pack, args.worlds)
+        print(f"Packed {len(locations)} locations into {args.pack}")
+    else:
+        with LocationPack(args.pack) as pack:
+            for location in pack.locations():
+                print(location)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+
+# Description: Plays huge numbers of games with computer players to gather balancing data:
+# how each storyline tends to end, how many turns a win takes, how often the Detective gets
+# far enough to make an arrest and which rooms players spend their turns in.
+#
+# An agent picks one of Game.available_actions() every turn:
+#   random    picks uniformly at random
+#   greedy    examines first, then talks to new people, arrests as soon as it can and moves
+#             to the rooms it has been in least (Murderers use each tool once where they
+#             can, then move forward)
+#   scripted  plays the winning route of the world turn by turn
+#
+# Games are played in chunks across a pool of worker processes, each chunk with its own seed,
+# so a run with the same seed gives the same numbers. Every chunk keeps its episodes in flat
+# arrays and reduces them with NumPy when it is installed, or plain Python when it is not.
+#
+# Usage: python Monte_Carlo.py [--role detective|murderer] [--agent random|greedy|scripted]
+#                              [--games 100000] [--max-turns 200] [--workers 4] [--seed 0]
+#                              [--world PATH] [--json]
+
+
+import argparse
+import json
+import os
+import random
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:  # The harness works without it, only the reductions are slower
+    numpy = None
+
+from Story_Mode import Game
+from World_Loader import load_world
+from World_Generator import detective_route, murderer_route
+
+
+ROLES = {"detective": "1", "murderer": "2"}
+
+# Every way an episode can end, "timeout" is running out of turns first
+OUTCOMES = ("escaped", "caught", "correct_arrest", "wrong_arrest", "timeout", "stuck")
+OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+
+WINNING_OUTCOMES = {"detective": "correct_arrest", "murderer": "escaped"}
+
+# Episodes handed to a worker at a time
+CHUNK_SIZE = 5000
+
+
+# Picks an action uniformly at random
+class RandomAgent:
+
+    def __init__(self, role, world):
+        self.role = role
+
+    # Method called at the start of every episode
+    def begin(self, rng):
+        pass
+
+    # Method to return the answers for this turn, actions is Game.available_actions()
+    def choose(self, game, actions, rng):
+        return rng.choice(actions)
+
+    # Method to answer a question the chosen action did not cover, such as chasing Valerie
+    def reply(self, prompt, rng):
+        return rng.choice(("yes", "no")) if "Yes/No" in prompt else "1"
+
+
+# Picks actions by a fixed order of preference, breaking ties at random
+class GreedyAgent(RandomAgent):
+
+    # Order in which the first answer of an action is preferred
+    PREFERENCES = {"detective": ("e", "i", "a", "m", "r"), "murderer": ("u", "e", "f", "b")}
+
+    def __init__(self, role, world):
+        super().__init__(role, world)
+        self.__preferences = self.PREFERENCES[role]
+        self.__visits = [0] * len(world.rooms)
+        self.__done = set()  # (room, action) of the people talked to and tools used
+
+    def begin(self, rng):
+        self.__visits = [0] * len(self.__visits)
+        self.__done.clear()
+
+    def choose(self, game, actions, rng):
+        room = game.current_room
+        self.__visits[room] += 1
+        for command in self.__preferences:
+            choices = [action for action in actions if action[0] == command]
+            if command in ("i", "u"):
+                choices = [action for action in choices if (room, tuple(action)) not in self.__done]
+            elif command == "m" and choices:
+                fewest = min(self.__visits[int(action[1]) - 1] for action in choices)
+                choices = [action for action in choices if self.__visits[int(action[1]) - 1] == fewest]
+            if choices:
+                action = rng.choice(choices)
+                if command in ("i", "u"):
+                    self.__done.add((room, tuple(action)))
+                return action
+        return rng.choice(actions)
+
+    def reply(self, prompt, rng):
+        return "yes" if "Yes/No" in prompt else "1"
+
+
+# Plays the winning route of the world, one turn of it at a time
+class ScriptedAgent(RandomAgent):
+
+    def __init__(self, role, world):
+        super().__init__(role, world)
+        route = detective_route(world) if role == "detective" else murderer_route(world)
+        self.__turns = split_turns(world, route)
+        self.__turn = 0
+
+    def begin(self, rng):
+        self.__turn = 0
+
+    def choose(self, game, actions, rng):
+        if self.__turn >= len(self.__turns):
+            return []
+        self.__turn += 1
+        return self.__turns[self.__turn - 1]
+
+
+AGENTS = {"random": RandomAgent, "greedy": GreedyAgent, "scripted": ScriptedAgent}
+
+
+# Splits the answers of a whole game into the answers given in each turn.
+# The first three answers (role, name and start) are left out, the harness gives those
+def split_turns(world, route):
+    answers = deque(route)
+    turns = []
+    given = []
+
+    def read(prompt=""):
+        if not answers:
+            raise EOFError(prompt)
+        given.append(answers.popleft())
+        return given[-1]
+
+    game = Game(read, None, world=world)
+    try:
+        while game.get_next_step() != "update":
+            game.step()
+        given.clear()
+        while game.step():
+            if game.get_next_step() == "update":
+                turns.append(list(given))
+                given.clear()
+    except EOFError:
+        pass
+    if given:
+        turns.append(list(given))
+    return turns
+
+
+# Plays episodes in one worker and feeds the agent's answers to its game
+class _Player:
+
+    # Constructor, events is passed on to the Game (see Story_Mode.OutcomeEvent)
+    def __init__(self, role, agent, world, events=None):
+        self.__queue = deque()
+        self.__rng = random.Random()
+        self.__agent = agent
+        self.__outcomes = 0  # Endings reached before the episode being played
+        self.game = Game(self.__read, None, world=world, events=events)
+
+        # Every episode starts from the first turn of a new game
+        self.__queue.extend((ROLES[role], "Bot", "s"))
+        while self.game.get_next_step() != "update":
+            self.game.step()
+        self.__start = self.game.snapshot()
+
+    # Input function given to the game
+    def __read(self, prompt=""):
+        if self.__queue:
+            return self.__queue.popleft()
+        # Asked whether to play again after an ending
+        if len(self.game.get_outcomes()) > self.__outcomes:
+            return "no"
+        return self.__agent.reply(prompt, self.__rng)
+
+    # Method to play one episode, returns (outcome, turns, turn the arrest was first possible or -1)
+    # and adds the room of every turn to rooms
+    def play(self, seed, max_turns, rooms):
+        game = self.game
+        self.__rng.seed(seed)
+        self.__agent.begin(self.__rng)
+        game.restore(self.__start)
+        self.__outcomes = len(game.get_outcomes())
+        arrest_turn = -1
+
+        for turn in range(max_turns):
+            actions = game.available_actions()
+            rooms.append(game.current_room)
+            if arrest_turn < 0 and any(action[0] == "a" for action in actions):
+                arrest_turn = turn
+            answers = self.__agent.choose(game, actions, self.__rng)
+            if not answers:
+                return "stuck", turn, arrest_turn
+            self.__queue.clear()
+            self.__queue.extend(answers)
+
+            while game.step():
+                if not self.__queue and game.get_next_step() == "update":
+                    break
+            outcomes = game.get_outcomes()
+            if len(outcomes) > self.__outcomes:
+                return outcomes[-1], turn + 1, arrest_turn
+            if game.get_next_step() is None:
+                return "stuck", turn + 1, arrest_turn
+        return "timeout", max_turns, arrest_turn
+
+
+# Reduces the episodes of a chunk to counts that can be added up across chunks
+def tally(codes, turns, arrest_turns, rooms, room_count, max_turns, winning_code):
+    if numpy is not None:
+        codes = numpy.frombuffer(codes, dtype=numpy.int8)
+        turns = numpy.frombuffer(turns, dtype=numpy.int32)
+        arrest_turns = numpy.frombuffer(arrest_turns, dtype=numpy.int32)
+        wins = turns[codes == winning_code]
+        reached = arrest_turns[arrest_turns >= 0]
+        return {
+            "outcomes": numpy.bincount(codes, minlength=len(OUTCOMES)).tolist(),
+            "win_turns": numpy.bincount(wins, minlength=max_turns + 1).tolist(),
+            "arrest_reached": int(reached.size),
+            "arrest_turn_total": int(reached.sum()),
+            "room_visits": numpy.bincount(numpy.frombuffer(rooms, dtype=numpy.int32),
+                                          minlength=room_count).tolist(),
+        }
+
+    outcomes = [0] * len(OUTCOMES)
+    win_turns = [0] * (max_turns + 1)
+    for code, turn in zip(codes, turns):
+        outcomes[code] += 1
+        if code == winning_code:
+            win_turns[turn] += 1
+    room_visits = [0] * room_count
+    for room in rooms:
+        room_visits[room] += 1
+    reached = [turn for turn in arrest_turns if turn >= 0]
+    return {
+        "outcomes": outcomes,
+        "win_turns": win_turns,
+        "arrest_reached": len(reached),
+        "arrest_turn_total": sum(reached),
+        "room_visits": room_visits,
+    }
+
+
+# Returns the seed of chunk number of a run, the same for the same run seed. Chunks of runs
+# with nearby seeds do not share seeds, as they would if the chunk number were just added on
+def chunk_seed(seed, number):
+    return random.Random(f"{seed}/{number}").getrandbits(64)
+
+
+# Plays one chunk of episodes, run in a worker process
+def play_chunk(task):
+    role, agent_name, seed, episodes, max_turns, world_path = task
+    world = load_world(world_path) if world_path else load_world()
+    player = _Player(role, AGENTS[agent_name](role, world), world)
+
+    # Flat arrays of every episode, in the layout NumPy reads directly
+    codes = array("b")
+    turns = array("i")
+    arrest_turns = array("i")
+    rooms = array("i")
+    for episode in range(episodes):
+        outcome, turn, arrest_turn = player.play(seed * 1_000_003 + episode, max_turns, rooms)
+        codes.append(OUTCOME_CODES[outcome])
+        turns.append(turn)
+        arrest_turns.append(arrest_turn)
+    return tally(codes, turns, arrest_turns, rooms, len(world.rooms), max_turns,
+                 OUTCOME_CODES[WINNING_OUTCOMES[role]])
+
+
+# Adds the counts of one chunk to the running totals
+def merge(totals, counts):
+    if totals is None:
+        return counts
+    for key, value in counts.items():
+        if isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(totals[key], value)]
+        else:
+            totals[key] += value
+    return totals
+
+
+# Plays `games` episodes across the workers and returns the report
+def run(role="detective", agent="random", games=10000, max_turns=200, workers=None, seed=0, world_path=None):
+    workers = workers or os.cpu_count() or 1
+    tasks = [(role, agent, chunk_seed(seed, number), min(CHUNK_SIZE, games - start), max_turns, world_path)
+             for number, start in enumerate(range(0, games, CHUNK_SIZE))]
+
+    start = time.perf_counter()
+    totals = None
+    if workers == 1:
+        for task in tasks:
+            totals = merge(totals, play_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for counts in executor.map(play_chunk, tasks):
+                totals = merge(totals, counts)
+    elapsed = time.perf_counter() - start
+
+    world = load_world(world_path) if world_path else load_world()
+    wins = sum(totals["win_turns"])
+    visits = sum(totals["room_visits"])
+    return {
+        "role": role,
+        "agent": agent,
+        "games": games,
+        "workers": workers,
+        "numpy": numpy is not None,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "outcomes": {outcome: count / games for outcome, count in zip(OUTCOMES, totals["outcomes"]) if count},
+        "average_turns_to_win": (sum(turn * count for turn, count in enumerate(totals["win_turns"])) / wins
+                                 if wins else None),
+        "arrest_reached": totals["arrest_reached"] / games,
+        "average_turns_to_arrest": (totals["arrest_turn_total"] / totals["arrest_reached"]
+                                    if totals["arrest_reached"] else None),
+        "room_visits": {name: count / visits for (name, _), count in zip(world.rooms, totals["room_visits"])
+                        if count} if visits else {},
+    }
+
+
+# Prints a report as text, with the room visits drawn as a bar per room
+def print_report(report):
+    print(f"{report['games']} {report['agent']} {report['role']} games on {report['workers']} workers "
+          f"in {report['seconds']:.2f}s ({report['games_per_second']:.0f} games/s)")
+    print("Outcomes:")
+    for outcome, share in sorted(report["outcomes"].items(), key=lambda item: -item[1]):
+        print(f"- {outcome}: {share:.2%}")
+    if report["average_turns_to_win"] is not None:
+        print(f"Average turns to win: {report['average_turns_to_win']:.1f}")
+    if report["role"] == "detective":
+        print(f"Reached the arrest: {report['arrest_reached']:.2%}"
+              + (f" after {report['average_turns_to_arrest']:.1f} turns on average"
+                 if report["average_turns_to_arrest"] is not None else ""))
+    print("Turns spent in each room:")
+    widest = max(report["room_visits"].values(), default=0)
+    for name, share in report["room_visits"].items():
+        bar = "#" * round(40 * share / widest) if widest else ""
+        print(f"{name[:24]:>24} {share:6.2%} {bar}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many games with computer players and report the results.")
+    parser.add_argument("--role", choices=ROLES, default="detective")
+    parser.add_argument("--agent", choices=AGENTS, default="random")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--max-turns", type=int, default=200, help="turns before a game counts as a timeout")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--world", help="world file to play instead of the Lonely Lodge")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.role, args.agent, args.games, args.max_turns, args.workers, args.seed, args.world)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+
+# Description: Streaming statistics over the endings of any number of games. A game given
+# events=stats.add reports an OutcomeEvent for every ending it reaches (see Story_Mode.py),
+# and OutcomeStats keeps running counts of the endings for each role. It also keeps a
+# histogram of the turns taken, clues found, tools used and chances of being caught left,
+# which can be read at any time for means and approximate quantiles. Games that ended after
+# catching the Murderer became impossible are counted apart instead of as chances left.
+#
+# Events are not kept. Each histogram has HDR-style buckets: values below 64 are counted
+# exactly, and above that every power of two is split into 32 buckets, so a quantile is off
+# by at most 1/32 of its value. The memory used grows with the logarithm of the largest
+# value seen, not with the number of games, and the statistics of several processes can
+# be merged.
+#
+# Usage: python Outcome_Stats.py [--role detective|murderer] [--agent random|greedy|scripted]
+#                                [--games 1000000] [--every 100000]
+
+
+import argparse
+import time
+from collections import Counter
+
+
+# Buckets per power of two is 2 ** PRECISION_BITS
+PRECISION_BITS = 5
+
+# The numbers every OutcomeEvent carries, in the order they are summarised
+MEASURES = ("turns", "clues", "tools", "caught")
+
+# Quantiles shown in summaries
+QUANTILES = (0.5, 0.9, 0.99)
+
+# The ending each role is trying to reach
+WINNING_ENDINGS = {"detective": "correct_arrest", "murderer": "escaped"}
+
+
+# Counts of non-negative whole numbers in buckets of bounded relative width
+class LogHistogram:
+    __slots__ = ("_sub_buckets", "_buckets", "count", "total", "minimum", "maximum")
+
+    def __init__(self, precision_bits=PRECISION_BITS):
+        self._sub_buckets = 1 << precision_bits
+        self._buckets = {}  # Bucket number to count, only buckets that were used
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+
+    # Method to return the bucket a value is counted in
+    def _bucket(self, value):
+        sub_buckets = self._sub_buckets
+        if value < 2 * sub_buckets:
+            return value
+        shift = value.bit_length() - sub_buckets.bit_length()
+        return sub_buckets * (shift + 1) + (value >> shift) - sub_buckets
+
+    # Method to return the smallest and largest values counted in a bucket
+    def _bounds(self, bucket):
+        sub_buckets = self._sub_buckets
+        if bucket < 2 * sub_buckets:
+            return bucket, bucket
+        shift = bucket // sub_buckets - 1
+        low = (bucket - sub_buckets * shift) << shift
+        return low, low + (1 << shift) - 1
+
+    # Method to count a value
+    def add(self, value, count=1):
+        if value < 0:
+            raise ValueError("a LogHistogram only counts values of 0 and above")
+        bucket = self._bucket(value)
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    # Method to add the counts of another histogram with the same precision
+    def merge(self, other):
+        if other._sub_buckets != self._sub_buckets:
+            raise ValueError("only histograms with the same precision can be merged")
+        for bucket, count in other._buckets.items():
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    # Method to return the mean of the values counted, or None if there are none
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    # Method to return a value that about fraction q of the values are at or below, or None
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                low, high = self._bounds(bucket)
+                # The middle of the bucket, kept within the values actually seen
+                return min(max((low + high) // 2, self.minimum), self.maximum)
+        return self.maximum
+
+    # Method to return the buckets used as (lowest value, highest value, count), in order
+    def buckets(self):
+        return [(*self._bounds(bucket), self._buckets[bucket]) for bucket in sorted(self._buckets)]
+
+
+# Running statistics over the endings of games, fed one OutcomeEvent at a time
+class OutcomeStats:
+
+    def __init__(self, precision_bits=PRECISION_BITS):
+        self.__precision_bits = precision_bits
+        self.games = 0
+        self.endings = Counter()  # (role, ending) to the number of games that reached it
+        self.uncatchable = Counter()  # Role to the games that ended when it could no longer be caught
+        self.__histograms = {}  # (role, measure) to its LogHistogram
+
+    # Method to return the histogram of one measure of one role, made the first time it is needed
+    def histogram(self, role, measure):
+        histogram = self.__histograms.get((role, measure))
+        if histogram is None:
+            histogram = self.__histograms[role, measure] = LogHistogram(self.__precision_bits)
+        return histogram
+
+    # Method to count one ending, can be given to a Game as its events function
+    def add(self, event):
+        self.games += 1
+        self.endings[event.role, event.ending] += 1
+        for measure in MEASURES:
+            value = getattr(event, measure)
+            # caught is -1 once the Murderer can no longer be caught, which is not a number of chances
+            if measure == "caught" and value < 0:
+                self.uncatchable[event.role] += 1
+            else:
+                self.histogram(event.role, measure).add(value)
+
+    # Method to add the statistics gathered by another OutcomeStats
+    def merge(self, other):
+        self.games += other.games
+        self.endings.update(other.endings)
+        self.uncatchable.update(other.uncatchable)
+        for (role, measure), histogram in other.__histograms.items():
+            self.histogram(role, measure).merge(histogram)
+
+    # Method to return the statistics so far for each role played
+    def summary(self):
+        roles = {}
+        for (role, ending), count in sorted(self.endings.items()):
+            roles.setdefault(role, {"games": 0, "endings": {}})
+            roles[role]["games"] += count
+            roles[role]["endings"][ending] = count
+
+        for role, summary in roles.items():
+            summary["win_rate"] = summary["endings"].get(WINNING_ENDINGS.get(role), 0) / summary["games"]
+            summary["uncatchable"] = self.uncatchable[role]
+            for measure in MEASURES:
+                histogram = self.histogram(role, measure)
+                summary[measure] = {"mean": histogram.mean(), "max": histogram.maximum,
+                                    **{f"p{round(q * 100)}": histogram.quantile(q) for q in QUANTILES}}
+        return {"games": self.games, "roles": roles}
+
+    # Method to return the summary as lines of text
+    def summary_lines(self):
+        summary = self.summary()
+        lines = [f"{summary['games']} endings"]
+        for role, stats in summary["roles"].items():
+            endings = ", ".join(f"{ending} {count / stats['games']:.1%}" for ending, count in stats["endings"].items())
+            lines.append(f"{role}: {stats['games']} games, won {stats['win_rate']:.1%} ({endings})")
+            for measure in MEASURES:
+                values = stats[measure]
+                if values["mean"] is None:
+                    lines.append(f"  {measure:>6}: none")
+                    continue
+                quantiles = " ".join(f"p{round(q * 100)} {values[f'p{round(q * 100)}']}" for q in QUANTILES)
+                lines.append(f"  {measure:>6}: mean {values['mean']:.2f}  {quantiles}  max {values['max']}")
+            if stats["uncatchable"]:
+                lines.append(f"  {stats['uncatchable']} games ended after catching the Murderer became impossible")
+        return lines
+
+
+# Plays games with a Monte_Carlo agent and streams their endings into an OutcomeStats,
+# calling report with the statistics every `every` games
+def stream_games(role, agent, games, every, report, max_turns=200, seed=0):
+    from Monte_Carlo import AGENTS, _Player
+    from World_Loader import load_world
+
+    stats = OutcomeStats()
+    world = load_world()
+    player = _Player(role, AGENTS[agent](role, world), world, events=stats.add)
+    for episode in range(games):
+        player.play(seed * 1_000_003 + episode, max_turns, [])
+        if every and (episode + 1) % every == 0:
+            report(stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the endings of bot games into running statistics.")
+    parser.add_argument("--role", choices=WINNING_ENDINGS, default="detective")
+    parser.add_argument("--agent", choices=("random", "greedy", "scripted"), default="random")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--every", type=int, default=0, help="print the statistics every this many games")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+
+    def report(stats):
+        print(f"After {time.perf_counter() - start:.1f}s:")
+        print("\n".join(stats.summary_lines()), flush=True)
+
+    stats = stream_games(args.role, args.agent, args.games, args.every, report, seed=args.seed)
+    if not args.every or args.games % args.every:
+        report(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+
+# Description: The entry point for launchers that start a fresh process for every player,
+# where the time until the first prompt matters more than anything else.
+#
+# Run on its own it plays the game like Story_Mode.py. With --zygote it becomes a zygote:
+# one process that loads the world, builds the shared tables and plays a game of each
+# storyline to warm everything up, then waits on a Unix socket. Each player then runs this
+# file with --connect, which only imports what it needs to pass its terminal to the zygote.
+# The zygote forks a ready-made worker that plays the game on that terminal, so a player
+# does not wait for any of the game to be imported or loaded.
+#
+# Usage: python Quick_Start.py [--world PATH] [--journal PATH] [--profile PREFIX]
+#        python Quick_Start.py --zygote /tmp/lodge.sock [--world PATH]
+#        python Quick_Start.py --connect /tmp/lodge.sock [--journal PATH] [--profile PREFIX]
+
+# Only modules the interpreter has already loaded are imported here, everything else is
+# imported by the mode that needs it
+import os
+import sys
+
+
+# Largest request a player can send: the working directory and options
+MAX_REQUEST = 65536
+
+# The player's standard input, output and error are passed to the worker
+PASSED_FDS = (0, 1, 2)
+
+
+# Asks the zygote listening at path to play a game on this terminal, returns the exit status
+def connect(path, argv):
+    import _socket
+    import struct
+
+    connection = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    connection.connect(path)
+    request = "\0".join([os.getcwd()] + argv).encode("utf-8")
+    fds = struct.pack(f"{len(PASSED_FDS)}i", *PASSED_FDS)
+    connection.sendmsg([request], [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)])
+
+    # The worker says who it is, then how the game ended once it has
+    worker = struct.unpack("<i", connection.recv(4))[0]
+    try:
+        status = connection.recv(1)
+    except KeyboardInterrupt:
+        os.kill(worker, 15)  # SIGTERM, the worker is not in this terminal's process group
+        return 130
+    finally:
+        connection.close()
+    return status[0] if status else 1
+
+
+# Loads and warms up everything a game needs, so forked workers start with it ready
+def prepare(world_path=None):
+    from Story_Mode import Game, load_world, shared_content
+    from World_Generator import detective_route, murderer_route
+
+    world = load_world(world_path) if world_path else load_world()
+    shared_content(world)
+    for route in (detective_route(world), murderer_route(world)):
+        Game(route, [], world=world).run()
+
+
+# Plays one game for a player who connected to the zygote, in a forked worker
+def serve_player(connection, world_path):
+    import socket
+    import struct
+
+    from Story_Mode import main
+
+    request, fds, _, _ = socket.recv_fds(connection, MAX_REQUEST, len(PASSED_FDS))
+    for fd, target in zip(fds, PASSED_FDS):
+        os.dup2(fd, target)
+        os.close(fd)
+    cwd, *argv = request.decode("utf-8").split("\0")
+    os.chdir(cwd)
+    connection.sendall(struct.pack("<i", os.getpid()))
+
+    status = 0
+    try:
+        main((["--world", world_path] if world_path else []) + argv)
+    except BaseException:
+        status = 1
+        import traceback
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        connection.sendall(bytes([status]))
+    return status
+
+
+# Runs the zygote: forks a worker for every player that connects to path
+def zygote(path, world_path=None):
+    import gc
+    import signal
+    import socket
+
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        sys.exit("The zygote needs os.fork() and Unix sockets")
+
+    # Workers change to the player's directory, so the world is found from here first
+    world_path = os.path.abspath(world_path) if world_path else None
+    prepare(world_path)
+    # Keep what was loaded out of the garbage collector's way, so workers share its pages
+    gc.collect()
+    gc.freeze()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(128)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Finished workers are reaped by the system
+    print(f"Zygote ready on {path}", file=sys.stderr)
+
+    try:
+        while True:
+            connection, _ = listener.accept()
+            if os.fork() == 0:
+                listener.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                try:
+                    status = serve_player(connection, world_path)
+                finally:
+                    connection.close()
+                os._exit(status)
+            connection.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        os.unlink(path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = dict(zip(argv[::2], argv[1::2]))
+
+    if "--connect" in options:
+        index = argv.index("--connect")
+        sys.exit(connect(options["--connect"], argv[:index] + argv[index + 2:]))
+
+    if "--zygote" in options:
+        zygote(options["--zygote"], options.get("--world"))
+        return
+
+    from Story_Mode import main as play
+    play(argv)
+
+
+if __name__ == "__main__":
+    main()
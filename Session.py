@@ -0,0 +1,110 @@
+
+# Description: Runs a game one line of input at a time, for front ends that cannot block
+# waiting on input() such as network servers. Each line is handed to the game as it arrives,
+# and the session replies with the text the game wrote in response.
+#
+# A step can ask for more than one answer (moving room asks for the command and then the
+# room number). When a step asks for an answer that has not arrived yet, the game is put back
+# to the snapshot taken before the step, and the step runs again from the start once the next
+# line arrives. The game is deterministic, so the repeated run writes the same text again and
+# only the part the player has not seen yet is sent.
+#
+# A line of chained commands such as "m 3; e; i 1" runs as one step (see Game.update), so a
+# whole turn or more can be played in one round trip and answered with one reply.
+
+
+from collections import deque
+
+from Story_Mode import Game
+
+
+# Raised inside a step when it asks for an answer that has not arrived yet
+class _NeedInput(Exception):
+    pass
+
+
+# One player's game, fed one line at a time
+class Session:
+
+    # Constructor creating the game, optionally carrying on from a snapshot.
+    # events is passed on to the Game (see Story_Mode.OutcomeEvent)
+    def __init__(self, session_id=None, snapshot=None, events=None):
+        self.session_id = session_id
+        self.__lines = deque()  # Lines received but not used by a finished step yet
+        self.__used = 0  # Lines used by the step being run
+        self.__output = []  # Text written by the step being run
+        self.__sent = 0  # Characters of the step's text already sent
+        self.__finished = False
+        self.__game = Game(self.__read, self.__write, events=events)
+        if snapshot is not None:
+            self.__game.restore(snapshot)
+
+    # Method to check if the game is over
+    def finished(self):
+        return self.__finished
+
+    # Method to return the game being played
+    def game(self):
+        return self.__game
+
+    # Method to take a snapshot of the game, which is always between two steps
+    def snapshot(self):
+        return self.__game.snapshot()
+
+    # Method to return the lines received for the step the game is waiting in, which the
+    # snapshot does not include
+    def pending(self):
+        return list(self.__lines)
+
+    # Method to run the game until it waits for the first line, returns the text to show
+    def start(self):
+        return self.__advance()
+
+    # Method to hand the game one line typed by the player, returns the text to show
+    def feed(self, line):
+        if self.__finished:
+            return ""
+        self.__lines.append(line)
+        return self.__advance()
+
+    # Method to run steps until the game waits for a line that has not arrived
+    def __advance(self):
+        replies = []
+
+        while not self.__finished:
+            snapshot = self.__game.snapshot()
+            self.__used = 0
+            self.__output = []
+
+            try:
+                running = self.__game.step()
+
+            # Undo the partial step and wait for the next line
+            except _NeedInput:
+                self.__game.restore(snapshot)
+                text = "".join(self.__output)
+                replies.append(text[self.__sent:])
+                self.__sent = len(text)
+                break
+
+            text = "".join(self.__output)
+            replies.append(text[self.__sent:])
+            self.__sent = 0
+            for _ in range(self.__used):
+                self.__lines.popleft()
+            self.__finished = not running
+
+        return "".join(replies)
+
+    # Input function given to the game, the player's own terminal shows what they typed
+    def __read(self, prompt=""):
+        self.__output.append(prompt)
+        if self.__used < len(self.__lines):
+            line = self.__lines[self.__used]
+            self.__used += 1
+            return line
+        raise _NeedInput()
+
+    # Output function given to the game
+    def __write(self, text):
+        self.__output.append(text + "\n")
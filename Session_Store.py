@@ -0,0 +1,301 @@
+
+# Description: Keeps hosted sessions in a local SQLite database so they outlive the process
+# playing them. After every turn the server saves the session's state: the snapshot of its
+# game and the lines given so far to the step it is waiting in (see Session.pending()).
+# A player can then carry on by their session id after a restart, on any server sharing
+# the database.
+#
+# Saving does not wait on the disk. States go into a write-behind queue that keeps only the
+# latest state of each session, and a writer thread commits the queue in batches with one
+# prepared statement. The database runs in WAL mode, so a commit is one append to the log and
+# loading a session (one primary key lookup) never waits on the writer.
+#
+# Usage: python Game_Server.py --store sessions.db      (save and resume hosted sessions)
+#        python Session_Store.py sessions.db [--sessions 1000] [--turns 20]   (measure it)
+
+
+import argparse
+import sqlite3
+import threading
+import time
+
+from Story_Mode import GameSnapshot
+
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    snapshot BLOB NOT NULL,
+    pending TEXT NOT NULL,
+    saved REAL NOT NULL
+) WITHOUT ROWID"""
+
+SAVE = ("INSERT INTO sessions (id, snapshot, pending, saved) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET snapshot = excluded.snapshot, pending = excluded.pending, "
+        "saved = excluded.saved")
+DELETE = "DELETE FROM sessions WHERE id = ?"
+LOAD = "SELECT snapshot, pending FROM sessions WHERE id = ?"
+
+# Separates the pending lines when they are stored, a player's line never holds it
+LINE_SEPARATOR = "\n"
+
+# States queued before the writer is woken up early
+BATCH_SIZE = 512
+
+# Longest a saved state waits in the queue, in seconds
+FLUSH_INTERVAL = 0.05
+
+# Marks a session to delete in the queue
+_DELETED = None
+
+
+# Opens a connection to the database at path, set up for many small commits
+def _connect(path):
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode a commit is safe from crashes of the process without waiting on the disk,
+    # only losing power can lose the last few commits
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
+
+
+# Session states saved in a SQLite database, written behind by a thread
+class SessionStore:
+
+    # Constructor opening (or creating) the database at path and starting the writer
+    def __init__(self, path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+
+        self.__writer = _connect(path)
+        self.__writer.execute(SCHEMA)
+        # States saved with another snapshot layout cannot be resumed, so they are forgotten
+        (version,) = self.__writer.execute("PRAGMA user_version").fetchone()
+        if version != GameSnapshot.VERSION:
+            self.__writer.execute("DELETE FROM sessions")
+            self.__writer.execute(f"PRAGMA user_version = {GameSnapshot.VERSION}")
+        self.__readers = threading.local()  # One connection for reading per thread
+        self.__reader_connections = []
+
+        self.__lock = threading.Condition()
+        self.__queued = {}  # Session id to its latest state, or _DELETED, not written yet
+        self.__writing = {}  # The batch being committed, still read by load()
+        self.__closed = False
+        self.__error = None
+
+        self.commits = 0
+        self.rows = 0
+        self.__thread = threading.Thread(target=self.__write_loop, name="session-store", daemon=True)
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Method to queue the state of a session to be saved, pending is a list of lines
+    def save(self, session_id, snapshot, pending=()):
+        self.__queue(str(session_id), (snapshot, LINE_SEPARATOR.join(pending), time.time()))
+
+    # Method to queue a finished or abandoned session to be forgotten
+    def delete(self, session_id):
+        self.__queue(str(session_id), _DELETED)
+
+    # Method to put a state in the queue, replacing any state of the same session still waiting
+    def __queue(self, session_id, state):
+        with self.__lock:
+            if self.__error is not None:
+                raise self.__error
+            if self.__closed:
+                raise ValueError("the session store is closed")
+            self.__queued[session_id] = state
+            if len(self.__queued) >= self.__batch_size:
+                self.__lock.notify_all()
+
+    # Method to return the latest state of a session as (snapshot bytes, pending lines),
+    # or None if nothing is saved for it
+    def load(self, session_id):
+        session_id = str(session_id)
+        with self.__lock:
+            for states in (self.__queued, self.__writing):
+                if session_id in states:
+                    state = states[session_id]
+                    return None if state is _DELETED else (state[0], state[1].split(LINE_SEPARATOR) if state[1] else [])
+
+        reader = getattr(self.__readers, "connection", None)
+        if reader is None:
+            reader = self.__readers.connection = _connect(self.path)
+            with self.__lock:
+                self.__reader_connections.append(reader)
+        row = reader.execute(LOAD, (session_id,)).fetchone()
+        if row is None:
+            return None
+        snapshot, pending = row
+        return bytes(snapshot), pending.split(LINE_SEPARATOR) if pending else []
+
+    # Method to return the GameSnapshot and pending lines of a session, or None
+    def load_snapshot(self, session_id):
+        state = self.load(session_id)
+        return None if state is None else (GameSnapshot.from_bytes(state[0]), state[1])
+
+    # Method to wait until every state queued so far is committed
+    def flush(self):
+        with self.__lock:
+            self.__lock.notify_all()
+            while (self.__queued or self.__writing) and self.__error is None and self.__thread.is_alive():
+                self.__lock.wait(self.__flush_interval)
+            if self.__error is not None:
+                raise self.__error
+
+    # Method to commit what is queued and stop the writer
+    def close(self):
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            self.__lock.notify_all()
+        self.__thread.join()
+        self.__writer.close()
+        for reader in self.__reader_connections:
+            reader.close()
+        if self.__error is not None:
+            raise self.__error
+
+    # Method to return how much the writer has done
+    def stats(self):
+        with self.__lock:
+            queued = len(self.__queued)
+        return {"commits": self.commits, "rows": self.rows, "queued": queued}
+
+    # Runs in the writer thread: commits the queue in batches until the store is closed
+    def __write_loop(self):
+        while True:
+            with self.__lock:
+                # Give sessions a moment to fill the batch, woken early when it is full,
+                # flushed or the store is closed
+                if len(self.__queued) < self.__batch_size and not self.__closed:
+                    self.__lock.wait(self.__flush_interval)
+                if not self.__queued:
+                    if self.__closed:
+                        return
+                    continue
+                self.__writing, self.__queued = self.__queued, {}
+                batch = self.__writing
+
+            saves = [(session_id, *state) for session_id, state in batch.items() if state is not _DELETED]
+            deletes = [(session_id,) for session_id, state in batch.items() if state is _DELETED]
+            try:
+                self.__writer.execute("BEGIN")
+                if saves:
+                    self.__writer.executemany(SAVE, saves)
+                if deletes:
+                    self.__writer.executemany(DELETE, deletes)
+                self.__writer.execute("COMMIT")
+            except sqlite3.Error as error:
+                if self.__writer.in_transaction:
+                    self.__writer.execute("ROLLBACK")
+                with self.__lock:
+                    self.__error = error
+                    self.__writing = {}
+                    self.__lock.notify_all()
+                return
+
+            with self.__lock:
+                self.__writing = {}
+                self.commits += 1
+                self.rows += len(batch)
+                self.__lock.notify_all()
+
+
+# Returns a Session carrying on from the state saved for session_id and the text to show
+# the player, or None if nothing is saved for it. events is passed on to the Session
+def resume_session(store, session_id, events=None):
+    from Session import Session
+
+    state = store.load_snapshot(session_id)
+    if state is None:
+        return None
+    snapshot, pending = state
+    session = Session(session_id, snapshot, events)
+    return session, session.start() + "".join(session.feed(line) for line in pending)
+
+
+# Plays bot sessions through a store, saving every turn, then resumes each of them
+def benchmark(path, sessions, turns):
+    from Session import Session
+    from Story_Mode import load_world
+    from World_Generator import detective_route, murderer_route
+
+    world = load_world()
+    routes = [detective_route(world), murderer_route(world)]
+    with SessionStore(path) as store:
+        games = {}
+        for number in range(sessions):
+            session_id = f"bench-{number}"
+            games[session_id] = (Session(session_id), list(routes[number % 2][:turns]))
+            games[session_id][0].start()
+
+        # Every line played is one turn saved
+        saved = 0
+        start = time.perf_counter()
+        for position in range(turns):
+            for session_id, (session, route) in games.items():
+                if position < len(route) and not session.finished():
+                    session.feed(route[position])
+                    if session.finished():
+                        store.delete(session_id)
+                    else:
+                        store.save(session_id, session.snapshot().to_bytes(), session.pending())
+                    saved += 1
+        store.flush()
+        elapsed = time.perf_counter() - start
+        stats = store.stats()
+
+    # A fresh store, as after a restart
+    timings = []
+    with SessionStore(path) as store:
+        for session_id, (session, _) in games.items():
+            if session.finished():
+                continue
+            start = time.perf_counter()
+            resumed = resume_session(store, session_id)
+            timings.append(time.perf_counter() - start)
+            if resumed is None or resumed[0].snapshot() != session.snapshot():
+                raise AssertionError(f"session {session_id} did not resume where it was left")
+    timings.sort()
+
+    def percentile(percent):
+        if not timings:
+            return None
+        return timings[min(len(timings) - 1, len(timings) * percent // 100)] * 1000
+
+    return {
+        "saved": saved,
+        "seconds": elapsed,
+        "saves_per_second": saved / elapsed if elapsed else 0.0,
+        "commits": stats["commits"],
+        "resumed": len(timings),
+        "resume_p50_ms": percentile(50),
+        "resume_p99_ms": percentile(99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure saving and resuming sessions in a session store.")
+    parser.add_argument("path", help="database to use, the bench sessions are left in it")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20, help="lines each bot plays")
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.path, args.sessions, args.turns)
+    print(f"{report['saved']} turns played and saved in {report['seconds']:.2f}s "
+          f"({report['saves_per_second']:.0f}/s) with {report['commits']} commits")
+    if report["resumed"]:
+        print(f"Resumed {report['resumed']} unfinished sessions: p50 {report['resume_p50_ms']:.3f}ms, "
+              f"p99 {report['resume_p99_ms']:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+
+# Description: Explores every game state that can be reached in the Detective and Murderer
+# storylines. Games are played one handler at a time without a terminal, each reachable
+# state is visited once (states are told apart by Game.state_key()), and the explorer
+# reports the shortest way to win, the endings that can be reached, states that can
+# never lead to an ending, input that crashes the game and content nobody can reach.
+#
+# The main menu is left out of the search, it only pauses the game.
+#
+# Usage: python State_Explorer.py [--role detective|murderer] [--json]
+
+
+import argparse
+import json
+import time
+from collections import defaultdict, deque
+
+from Story_Mode import FLAG_RUNNING, NO_STEP, STEPS, Game, unpack_keys
+
+
+ROLES = {"detective": "1", "murderer": "2"}
+
+# The ending that counts as winning for each role
+WINNING_OUTCOMES = {"detective": "correct_arrest", "murderer": "escaped"}
+
+# Answers tried at the first prompt of each turn
+TURN_COMMANDS = {"detective": ("i", "e", "r", "m", "a"), "murderer": ("e", "u", "f", "b")}
+
+# Answers tried at every other prompt, room and tool numbers, Yes/No and the safe code
+ANSWERS = ("1", "2", "3", "4", "5", "6", "yes", "no", "2204")
+
+# Most answers tried in one handler, a prompt that asks again after a bad answer would
+# otherwise be given bad answers for ever
+MAX_ANSWERS = 3
+
+
+# Feeds queued answers to a game and remembers the prompt it was waiting on when they ran out
+class _Answers:
+
+    def __init__(self):
+        self.queue = deque()
+        self.prompt = None
+
+    def __call__(self, prompt=""):
+        if self.queue:
+            return self.queue.popleft()
+        self.prompt = prompt
+        raise EOFError(prompt)
+
+
+# Sets up a game for the role and plays it up to the first turn
+def _start_game(role):
+    answers = _Answers()
+    game = Game(answers, None, history=0)
+    answers.queue.extend((ROLES[role], "Explorer", "s"))
+    while game.snapshot().step != STEPS.index("update"):
+        game.step()
+    return game, answers
+
+
+# Tries every answer sequence the next handler can be given from a snapshot.
+# Yields (kind, answers, detail), where kind is "state" for a new state (detail is its snapshot),
+# "ending" (detail is the outcome) or "crash" (detail is the error)
+def _expand(role, game, answers, snapshot):
+    first_prompt_commands = TURN_COMMANDS[role] if STEPS[snapshot.step] == "update" else ANSWERS
+    pending = [()]
+
+    while pending:
+        given = pending.pop()
+        game.restore(snapshot)
+        answers.queue.clear()
+        answers.queue.extend(given)
+
+        try:
+            game.step()
+
+        # The handler wants another answer, unless it already reached an ending
+        except EOFError:
+            outcomes = game.get_outcomes()
+            if len(outcomes) > snapshot.outcomes:
+                yield "ending", given, outcomes[-1]
+            elif len(given) < MAX_ANSWERS:
+                options = ANSWERS if given else first_prompt_commands
+                pending.extend(given + (option,) for option in reversed(options))
+            continue
+
+        except Exception as exc:
+            yield "crash", given, f"{type(exc).__name__}: {exc}"
+            continue
+
+        child = game.snapshot()
+        if child.step != NO_STEP and child.flags & FLAG_RUNNING:
+            yield "state", given, child
+
+
+# Walks the parent links back to the start and returns the answers that lead to key
+def _path_to(parents, key, last_answers=()):
+    steps = [last_answers]
+    while parents[key] is not None:
+        key, answers = parents[key]
+        steps.append(answers)
+    return [answer for answers in reversed(steps) for answer in answers]
+
+
+# Explores every reachable state for one role and returns a report of what was found
+def explore(role):
+    start_time = time.perf_counter()
+    game, answers = _start_game(role)
+    setup = [ROLES[role], "Explorer", "s"]
+
+    start = game.snapshot()
+    parents = {game.state_key(start): None}
+    reverse_edges = defaultdict(set)
+    finishing = set()  # States with an edge straight to an ending
+    endings = {}
+    crashes = {}
+    frontier = deque([start])
+
+    while frontier:
+        snapshot = frontier.popleft()
+        key = game.state_key(snapshot)
+
+        for kind, given, detail in _expand(role, game, answers, snapshot):
+            if kind == "state":
+                child_key = game.state_key(detail)
+                reverse_edges[child_key].add(key)
+                if child_key not in parents:
+                    parents[child_key] = (key, given)
+                    frontier.append(detail)
+
+            elif kind == "ending":
+                finishing.add(key)
+                # States come off the frontier in breadth first order, so the first path is the shortest
+                if detail not in endings:
+                    endings[detail] = setup + _path_to(parents, key, given)
+
+            elif detail not in crashes:
+                crashes[detail] = setup + _path_to(parents, key, given)
+
+    # Every state that can still reach an ending, found by walking the edges backwards
+    can_finish = set(finishing)
+    pending = list(finishing)
+    while pending:
+        for parent in reverse_edges[pending.pop()]:
+            if parent not in can_finish:
+                can_finish.add(parent)
+                pending.append(parent)
+    dead_ends = [key for key in parents if key not in can_finish]
+
+    return {
+        "role": role,
+        "states": len(parents),
+        "seconds": time.perf_counter() - start_time,
+        "winning_path": endings.get(WINNING_OUTCOMES[role]),
+        "endings": endings,
+        "dead_end_states": len(dead_ends),
+        "dead_end_example": setup + _path_to(parents, dead_ends[0]) if dead_ends else None,
+        "crashes": crashes,
+        "unreachable": _unreachable_content(role, game.get_content(), parents),
+    }
+
+
+# Lists the rooms no reachable state enters, and the clues (Detective) or tools (Murderer)
+# no reachable state has found
+def _unreachable_content(role, content, states):
+    rooms_entered = set()
+    found = set()
+
+    for state in states:
+        rooms_entered.add(state.room)
+        if role == "detective":
+            found.update(key for key in range(state.clues_found.bit_length()) if state.clues_found >> key & 1)
+        else:
+            found.update(unpack_keys(state.tools))
+
+    items = content["clues"] if role == "detective" else content["tools"]
+    return {
+        "rooms_never_entered": [name for index, name in enumerate(content["rooms"])
+                                if index not in rooms_entered],
+        "clues_never_found" if role == "detective" else "tools_never_found":
+            [name for key, name in items.items() if key not in found],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explore every reachable game state.")
+    parser.add_argument("--role", choices=sorted(ROLES), action="append",
+                        help="storyline to explore (default: both)")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args(argv)
+
+    reports = [explore(role) for role in args.role or sorted(ROLES)]
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+
+    for report in reports:
+        print(f"\n- - {report['role'].title()} - -")
+        print(f"{report['states']} states explored in {report['seconds'] * 1000:.0f}ms")
+        if report["winning_path"]:
+            print(f"Shortest win ({len(report['winning_path'])} answers): {' '.join(report['winning_path'])}")
+        else:
+            print("The game cannot be won")
+        for outcome, path in sorted(report["endings"].items()):
+            print(f"- {outcome}: {' '.join(path)}")
+        print(f"States that can never reach an ending: {report['dead_end_states']}")
+        if report["dead_end_example"]:
+            print(f"- e.g. {' '.join(report['dead_end_example'])}")
+        for error, path in report["crashes"].items():
+            print(f"Crash: {error} after {' '.join(path)}")
+        for kind, names in report["unreachable"].items():
+            if names:
+                print(f"{kind.replace('_', ' ').capitalize()}: {', '.join(names)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,19 @@
 
 
 
+import math
+import struct
+import sys
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from collections import deque, namedtuple
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from types import MappingProxyType
+
+from Deduction import Deduction, RuleSet
+from Dialogue import DialogueLibrary, choices_at, line_at
+from World_Loader import load_world
 
 # Abstract base class for different characters in the game
 class Character(ABC):
@@ -18,624 +30,1429 @@ class Character(ABC):
     Character class. The Suspect and Witness subclasses then implement this
     abstract method with specific actions that demonstrate polymorphism. """
 
-    # Construct initialising name, dialogue, and interacted status
-    def __init__(self, name, dialogue):
+    # Characters are created for every game, so they only keep room for these attributes.
+    # The name and dialogue are the strings shared by every game through the world tables
+    __slots__ = ("_name", "_dialogue", "_tree", "_heard")
+
+    # Construct initialising name, the line said by characters without a dialogue tree,
+    # the id of the character's dialogue tree and the line the player has heard
+    def __init__(self, name, dialogue, tree=None):
         # Even in abstract classes we see encapsulation  as before.
         self._name = name
         self._dialogue = dialogue
-        self._interacted = False
+        self._tree = tree
+        self._heard = None
 
     @abstractmethod  # Declares an abstract method using a decorator.
-    def perform_action(self):
+    def perform_action(self, output=print):
         pass  # Abstract methods never contain any actual logic. The
         # transfer statement "pass" allows for this.
 
     # An abstract class must contain at least one abstract method.
     # However, "normal" methods may also be contained.
-    # Method to handle interaction with the character
-    def interact(self):
-        if not self._interacted:
-            interaction = f"{self._name}: {self._dialogue}"
-            self._interacted = True
-        else:
-            interaction = f"{self._name} is no longer interested in talking."
-
-        return interaction
-
-# Subclass of Character representing a BarMan
-class BarMan(Character):
-    def __init__(self, name, dialogue):
-        super().__init__(name, dialogue)
-
-    # Method to return the name barman
+    # Method to return the character's name
     def get_name(self):
         return self._name
 
-    # Overrides interact method to include a print statement
-    def interact(self):
-        if not self._interacted:
-            interaction = f"{self._name}: {self._dialogue}"
-            self._interacted = True
-        else:
-            interaction = f"{self._name} is no longer interested in talking."
+    # Method to handle interaction with the character, who says line (or their fixed dialogue)
+    # unless the player has already heard it. Returns True if the line was said
+    def interact(self, output=print, line=None):
+        line = self._dialogue if line is None else line
+        if self._heard == line:
+            output(f"{self._name} is no longer interested in talking.")
+            return False
+
+        output(f"{self._name}: {line}")
+        self._heard = line
+        return True
 
-        print(interaction)
+# Subclass of Character representing a BarMan
+class BarMan(Character):
+    __slots__ = ()
 
     # Implementation of the performance_action abstract method
-    def perform_action(self):
-        print(f"Bar Man {self._name} is busy serving drinks.")
+    def perform_action(self, output=print):
+        output(f"Bar Man {self._name} is busy serving drinks.")
 
 # Subclass of Character representing Boyfriend
 class Boyfriend(Character):
-    def __init__(self, name, dialogue):
-        super().__init__(name, dialogue)
-
-    def get_name(self):
-        return self._name
+    __slots__ = ()
 
     def re_interact(self):
-        self._interacted = False
-
-    def interact(self):
-        if not self._interacted:
-            interaction = f"{self._name}: {self._dialogue}"
-            self._interacted = True
-        else:
-            interaction = f"{self._name} is no longer interested in talking."
+        self._heard = None
 
-        print(interaction)
-
-    def perform_action(self):
-        print (f"{self._name} is anxiously waiting for updates on the situation.")
+    def perform_action(self, output=print):
+        output(f"{self._name} is anxiously waiting for updates on the situation.")
 
 # Subclass of Character representing Ex-Best friend
 class ExBestFriend(Character):
+    __slots__ = ()
 
-    def __init__(self, name, dialogue):
-        super().__init__(name, dialogue)
+    def perform_action(self, output=print):
 
-    def get_name(self):
-        return self._name
-
-    def interact(self):
-        if not self._interacted:
-            interaction = f"{self._name}: {self._dialogue}"
-            self._interacted = True
-        else:
-            interaction = f"{self._name} is no longer interested in talking."
-
-        print(interaction)
-
-    def perform_action(self):
-
-        print( f"{self._name} is trying to recall the last time they saw the victim.")
+        output(f"{self._name} is trying to recall the last time they saw the victim.")
 
 
 # Subclass of Character representing Receptionist
 class Receptionist(Character):
+    __slots__ = ()
 
-    def __init__(self, name, dialogue):
-        super().__init__(name, dialogue)
-
-    def get_name(self):
-        return self._name
-
-    def interact(self):
-        if not self._interacted:
-            interaction = f"{self._name}: {self._dialogue}"
-            self._interacted = True
-        else:
-            interaction = f"{self._name} is no longer interested in talking."
+    def perform_action(self, output=print):
+        output(f"Hotel Receptionist {self._name} is busy handling guests at the lodge entrance.")
 
-        print(interaction)
 
-    def perform_action(self):
-        print (f"Hotel Receptionist {self._name} is busy handling guests at the lodge entrance.")
-
-
-# Definition of a Clue Class
+# Definition of a Clue Class.
+# Clues, tools and rooms never change, so one set of them is shared by every game
 class Clue:
+    __slots__ = ("key", "name", "description")
 
-    # Construct initialising name and description of a clue
-    def __init__(self, name, description):
+    # Construct initialising the key, name and description of a clue
+    def __init__(self, name, description, key=None):
+        self.key = key
         self.name = name
         self.description = description
 
 
-# Definition of a Tool Class
+# Splits text into the lower case words that clues can be searched by
+def clue_words(text):
+    import re  # Only needed once a player searches, so starting the game does not wait for it
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+# The clues a Detective has found, in the order they were found.
+# Checking whether a clue is in the journal takes the same time however many there are, and
+# searches use the word index of the world's clues instead of reading every clue
+class ClueJournal:
+    __slots__ = ("_clues", "_positions")
+
+    # Constructor taking the clues already found, in order
+    def __init__(self, clues=()):
+        self._clues = []  # Clues in the order they were found
+        self._positions = {}  # Clue key to its position in _clues
+        for clue in clues:
+            self.add(clue)
+
+    # Method to add a clue, returns False if it was already in the journal
+    def add(self, clue):
+        if clue.key in self._positions:
+            return False
+        self._positions[clue.key] = len(self._clues)
+        self._clues.append(clue)
+        return True
+
+    def __contains__(self, clue):
+        return clue.key in self._positions
+
+    def __len__(self):
+        return len(self._clues)
+
+    def __iter__(self):
+        return iter(self._clues)
+
+    # Method to return the found clues whose name or description has every word of keywords,
+    # in the order they were found. word_index maps a word to the keys of the clues using it
+    def search(self, keywords, word_index):
+        matches = None
+        for word in clue_words(keywords) if keywords.strip() else ():
+            positions = {self._positions[key] for key in word_index.get(word, ()) if key in self._positions}
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return []
+        if matches is None:
+            return list(self._clues)
+        return [self._clues[position] for position in sorted(matches)]
+
+
+# Definition of a Tool Class.
+# Whether a tool has been found is kept by each game, not by the shared tool
 class Tool:
+    __slots__ = ("key", "name", "description")
 
-    # Constructor initialising name, description, and found status of the tool
-    def __init__(self, name, description):
+    # Constructor initialising the key, name and description of the tool
+    def __init__(self, name, description, key=None):
+        self.key = key
         self.name = name
         self.description = description
-        self.found = False
-
-    # Method to set the tool as found
-    def add_tool(self):
-        self.found = True
 
 
-# Definition of a Room Class
+# Definition of a Room Class.
+# Whether a room has been examined is kept by each game, not by the shared room
 class Room:
+    __slots__ = ("name", "description")
 
-    # Construct initialising name, description, and examined status
+    # Construct initialising name and description
     def __init__(self, name, description):
-        self._examined = False
         self.name = name
         self.description = description
 
-    # Method to set the room as examined
-    def examine(self):
-        self._examined = True
-
-    # Method to check if the room has been examined
-    def examined(self):
-        return self._examined
 
-    def not_examined(self):
-        self._examined = False
+# The Room objects of a world, in room number order. Each one is made the first time it is
+# needed and then shared, so big worlds do not build thousands of rooms nobody enters
+class LazyRooms(Sequence):
+    __slots__ = ("_rooms", "_made")
+
+    # Constructor taking the world's (name, description) pairs
+    def __init__(self, rooms):
+        self._rooms = rooms
+        self._made = {}
+
+    def __getitem__(self, number):
+        room = self._made.get(number)
+        if room is None:
+            room = self._made[number] = Room(*self._rooms[number])
+        return room
+
+    def __len__(self):
+        return len(self._rooms)
+
+
+# The Clue or Tool objects of a world by key, made the first time each one is needed
+class LazyTable(Mapping):
+    __slots__ = ("_entries", "_make", "_made")
+
+    # Constructor taking the world's table of (name, description) pairs and the class to make
+    def __init__(self, entries, make):
+        self._entries = entries
+        self._make = make
+        self._made = {}
+
+    def __getitem__(self, key):
+        item = self._made.get(key)
+        if item is None:
+            name, description = self._entries[key]
+            item = self._made[key] = self._make(name, description, key)
+        return item
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+
+# Everything about a world that games only read, shared by every game played in it:
+# the Room, Clue and Tool objects, the keys of the clues using each word, the bit of each
+# character in snapshots (and the keys in bit order), the world's dialogue trees, the
+# Murderer's tables built by build_forward_table(), build_murderer_actions() and
+# tool_effects(), the compiled rules of the Detective's case and the Timetable of the
+# characters that walk around
+Content = namedtuple("Content", "rooms clues tools clue_index character_bits character_keys "
+                                "dialogues forward_table murderer_actions tool_effects rule_set timetable")
+
+
+# Builds the word index of a world's clues, mapping each word to the keys of the clues using it
+def build_clue_index(clues):
+    index = {}
+    for key, (name, description) in clues.items():
+        for word in set(clue_words(name)) | set(clue_words(description)):
+            index.setdefault(sys.intern(word), []).append(key)
+    return MappingProxyType({word: tuple(keys) for word, keys in index.items()})
+
+
+# The word index of a world's clues, only built the first time a player searches
+class ClueIndex:
+    __slots__ = ("_clues", "_index")
+
+    def __init__(self, clues):
+        self._clues = clues
+        self._index = None
+
+    # Method to return the keys of the clues using word
+    def get(self, word, default=()):
+        if self._index is None:
+            self._index = build_clue_index(self._clues)
+        return self._index.get(word, default)
+
+
+# Where the characters with routines are on each turn. Their routines repeat, so where each one
+# is follows from the turn number alone and nothing has to be moved from turn to turn. Each room
+# knows which characters' routines pass through it, so finding who is in the player's room only
+# looks at those, and a turn costs the same however many characters walk around the world
+class Timetable:
+    __slots__ = ("_routines", "_visitors", "cycle")
+
+    # Constructor taking the world's routines and the bit of each character, which orders them
+    def __init__(self, routines, character_bits):
+        self._routines = {}  # Character key to its stops, the turn each starts on and the turns of a round
+        visitors = {}
+        for key, stops in routines.items():
+            starts = []
+            cycle = 0
+            for _, turns, _ in stops:
+                starts.append(cycle)
+                cycle += turns
+            self._routines[key] = (stops, tuple(starts), cycle)
+            for room in {stop[0] for stop in stops}:
+                visitors.setdefault(room, []).append(key)
+        self._visitors = {room: tuple(sorted(keys, key=character_bits.__getitem__))
+                          for room, keys in visitors.items()}
+        # Turns after which every character is back at the start of their routine
+        self.cycle = math.lcm(*(cycle for _, _, cycle in self._routines.values()))
+
+    def __len__(self):
+        return len(self._routines)
+
+    # Method to return the (room, turns, action) stop a character is at on a turn
+    def stop(self, key, turn):
+        stops, starts, cycle = self._routines[key]
+        return stops[bisect_right(starts, turn % cycle) - 1]
+
+    # Method to return the keys of the characters whose routines have them in a room on a turn
+    def in_room(self, room, turn):
+        return [key for key in self._visitors.get(room, ()) if self.stop(key, turn)[0] == room]
+
+# Content already built, keyed by the id of its world (the world is kept so the id stays taken)
+_shared_content = {}
+
+
+# Returns the shared content of a world, building it the first time.
+# The Room, Clue and Tool objects themselves are only made once they are needed
+def shared_content(world):
+    cached = _shared_content.get(id(world))
+    if cached is not None and cached[0] is world:
+        return cached[1]
+
+    room_count = len(world.rooms)
+    forward_table = build_forward_table(room_count, world.story)
+    character_bits = MappingProxyType({key: bit for bit, key in enumerate(world.characters)})
+    content = Content(
+        LazyRooms(world.rooms),
+        LazyTable(world.clues, Clue),
+        LazyTable(world.tools, Tool),
+        ClueIndex(world.clues),
+        character_bits,
+        tuple(world.characters),
+        DialogueLibrary(world.dialogues),
+        forward_table,
+        build_murderer_actions(room_count, world.story, forward_table),
+        MappingProxyType(tool_effects(world.story)),
+        RuleSet(world.case.rules),
+        Timetable(world.routines, character_bits))
+    _shared_content[id(world)] = (world, content)
+    return content
+
+
+# Drops the shared content of a world that no new games will be played in, such as a location
+# evicted from a Location_Pack.LocationPack. Games already playing it keep their own references
+def release_content(world):
+    cached = _shared_content.get(id(world))
+    if cached is not None and cached[0] is world:
+        del _shared_content[id(world)]
+
+
+# Character classes that a world file can name
+CHARACTER_CLASSES = {"BarMan": BarMan, "Boyfriend": Boyfriend, "ExBestFriend": ExBestFriend,
+                     "Receptionist": Receptionist}
+
+
+# Turns an input source into a function that takes a prompt and returns the answer.
+# A source can be a function such as the built-in input() or any iterable of answers,
+# running out of scripted answers raises EOFError just like input() does at end of file
+def make_input(source):
+    if callable(source):
+        return source
+
+    answers = iter(source)
+
+    def read(prompt=""):
+        for answer in answers:
+            return answer
+        raise EOFError("No more input")
+
+    return read
+
+
+# Turns an output sink into a function that takes one line of text.
+# A sink can be a function such as print(), a list to collect the lines in,
+# or None to throw all output away
+def make_output(sink):
+    if sink is None:
+        return lambda text: None
+
+    if isinstance(sink, list):
+        return sink.append
+
+    return sink
+
+
+# Collects the lines a step writes and sends them to the terminal in one write,
+# together with the prompt of the next question, instead of one write per line
+class Renderer:
+
+    # Constructor, stream defaults to sys.stdout and read is called to get each answer
+    def __init__(self, stream=None, read=input):
+        self.__stream = stream
+        self.__read = read
+        self.__lines = []
+
+    # Output function given to the game
+    def __call__(self, text):
+        self.__lines.append(text)
+
+    # Method to write the collected lines, followed by prompt, in one write
+    def flush(self, prompt=""):
+        if not self.__lines and not prompt:
+            return
+        text = "\n".join(self.__lines) + "\n" if self.__lines else ""
+        self.__lines.clear()
+        stream = self.__stream if self.__stream is not None else sys.stdout
+        stream.write(text + prompt)
+        stream.flush()
+
+    # Input function given to the game, shows everything written so far before asking
+    def input(self, prompt=""):
+        self.flush(prompt)
+        return self.__read()
+
+
+# Clues shown at a time when reviewing them
+CLUE_PAGE_SIZE = 20
+
+# Lines the game writes over and over, filled in by render()
+START_ROOM = "You Enter {0.name}. {0.description}"
+ENTER_ROOM = "You enter the {0.name}. Description: {0.description}"
+WALK_INTO_ROOM = "You enter the {0.name}. Description:{0.description}"
+NUMBERED_ROOM = "{0}. {1.name}"
+NUMBERED_TOOL = "{0}. {1.name}: {1.description}"
+NUMBERED_NAME = "{0}.{1}"
+FOUND_ITEM = "You found a {0.name}"
+CLUE_DETAILS = "{0.name}: {0.description}"
+ROUTINE_ACTION = "{0} {1}"
+WALKS_IN = "{0} walks in."
+LEAVES_ROOM = "{0} leaves the room."
+
+
+# Fills in a template. Rooms, clues and tools are shared by every game, so the
+# finished lines are kept and handed out again instead of being formatted each time
+@lru_cache(maxsize=1024)
+def render(template, *values):
+    return template.format(*values)
+
+
+# Names of the Game handlers that can run next, a snapshot stores the position in this tuple
+STEPS = ("new_game", "main_menu", "start_game", "update", "move_to_room", "interact_with_characters",
+         "examine_room", "move_forward", "move_back", "use_tool", "review_clues", "escape",
+         "caught", "arrest", "continue_game")
+
+# Step number stored for a game that has finished
+NO_STEP = 255
+
+# Bits of GameSnapshot.flags
+FLAG_RUNNING = 1
+FLAG_GAME_STARTED = 2
+FLAG_SAFE_OPENED = 4
+FLAG_VALERIE_DEAD = 8
+FLAG_VALERIE_CHOKED = 16
+FLAG_FLASHLIGHT = 32
+FLAG_CAR_USED = 64
+
+# Conditions that decide what the Murderer can do, as bits
+HAS_KNIFE = 1
+WOODS_LIT = 2
+VALERIE_DOWN = 4  # Valerie has been stabbed or poisoned
+VALERIE_DEAD = 8  # Valerie has been stabbed
+CONDITION_COMBINATIONS = 16
+
+# Messages shown when the Murderer cannot move forward, by the condition the room needs.
+# Nothing lets the Murderer leave the escape room forwards
+GATE_MESSAGES = {
+    HAS_KNIFE: "You need to find a weapon before continuing",
+    WOODS_LIT: "The woods are too dark to navigate,you need to use a flashlight",
+    VALERIE_DOWN: "You decide to wait for Valerie, maybe you can use one of your tools while she is gone",
+    0: "You cannot move forward a room",
+}
+
+
+# Returns the rooms of a story that the Murderer cannot leave forwards until a condition holds
+def forward_gates(story):
+    return {story.murderer_start: HAS_KNIFE, story.woods: WOODS_LIT, story.bar: VALERIE_DOWN, story.escape: 0}
+
+
+# Returns what a tool does when used in a room of a story, keyed by (room, tool key),
+# with the conditions it needs
+def tool_effects(story):
+    return {
+        (story.porta_potty, story.knife): ("stab", 0),
+        (story.woods, story.flashlight): ("light", 0),
+        (story.bar, story.berry): ("spike", 0),
+        (story.escape, story.car_keys): ("drive", VALERIE_DOWN),
+    }
+
+
+# Builds the Murderer's forward moves, one row per room with an entry for every combination of
+# conditions. Each entry is (message, None) when the way is blocked or (None, rooms to move by).
+# Rooms with nothing special about them share one row, so big worlds stay small
+def build_forward_table(room_count, story):
+    gates = forward_gates(story)
+    plain_row = ((None, -1),) * CONDITION_COMBINATIONS
+    rows = {}
+    table = []
+    for room in range(room_count):
+        needed = gates.get(room)
+        if needed is None and room != story.porta_potty + 1:
+            table.append(plain_row)
+            continue
+        row = []
+        for conditions in range(CONDITION_COMBINATIONS):
+            if needed is not None and (not needed or not conditions & needed):
+                row.append((GATE_MESSAGES[needed], None))
+            # Once Valerie has been dealt with the Murderer walks straight past the Porta-Potty
+            elif room == story.porta_potty + 1 and conditions & VALERIE_DOWN:
+                row.append((None, -2))
+            else:
+                row.append((None, -1))
+        row = tuple(row)
+        table.append(rows.setdefault(row, row))
+    return tuple(table)
+
+
+# Builds the index of what the Murderer can do in every room under every combination of
+# conditions, apart from examining which depends on the room. Each entry is
+# (can move forward, can move back, keys of the tools that do something), looked up as
+# index[room][conditions]. Like the forward table, identical rows are shared
+def build_murderer_actions(room_count, story, forward_table):
+    effects_by_room = {}
+    for (effect_room, tool_key), (effect, needed) in tool_effects(story).items():
+        effects_by_room.setdefault(effect_room, []).append((tool_key, effect, needed))
+
+    rows = {}
+    index = []
+    for room in range(room_count):
+        # Most rooms have nothing to use and share their forward row, so share this row too
+        shared = (forward_table[room], room == story.murderer_start) if room not in effects_by_room else None
+        if shared in rows:
+            index.append(rows[shared])
+            continue
+        row = []
+        for conditions in range(CONDITION_COMBINATIONS):
+            usable = []
+            for tool_key, effect, needed in effects_by_room.get(room, ()):
+                if conditions & needed != needed:
+                    continue
+                if effect == "stab" and conditions & VALERIE_DEAD:
+                    continue
+                usable.append(tool_key)
+            can_move_forward = forward_table[room][conditions][1] is not None
+            row.append((can_move_forward, room != story.murderer_start, tuple(usable)))
+        row = tuple(row)
+        if shared is not None:
+            rows[shared] = row
+        index.append(row)
+    return tuple(index)
+
+
+# What a game reports when it reaches an ending: the role played ("detective" or "murderer"),
+# the ending (see Game.get_outcomes()), the commands carried out to reach it, the clues found,
+# the tools used to some effect and how many more times the Murderer could have been seen
+# before being caught, or -1 once killing Valerie has made catching the Murderer impossible
+OutcomeEvent = namedtuple("OutcomeEvent", "role ending turns clues tools caught")
+
+# The parts of a game that decide how it plays from here on (see GameSnapshot.state_key()):
+# clues_found has bit k set for clue key k, and turn is where the game is in the routines' cycle
+StateKey = namedtuple("StateKey", "step role room caught flags rooms_examined clues_found tools talked turn")
+
+
+# Immutable record of everything needed to carry on a game later.
+# Sets of rooms and characters are bitmasks, and the clues and tools found are stored as
+# their keys in the order they were found, packed by pack_keys()
+class GameSnapshot(namedtuple("GameSnapshot", "step role room caught flags rooms_examined interacted talked "
+                                              "clues tools outcomes turns name")):
+    __slots__ = ()
+
+    # Bumped whenever the byte layout changes, bytes of another version cannot be read
+    VERSION = 3
+
+    # Fixed size part of the byte layout: step, role, room, caught, flags, outcomes and turns.
+    # Endings get 32 bits like turns, a session hosted for long can end more than 65535 games.
+    # The bitmasks and packed keys follow, each as its length in bytes and then the
+    # number, and the player's name ends it as UTF-8
+    LAYOUT = struct.Struct("<BBHbBII")
+    NUMBER_LENGTH = struct.Struct("<I")
+
+    # Method to pack the snapshot into bytes
+    def to_bytes(self):
+        parts = [self.LAYOUT.pack(self.step, self.role, self.room, self.caught, self.flags, self.outcomes,
+                                  self.turns)]
+        for number in (self.rooms_examined, self.interacted, self.talked, self.clues, self.tools):
+            length = (number.bit_length() + 7) // 8
+            parts.append(self.NUMBER_LENGTH.pack(length))
+            parts.append(number.to_bytes(length, "little"))
+        parts.append(self.name.encode("utf-8"))
+        return b"".join(parts)
+
+    # Method to return the parts of the snapshot that decide how the game plays from here on as a
+    # StateKey of small integers, so two games with equal keys behave the same. What only changes the
+    # text shown is left out: the player's name, the order clues were found in, whose latest line
+    # was heard and the endings already reached. Who was talked to can decide the case, talks_watched
+    # has the bits of the characters the case's rules wait on being talked to and only those are
+    # kept. The turns taken only matter in a world where characters walk around, where cycle is
+    # the Timetable's cycle and the key holds where in it the game is, otherwise turn is 0
+    def state_key(self, cycle=0, talks_watched=-1):
+        clues_found = 0
+        for key in unpack_keys(self.clues):
+            clues_found |= 1 << key
+        return StateKey(self.step, self.role, self.room, self.caught, self.flags, self.rooms_examined,
+                        clues_found, self.tools, self.talked & talks_watched, self.turns % cycle if cycle else 0)
+
+    # Method to unpack a snapshot from bytes made by to_bytes()
+    @classmethod
+    def from_bytes(cls, data):
+        step, role, room, caught, flags, outcomes, turns = cls.LAYOUT.unpack_from(data)
+        offset = cls.LAYOUT.size
+        numbers = []
+        for _ in range(5):
+            (length,) = cls.NUMBER_LENGTH.unpack_from(data, offset)
+            offset += cls.NUMBER_LENGTH.size
+            numbers.append(int.from_bytes(data[offset:offset + length], "little"))
+            offset += length
+        rooms_examined, interacted, talked, clues, tools = numbers
+        return cls(step, role, room, caught, flags, rooms_examined, interacted, talked, clues, tools, outcomes, turns,
+                   bytes(data[offset:]).decode("utf-8"))
+
+
+# Packs a sequence of keys into one integer, sixteen bits each (key + 1, so 0 ends the list)
+def pack_keys(keys):
+    packed = 0
+    for position, key in enumerate(keys):
+        packed |= (key + 1) << (position * 16)
+    return packed
+
+
+# Unpacks the keys packed by pack_keys(), in their original order
+def unpack_keys(packed):
+    keys = []
+    while packed:
+        keys.append((packed & 0xFFFF) - 1)
+        packed >>= 16
+    return keys
+
+
+# Raised inside a chain of commands when a command asks a question the line has no answer for
+class _OutOfAnswers(Exception):
+    pass
 
 
 # Main Class for the Game
 class Game:
 
-    # Constructor initialising game states and attributes
-    def __init__(self):
+    # Constructor initialising game states and attributes.
+    # input_source and output can be swapped out to run the game without a terminal,
+    # history is how many turns rewind() can go back, world is the content to play,
+    # as returned by World_Loader.load_world(), instrumentation is an optional
+    # Instrumentation.Instrumentation that times this game's handlers, input and output,
+    # journal is an optional Journal.Journal that records the session for replaying, and events
+    # is an optional function called with an OutcomeEvent for every ending reached
+    def __init__(self, input_source=input, output=print, history=0, world=None, instrumentation=None,
+                 journal=None, events=None):
+
+        # Where the game reads answers from and writes text to
+        self.__input = make_input(input_source)
+        self.__write = make_output(output)
+        self.__quiet = output is None  # Nothing is shown, so nothing needs formatting
+        self.__renderer = output if isinstance(output, Renderer) else None
+        self.__world = world if world is not None else load_world()
+
+        # The journal records the answers as the game reads them
+        self.__journal = journal
+        if journal is not None:
+            self.__input = journal.wrap_input(self.__input)
+
+        # Timed versions of the handlers replace the methods on this game only,
+        # so games without instrumentation run exactly as before
+        self.__instrumentation = instrumentation
+        if instrumentation is not None:
+            self.__input = instrumentation.wrap_input(self.__input)
+            self.__write = instrumentation.wrap_output(self.__write)
+            for name in STEPS:
+                setattr(self, name, instrumentation.wrap_action(name, getattr(self, name)))
+            # Output given to a Renderer is only written when it flushes
+            if self.__renderer is not None:
+                self.__renderer.flush = instrumentation.wrap_flush(self.__renderer.flush)
+
+        # Answers left from a line of chained commands, given to the game before the player is asked
+        self.__chained = deque()
+        self.__chain_outcomes = None  # Endings reached before the chain being run, None outside one
+        self.__chain_write = None  # Where the text of a chain goes, None outside one
+        self.__held = []  # Text of the chained command being run, shown once it has run
+        self.__read = self.__input
+        self.__input = self.__next_answer
+
+        # Told about every ending reached
+        self.__events = events
 
         # Initialising various attributes related to game state
         self.__running = True  # Indicates if the game is running
+        self.__next_step = self.new_game  # The handler to run next
         self.__game_started = False  # Flag to check if the game has started
         self.__characters_interacted = False  # Ensures there is no double interactions
         self.__room_examined = False  # Flag for room examination status
         self.__game_choice = ""  # Detective = 1 Murderer = 2
         self.__tool_found = False
+        self.current_room = 0  # Index of the room the player is in
         self.__name = ""  # Players character name
         self.__role = ""  # Player's role in the game
-        self.__bar_man = None
-        self.__boyfriend = None
-        self.__ex_bestfriend = None
-        self.__receptionist = None
+        self.__people = {}  # Characters met so far, by key, created when they are first needed
+        self.__talked = 0  # Bits of the characters talked to
         self.__girlfriend = None
         self.__safe_opened = False
         self.__caught = 3  # Counter for the player being caught
+        self.__turns = 0  # Commands carried out since the game started
         self.__valerie_dead = False  # Flag to check if the Valerie is dead
         self.__valerie_choked = False
         self.__flashlight = False
-        self.__berry2 = False
+        self.__car_used = False
 
-        # List to store clues that have been examined
-        self.__examined_clues = []
+        # Journal of the clues that have been examined
+        self.__examined_clues = ClueJournal()
+        # What the Detective has worked out from the clues found and the people talked to,
+        # made once the world's rules are loaded below
+        self.__deduction = None
         # List to store tools that have been found
         self.__examined_tools = []
+        # Endings reached so far, e.g. "escaped", "caught", "correct_arrest" or "wrong_arrest"
+        self.__outcomes = []
 
-        # Mapping locations to tools available in those locations
-        self.__lodge_rooms_tools = {
+        # Snapshots taken at the start of each turn for rewind(), and the named save slots
+        self.__history = deque(maxlen=history + 1) if history else None
+        self.__save_slots = {}
 
-            # TOOLS FOR LODGE
-            "Lonely Lodge": {
-                # Mapping room numbers to Tool objects
-                5: Tool("Kitchen knife","A perfect weapon for murdering"),
-                4: Tool("Flashlight","Can be used in dark places"),
-                3: Tool("Poisonous berry","Can be used to spike drinks"),
-                0: Tool("Car keys","Keys to a strangers car")
-            },
+        # Mapping locations to tools available in those locations,
+        # the Room, Clue and Tool objects are shared by every game in the same world
+        content = shared_content(self.__world)
+        self.__location = self.__world.location
+        self.__lodge_rooms_tools = {
+            # Mapping room numbers to Tool objects
+            self.__location: content.tools,
         }
 
         # Mapping locations to clues available in those locations
         self.__lodge_rooms_clues = {
-            # CLUES FOR LODGE
-            "Lonely Lodge": {
-                # Mapping room numbers to Clue objects
-                1: Clue("Dead body of Valerie(Girlfriend)","Found in the Porta Potty with visible stab wounds."),
-                2: Clue("Bracelet","Found on the Bar floor with a 4 digit number with 1 number illegible 22*4. "
-                                   "Maybe John(Boyfriend) could know about it?"),
-                3: Clue("Number of Footprints","Found in the woods leading back to the lodge."),
-                5: Clue("Safe","Found in the Couple's Room, examine the room again to enter 4 digit code."),
-                6: Clue("Bloody Knife","Found in the couple's room inside a safe.")
-            },
+            # Mapping room numbers to Clue objects
+            self.__location: content.clues,
         }
 
-        # List of Room objects for the Lonely Lodge
-        self.__lodge_rooms = [
-            # 0
-            Room("Slippery Slope", "The party takes place here."),
-            # 1
-            Room("Porta-Potty", "A Tightly confined cubicle."),
-            # 2
-            Room("Bar", "An old fashioned Bar."),
-            # 3
-            Room("Woods", "Dark and mysterious."),
-            # 4
-            Room("Lonely Lodge", "A cosy and warm welcoming lodge."),
-            # 5
-            Room("The Couple's Room", "A nice spacious room.")
-
-            ]
+        # Rooms of the location, in room number order
+        self.__lodge_rooms = content.rooms
+
+        # Where the storylines happen in this world, and the tables built from it
+        self.__content = content
+        self.__story = self.__world.story
+        self.__deduction = Deduction(content.rule_set)
+        # Bits of the characters whose talks the case's rules wait on, see GameSnapshot.state_key()
+        watched = content.rule_set.watchers
+        self.__talks_watched = -1 if "talked *" in watched else sum(
+            1 << bit for key, bit in content.character_bits.items() if f"talked {key}" in watched)
+
+        # What this game has done to the shared content, as bits by room number and tool key
+        self.__rooms_examined = 0
+        self.__tools_found = 0
 
     # Method to start running the Game
     def run(self):
 
+        # Every handler returns the next handler to call instead of calling it,
+        # so the stack stays flat however many turns are played
+        try:
+            while self.step():
+                pass
+
+        # The input ran out, so there is nobody left to play
+        except EOFError:
+            self.__running = False
+
+        # Keep the answers that led to a crash in the journal
+        except Exception:
+            if self.__journal is not None:
+                self.__journal.end_step()
+            raise
+
+        finally:
+            if self.__renderer is not None:
+                self.__renderer.flush()
+            if self.__instrumentation is not None:
+                self.__instrumentation.session_end()
+
+    # Method to run the next handler, returns False once the game is over
+    def step(self):
+        if not self.__running or self.__next_step is None:
+            return False
+
+        # Remember how every turn started so it can be rewound
+        starting_turn = self.__next_step.__name__ == "update"
+        if self.__history is not None and starting_turn:
+            self.__history.append(self.snapshot())
+        if self.__journal is not None:
+            self.__journal.begin_step(self.snapshot if starting_turn else None)
+
+        outcomes = len(self.__outcomes)
+        self.__next_step = self.__next_step()
+        # Endings are only told about once the step that reached them has finished
+        if self.__events is not None and len(self.__outcomes) > outcomes:
+            for ending in self.__outcomes[outcomes:]:
+                self.__events(self.__outcome_event(ending))
+        if self.__journal is not None:
+            self.__journal.end_step()
+        if self.__renderer is not None:
+            self.__renderer.flush()
+        return self.__running and self.__next_step is not None
+
+    # Method to take a snapshot of the game between two steps
+    def snapshot(self):
+        flags = ((FLAG_RUNNING if self.__running else 0)
+                 | (FLAG_GAME_STARTED if self.__game_started else 0)
+                 | (FLAG_SAFE_OPENED if self.__safe_opened else 0)
+                 | (FLAG_VALERIE_DEAD if self.__valerie_dead else 0)
+                 | (FLAG_VALERIE_CHOKED if self.__valerie_choked else 0)
+                 | (FLAG_FLASHLIGHT if self.__flashlight else 0)
+                 | (FLAG_CAR_USED if self.__car_used else 0))
+
+        # Who has been talked to is kept apart from whose latest line was heard: a character
+        # with something new to say is as good as not talked to, but what they said is still known
+        interacted = 0
+        character_bits = self.__content.character_bits
+        for key, character in self.__people.items():
+            if character._heard is not None and character._heard == self.__opening_line(character):
+                interacted |= 1 << character_bits[key]
+
+        return GameSnapshot(
+            STEPS.index(self.__next_step.__name__) if self.__next_step is not None else NO_STEP,
+            int(self.__game_choice) if self.__game_choice in ("1", "2") else 0,
+            self.current_room, self.__caught, flags, self.__rooms_examined, interacted, self.__talked,
+            pack_keys(clue.key for clue in self.__examined_clues),
+            pack_keys(tool.key for tool in self.__examined_tools),
+            len(self.__outcomes), self.__turns, self.__name)
+
+    # Method to put the game back into the state of a snapshot.
+    # Endings reached after the snapshot was taken are forgotten
+    def restore(self, snapshot):
+        self.__restore_state(snapshot)
+        if self.__journal is not None:
+            self.__journal.restored(snapshot)
+
+    # Method to put the game back into the state of a snapshot without telling the journal,
+    # for undoing part of a step that replaying the journal undoes the same way
+    def __restore_state(self, snapshot):
+        clues = self.__lodge_rooms_clues[self.__location]
+        tools = self.__lodge_rooms_tools[self.__location]
+
+        self.__next_step = getattr(self, STEPS[snapshot.step]) if snapshot.step != NO_STEP else None
+        self.__game_choice = str(snapshot.role) if snapshot.role else ""
+        self.__role = {"1": "Detective", "2": "Murderer"}.get(self.__game_choice, "")
+        self.__name = snapshot.name
+        self.current_room = snapshot.room
+        self.__caught = snapshot.caught
+        self.__turns = snapshot.turns
+
+        self.__running = bool(snapshot.flags & FLAG_RUNNING)
+        self.__game_started = bool(snapshot.flags & FLAG_GAME_STARTED)
+        self.__safe_opened = bool(snapshot.flags & FLAG_SAFE_OPENED)
+        self.__valerie_dead = bool(snapshot.flags & FLAG_VALERIE_DEAD)
+        self.__valerie_choked = bool(snapshot.flags & FLAG_VALERIE_CHOKED)
+        self.__flashlight = bool(snapshot.flags & FLAG_FLASHLIGHT)
+        self.__car_used = bool(snapshot.flags & FLAG_CAR_USED)
+
+        self.__rooms_examined = snapshot.rooms_examined
+        self.__examined_clues = ClueJournal(clues[key] for key in unpack_keys(snapshot.clues))
+        self.__examined_tools = [tools[key] for key in unpack_keys(snapshot.tools)]
+        self.__tools_found = 0
+        for tool in self.__examined_tools:
+            self.__tools_found |= 1 << tool.key
+
+        character_keys = self.__content.character_keys
+        self.__talked = snapshot.talked
+        talked = [character_keys[bit] for bit in range(snapshot.talked.bit_length()) if snapshot.talked >> bit & 1]
+
+        # The deductions follow from the clues and talks, so they are worked out again
+        self.__deduction = Deduction(self.__content.rule_set, [f"clue {clue.key}" for clue in self.__examined_clues]
+                                     + [f"talked {key}" for key in talked])
+
+        # Only the characters whose latest line was heard need creating, the rest are met as before
+        self.__people = {}
+        for bit in range(snapshot.interacted.bit_length()):
+            if snapshot.interacted >> bit & 1:
+                character = self.__character(character_keys[bit])
+                character._heard = self.__opening_line(character)
+
+        del self.__outcomes[snapshot.outcomes:]
+
+    # Method to keep the current state in a named save slot
+    def save(self, slot):
+        self.__save_slots[slot] = self.snapshot()
+
+    # Method to carry on from a save slot, returns False if the slot is empty
+    def load(self, slot):
+        if slot not in self.__save_slots:
+            return False
+        self.restore(self.__save_slots[slot])
+        return True
+
+    # Method to go back to the start of an earlier turn, returns False if it is not remembered
+    def rewind(self, turns=1):
+        if self.__history is None or turns < 1 or len(self.__history) < turns:
+            return False
+
+        # The last snapshot was taken before the latest turn ran, so it is one turn back.
+        # The snapshot being restored is taken again when its turn runs
+        for _ in range(turns - 1):
+            self.__history.pop()
+        self.restore(self.__history.pop())
+        return True
+
+    # Method to return the suspects of the case in the order of the arrest menu
+    def __suspects(self):
+        return [self.__character(key) for key in self.__world.case.suspects]
+
+    # Method to return one of the world's characters, creating it the first time it is needed
+    def __character(self, key):
+        character = self.__people.get(key)
+        if character is None:
+            fields = self.__world.characters[key]
+            character_class = CHARACTER_CLASSES.get(fields["class"])
+            if character_class is None:
+                raise ValueError(f"Unknown character class {fields['class']!r} for {key!r}")
+            character = self.__people[key] = character_class(fields["name"], fields.get("dialogue"),
+                                                             fields.get("tree"))
+        return character
+
+    # Method to return the dialogue tree a character talks from, or None for a fixed line.
+    # Trees are read the first time anyone talks from them
+    def __dialogue_tree(self, character):
+        return self.__content.dialogues.tree(character._tree) if character._tree is not None else None
+
+    # Method to return what a character says first, which depends on what the Detective knows
+    def __opening_line(self, character):
+        tree = self.__dialogue_tree(character)
+        if tree is None:
+            return character._dialogue
+        return line_at(tree.nodes[tree.start], self.__deduction)
+
+    # Method to let the player carry on a conversation from the choices of a dialogue tree
+    def __converse(self, character, tree):
+        node = tree.nodes[tree.start]
+        choices = choices_at(node, self.__deduction)
+        while choices:
+            for number, choice in enumerate(choices, start=1):
+                self.__say(NUMBERED_NAME, number, choice.text)
+            selection = self.__input("Please enter a number to choose what to say:")
+            if not (selection.isdecimal() and 0 < int(selection) <= len(choices)):
+                self.__print("invalid option")
+                return
+            node = tree.nodes[choices[int(selection) - 1].goto]
+            self.__print(f"{character.get_name()}: {line_at(node, self.__deduction)}")
+            choices = choices_at(node, self.__deduction)
+
+    # Method to describe the game that just reached an ending
+    def __outcome_event(self, ending):
+        tools_used = self.__flashlight + self.__valerie_dead + self.__valerie_choked + self.__car_used
+        return OutcomeEvent("murderer" if self.__game_choice == "2" else "detective", ending, self.__turns,
+                            len(self.__examined_clues), tools_used, max(self.__caught, -1))
+
+    # Method to return the name of the handler that runs next, or None once the game is over
+    def get_next_step(self):
+        if not self.__running or self.__next_step is None:
+            return None
+        return self.__next_step.__name__
+
+    # Method to return the endings reached this session, oldest first
+    def get_outcomes(self):
+        return list(self.__outcomes)
+
+    # Method to return everything that decides how the game plays from here on, for the game
+    # or a snapshot of it, see GameSnapshot.state_key()
+    def state_key(self, snapshot=None):
+        timetable = self.__content.timetable
+        if snapshot is None:
+            snapshot = self.snapshot()
+        return snapshot.state_key(timetable.cycle if timetable else 0, self.__talks_watched)
+
+    # Method to return the names of the rooms, clues and tools, keyed the same way as snapshots
+    def get_content(self):
+        return {
+            "rooms": [room.name for room in self.__lodge_rooms],
+            "clues": {key: clue.name for key, clue in self.__lodge_rooms_clues[self.__location].items()},
+            "tools": {key: tool.name for key, tool in self.__lodge_rooms_tools[self.__location].items()},
+        }
+
+    # Method to write a line of text, joining values like print() does
+    def __print(self, *values):
+        if not self.__quiet:
+            self.__write(" ".join(str(value) for value in values))
+
+    # Method to write a line made from one of the templates above
+    def __say(self, template, *values):
+        if not self.__quiet:
+            self.__write(render(template, *values))
+
+    # Method to set up a new game
+    def new_game(self):
+
         # Implementation for starting the game
         self.__game_started = False
 
         # Welcome message and game setup
-        print("Welcome to 'Name of Game'")
-        print("You are about to embark on a thrilling adventure as a Detective or Murderer.")
-        print("Both Choices will lead you down a different path")
-        print("So Choose Wisely...")
-        self.__game_choice = input("Press '1' to choose Detective or '2' for Murderer:")
+        self.__print("Welcome to 'Name of Game'")
+        self.__print("You are about to embark on a thrilling adventure as a Detective or Murderer.")
+        self.__print("Both Choices will lead you down a different path")
+        self.__print("So Choose Wisely...")
+        self.__game_choice = self.__input("Press '1' to choose Detective or '2' for Murderer:")
 
         # INITIALISING
 
         # DETECTIVE CHARACTERS
         if self.__game_choice == "1":
             self.__role = "Detective"
-            self.__bar_man = BarMan("Ned(Bartender)", "He saw Valerie(Girlfriend) kissing another guy")
-            self.__boyfriend = Boyfriend("John(Boyfriend)", "I can't believe she's missing.")
-            self.__ex_bestfriend = ExBestFriend("Samantha(Ex Best Friend)", "I seen her drop her bracelet at the bar")
-            self.__receptionist = Receptionist("Linda(Receptionist)","She didn't notice anything suspicious"
-                                                                     " around the time of the murder.")
         # MURDERER TOOLS AND ROOMS
         # This needs to be done to achieve re-playability
         elif self.__game_choice == "2":
             self.__role = "Murderer"
-        self.__lodge_rooms[0].not_examined()
-        self.__lodge_rooms[1].not_examined()
-        self.__lodge_rooms[2].not_examined()
-        self.__lodge_rooms[3].not_examined()
-        self.__lodge_rooms[4].not_examined()
-        self.__lodge_rooms[5].not_examined()
+
+        else:
+            self.__print("Invalid choice.")
+            return self.new_game
+
+        self.__rooms_examined = 0
+        self.__people = {}
+        self.__talked = 0
 
         self.__safe_opened = False
         self.__caught = 3  # Counter for the player being caught
+        self.__turns = 0
         self.__valerie_dead = False  # Flag to check if the Valerie is dead
         self.__valerie_choked = False
         self.__flashlight = False
-        self.__berry2 = False
+        self.__car_used = False
 
-        # List to store clues that have been examined
-        self.__examined_clues = []
+        # Journal of the clues that have been examined
+        self.__examined_clues = ClueJournal()
+        self.__deduction = Deduction(self.__content.rule_set)
         # List to store tools that have been examined
         self.__examined_tools = []
 
         # Initialise Tools
-        knife = self.__lodge_rooms_tools["Lonely Lodge"].get(5)
-        flashlight = self.__lodge_rooms_tools["Lonely Lodge"].get(4)
-        berry = self.__lodge_rooms_tools["Lonely Lodge"].get(3)
-        car_keys = self.__lodge_rooms_tools["Lonely Lodge"].get(0)
-        knife.found = False
-        flashlight.found = False
-        berry.found = False
-        car_keys.found = False
+        self.__tools_found = 0
 
         # Enter the players name
-        player_name = input(f"Enter your {self.__role}'s name: ")
+        player_name = self.__input(f"Enter your {self.__role}'s name: ")
         self.__name = player_name
-        self.main_menu()
+        return self.main_menu
 
     # Method to display the Main Menu
     def main_menu(self):
 
-        print("\n- - Main Menu - -\n")
+        self.__print("\n- - Main Menu - -\n")
         if not self.__game_started:
-            player_input = input("Press 'q' to quit or 's' to start: ")
+            player_input = self.__input("Press 'q' to quit or 's' to start: ")
             if player_input.lower() == "q":
                 self.__running = False
+                return None
             elif player_input.lower() == "s":
                 self.__game_started = True
-                self.start_game()
+                return self.start_game
+            return self.main_menu
 
         else:
 
-            print("Game Info: ")
-            print("- Role - ", self.__role)
-            print("- Name -", self.__name)
-            print("- Location - Lonely Lodge")
-            print("- Current room -", self.__lodge_rooms[self.current_room].name)
-            print("- Room Description -",self.__lodge_rooms[self.current_room].description)
+            self.__print("Game Info: ")
+            self.__print("- Role - ", self.__role)
+            self.__print("- Name -", self.__name)
+            self.__print("- Location -", self.__location)
+            self.__print("- Current room -", self.__lodge_rooms[self.current_room].name)
+            self.__print("- Room Description -",self.__lodge_rooms[self.current_room].description)
 
     # DETECTIVE
         if self.__game_choice == "1":
 
-            player_input = input("Press 'q' to quit, 'c' to continue, 'r' to review clues or 'n' for new game: ")
+            player_input = self.__input("Press 'q' to quit, 'c' to continue, 'r' to review clues or 'n' for new game: ")
 
             if player_input.lower() == "q":
                 self.__running = False
+                return None
 
             elif player_input.lower() == "c":
-                    self.continue_game()
+                return self.continue_game
 
             elif player_input.lower() == "r":
-                self.review_clues()
+                return self.review_clues
 
             elif player_input.lower() == "n":
-                self.run()
+                return self.new_game
 
     # MURDERER
         if self.__game_choice == "2":
-            player_input = input("Press 'q' to quit, 'c' to continue, or 'n' for new game: ")
+            player_input = self.__input("Press 'q' to quit, 'c' to continue, or 'n' for new game: ")
 
             if player_input.lower() == "q":
                 self.__running = False
+                return None
 
             elif player_input.lower() == "c":
-                self.continue_game()
+                return self.continue_game
 
             elif player_input.lower() == "n":
-                self.run()
+                return self.new_game
+
+        # Anything else shows the menu again
+        return self.main_menu
+
+    # Input function the game asks, answers left from chained commands come first.
+    # Within a chain the player is only asked once the chain has reached an ending
+    def __next_answer(self, prompt=""):
+        if self.__chained:
+            return self.__chained.popleft()
+        if self.__chain_outcomes is not None:
+            if len(self.__outcomes) == self.__chain_outcomes:
+                raise _OutOfAnswers()
+            # The player sees how the chain reached the ending before being asked
+            self.__show_held()
+        return self.__read(prompt)
+
+    # Method to show the text held back from the chained command being run
+    def __show_held(self):
+        for text in self.__held:
+            self.__chain_write(text)
+        self.__held.clear()
+
+    # Method to check if a line is a chain of commands, e.g. "m 3; e; i 1" or "u 2".
+    # 'r' followed by words is a search of the clues, as before
+    @staticmethod
+    def __is_chain(player_input):
+        words = player_input.split()
+        return ";" in player_input or (len(words) > 1 and words[0].lower() != "r")
+
+    # Method to run a chain of commands as one step, each with the answers its questions need.
+    # Each command runs as if it was typed at the turn prompt with its answers typed after it.
+    # The chain stops at the first command the turn prompt does not take, at a command given
+    # fewer or more answers than it asks for (it is undone and its text is not shown), or once
+    # the game reaches an ending
+    def __run_chain(self, player_input):
+        outcomes = self.__chain_outcomes = len(self.__outcomes)
+        next_step = self.update
+        self.__chain_write = self.__write
+        self.__write = self.__held.append
+        try:
+            for command in player_input.split(";"):
+                words = command.split()
+                if not words:
+                    continue
+                words[0] = words[0].lower()
+
+                if words[0] == "r" and len(words) > 1:
+                    self.__show_clues(" ".join(words[1:]))
+                    continue
+
+                before = self.snapshot()
+                self.__chained.clear()
+                self.__chained.extend(words)
+                try:
+                    next_step = self.update()
+                    # The turn prompt asks again when it does not take a command
+                    if next_step.__name__ == "update" and self.__turns == before.turns:
+                        self.__print(f"'{command.strip()}' cannot be done now, the commands after it were skipped.")
+                        next_step = self.update
+                        break
+                    while next_step is not None and next_step.__name__ != "update" and self.__running:
+                        next_step = next_step()
+                except _OutOfAnswers:
+                    self.__restore_state(before)
+                    self.__held.clear()
+                    self.__print(f"'{command.strip()}' needs more answers, the commands after it were skipped.")
+                    next_step = self.update
+                    break
+                if self.__chained:
+                    self.__restore_state(before)
+                    self.__held.clear()
+                    self.__print(f"'{command.strip()}' was given more answers than it needs, "
+                                 f"the commands after it were skipped.")
+                    next_step = self.update
+                    break
+                self.__show_held()
+                if next_step is None or not self.__running or len(self.__outcomes) > outcomes:
+                    break
+        finally:
+            self.__write = self.__chain_write
+            self.__show_held()
+            self.__chained.clear()
+            self.__chain_outcomes = None
+            self.__chain_write = None
+        return next_step
+
+    # Method to count a command carried out from the turn prompt, returns the handler running it.
+    # A turn passing moves the characters with routines on, only the player's room is looked at
+    def __take_turn(self, handler):
+        self.__turns += 1
+        if self.__content.timetable and not self.__quiet:
+            self.__watch_room(self.__turns - 1)
+        return handler
+
+    # Method to show the characters with routines that walk into or out of the player's room
+    # as turn becomes the next one
+    def __watch_room(self, turn):
+        timetable = self.__content.timetable
+        before = timetable.in_room(self.current_room, turn)
+        after = timetable.in_room(self.current_room, turn + 1)
+        for key in before:
+            if key not in after:
+                self.__say(LEAVES_ROOM, self.__character(key).get_name())
+        for key in after:
+            if key not in before:
+                self.__say(WALKS_IN, self.__character(key).get_name())
+                self.__perform(key)
+
+    # Method to return the keys of the characters in a room: those who stay in it, then those
+    # whose routines have brought them there this turn
+    def __keys_in_room(self, room):
+        keys = self.__world.character_rooms.get(room, ())
+        if self.__content.timetable:
+            keys = tuple(keys) + tuple(self.__content.timetable.in_room(room, self.__turns))
+        return keys
+
+    # Method to show what a character in the player's room is doing, the action of the stop
+    # their routine is at or else what their class does
+    def __perform(self, key):
+        character = self.__character(key)
+        if key in self.__world.routines:
+            action = self.__content.timetable.stop(key, self.__turns)[2]
+            if action is not None:
+                self.__say(ROUTINE_ACTION, character.get_name(), action)
+                return
+        character.perform_action(self.__print)
 
     # Method to handle game updates based on players choices
     def update(self):
 
             if self.__game_choice == "1":
-                player_input = input(
+                player_input = self.__input(
                     "\nPress 'q' to quit to menu, 'i' to interact, "
                     "'e' to examine, 'r' to review clues 'm' to move room or 'a' to arrest someone:")
 
+                if self.__is_chain(player_input):
+                    return self.__run_chain(player_input)
+
                 if player_input.lower() == "q":
-                    self.main_menu()
+                    return self.main_menu
 
                 elif player_input.lower() == "i":
-                    self.interact_with_characters()
+                    return self.__take_turn(self.interact_with_characters)
 
                 elif player_input.lower() == "e":
-                    self.examine_room()
+                    return self.__take_turn(self.examine_room)
 
                 elif player_input.lower() == "r":
-                    self.review_clues()
+                    return self.__take_turn(self.review_clues)
+
+                # 'r' followed by words only reviews the clues that mention them
+                elif player_input.lower().startswith("r "):
+                    self.__show_clues(player_input[2:])
+                    return self.update
 
                 elif player_input.lower() == "m":
-                    self.move_to_room()
+                    return self.__take_turn(self.move_to_room)
 
                 elif player_input.lower() == "a":
-                    self.arrest()
+                    return self.__take_turn(self.arrest)
                 else:
-                    print("Invalid choice.")
-                    self.update()
+                    self.__print("Invalid choice.")
+                    return self.update
 
             elif self.__game_choice == "2":
-                player_input = input(
+                player_input = self.__input(
                     "\nPress 'q' to quit to menu,"
                     "'e' to examine room, 'u' to use tool,'f' to move forward or 'b to go back:")
+
+                if self.__is_chain(player_input):
+                    return self.__run_chain(player_input)
                 if player_input.lower() == "q":
-                    self.main_menu()
+                    return self.main_menu
 
                 elif player_input.lower() == "e":
-                    self.examine_room()
+                    return self.__take_turn(self.examine_room)
 
                 elif player_input.lower() == "u":
-                    self.use_tool()
+                    return self.__take_turn(self.use_tool)
 
                 elif player_input.lower() == "f":
-                    self.move_forward()
+                    return self.__take_turn(self.move_forward)
 
                 elif player_input.lower() == "b":
-                    self.move_back()
+                    return self.__take_turn(self.move_back)
 
                 else:
-                    print("Invalid choice.")
-                    self.update()
+                    self.__print("Invalid choice.")
+                    return self.update
 
     # Method to start the game
     def start_game(self):
         if self.__game_choice == "1":
-            print(f"Welcome {self.__role} {self.__name} to the Lonely Lodge")
-            self.current_room = 0  # Starting room
-            print(f"You Enter {self.__lodge_rooms[self.current_room].name}."
-                  f" {self.__lodge_rooms[self.current_room].description}")
-            print("Your goal as Detective is to find clues and interact with people to solve the mystery, Good Luck..")
-            self.update()
+            self.__print(f"Welcome {self.__role} {self.__name} to the {self.__location}")
+            self.current_room = self.__story.detective_start  # Starting room
+            self.__say(START_ROOM, self.__lodge_rooms[self.current_room])
+            self.__print("Your goal as Detective is to find clues and interact with people to solve the mystery, Good Luck..")
+            return self.update
 
         elif self.__game_choice == "2":
-            print(f"Welcome {self.__role} {self.__name} to the Lonely Lodge")
-            self.current_room = 5  # Starting room
-            print(f"You Enter {self.__lodge_rooms[self.current_room].name}."
-                  f" {self.__lodge_rooms[self.current_room].description}")
-            print("Your goal as Murderer is to kill your girlfriend named Valerie without getting caught")
-            print("She has just left your room to go to a party down the road.")
-            print("Use tools that you find to navigate rooms and to kill Valerie, Good luck..")
-            self.update()
+            self.__print(f"Welcome {self.__role} {self.__name} to the {self.__location}")
+            self.current_room = self.__story.murderer_start  # Starting room
+            self.__say(START_ROOM, self.__lodge_rooms[self.current_room])
+            self.__print("Your goal as Murderer is to kill your girlfriend named Valerie without getting caught")
+            self.__print("She has just left your room to go to a party down the road.")
+            self.__print("Use tools that you find to navigate rooms and to kill Valerie, Good luck..")
+            return self.update
 
     # Method to allow the detective to move to any room
     def move_to_room(self):
-        print("You decide to move to a different room.")
-        print("Available rooms:")
-
-        # Enumerate through each room in the lodge, starting from index 1
-        for i, room in enumerate(self.__lodge_rooms, start=1):
-            # Print the room number and name
-            print(f"{i}. {room.name}")
+        self.__print("You decide to move to a different room.")
+        self.__print("Available rooms:")
 
-        # Take user input for the room choice
-        room_choice = int(input("Enter the number of the room you want to move to: "))
-
-        # Check if the user input is a valid room number
-        if 0 < room_choice <= len(self.__lodge_rooms):
-            # Adjust for 0-based indexing and set the current room
-            self.current_room = room_choice - 1
-            # Print information about the chosen room
-            print(f"You enter the {self.__lodge_rooms[self.current_room].name}. "
-                  f"Description: {self.__lodge_rooms[self.current_room].description}")
-
-        else:
-            print("Invalid room choice.")
+        # Enumerate through each room in the lodge, starting from index 1.
+        # Nothing is shown when quiet, so big worlds are not walked through for nothing
+        if not self.__quiet:
+            for i, room in enumerate(self.__lodge_rooms, start=1):
+                # Print the room number and name
+                self.__say(NUMBERED_ROOM, i, room)
 
-        if self.current_room == 0:
-            self.__boyfriend.perform_action()
-            self.__ex_bestfriend.perform_action()
+        # Take user input for the room choice, asking again until it is a valid room number
+        while True:
+            room_choice = self.__input("Enter the number of the room you want to move to: ").strip()
+            if room_choice.isdecimal() and 0 < int(room_choice) <= len(self.__lodge_rooms):
+                break
+            self.__print("Invalid room choice.")
 
-        elif self.current_room == 2:
-            self.__bar_man.perform_action()
+        # Adjust for 0-based indexing and set the current room
+        self.current_room = int(room_choice) - 1
+        # Print information about the chosen room
+        self.__say(ENTER_ROOM, self.__lodge_rooms[self.current_room])
 
-        elif self.current_room == 4:
-            self.__receptionist.perform_action()
+        for key in self.__keys_in_room(self.current_room):
+            self.__perform(key)
 
-        self.update()
+        return self.update
 
     # Method for interacting with characters
     def interact_with_characters(self):
 
-        print("You decide to interact with the characters in the room.")
-
-        if self.current_room == 0:  # Slippery Slope room
-            print("Characters in room:")
-            print(f"1.{self.__boyfriend.get_name()}")
-            print(f"2.{self.__ex_bestfriend.get_name()}")
-            selection = input("Please enter a number to select a character to interact with:")
-            if selection == "1":
-                self.__boyfriend.interact()
-            elif selection == "2":
-                self.__ex_bestfriend.interact()
+        self.__print("You decide to interact with the characters in the room.")
+
+        characters = self.__characters_in_room()
+        if characters:
+            self.__print("Characters in room:")
+            for number, character in enumerate(characters, start=1):
+                self.__say(NUMBERED_NAME, number, character.get_name())
+            selection = self.__input("Please enter a number to select a character to interact with:")
+            if selection.isdecimal() and 0 < int(selection) <= len(characters):
+                character = characters[int(selection) - 1]
+                if character.interact(self.__print, self.__opening_line(character)):
+                    tree = self.__dialogue_tree(character)
+                    if tree is not None:
+                        self.__converse(character, tree)
+                key = self.__keys_in_room(self.current_room)[int(selection) - 1]
+                self.__deduction.add(f"talked {key}")
+                self.__talked |= 1 << self.__content.character_bits[key]
             else:
-                print("invalid option")
-
-        elif self.current_room == 2: # Bar Room
-            print("Characters in room:")
-            print(f"1.{self.__bar_man.get_name()}")
-            selection = input("Please enter a number to select a character to interact with:")
-            if selection == "1":
-                self.__bar_man.interact()
-            else:
-                print("invalid option")
-
-        elif self.current_room == 4: # Lonely Lodge Entrance
-            print("Characters in room:")
-            print(f"1.{self.__receptionist.get_name()}")
-            selection = input("Please enter a number to select a character to interact with:")
-            if selection == "1":
-                self.__receptionist.interact()
-            else:
-                print("invalid option")
+                self.__print("invalid option")
+
+        else:
+            self.__print("No Characters to interact with")
 
-        elif self.current_room == 1 or 3 or 5: # The Woods or the couples room
+        return self.update
 
-            print("No Characters to interact with")
+    # Method to add a clue to the journal and work out what follows from it
+    def __add_clue(self, clue):
+        if self.__examined_clues.add(clue):
+            self.__deduction.add(f"clue {clue.key}")
 
-        self.update()
+    # Method to return the characters in the current room
+    def __characters_in_room(self):
+        return [self.__character(key) for key in self.__keys_in_room(self.current_room)]
 
     def examine_room (self):
-        if self.__lodge_rooms[self.current_room].examined():
-            if self.current_room == 5 and self.__safe_opened == False and self.__game_choice == "1":
-                safe_choice = input("Do you want to enter the code for the safe? Yes/No:")
+        if self.__rooms_examined >> self.current_room & 1:
+            if self.current_room == self.__story.safe_room and self.__safe_opened == False and self.__game_choice == "1":
+                safe_choice = self.__input("Do you want to enter the code for the safe? Yes/No:")
 
                 if safe_choice.lower() == "yes":
-                    code = input("Please enter a 4 digit code:")
+                    code = self.__input("Please enter a 4 digit code:")
 
-                    if code == "2204":
-                        clue = self.__lodge_rooms_clues["Lonely Lodge"].get(6)
-                        print("You opened the safe")
-                        print(f"You found a {clue.name}")
-                        self.__examined_clues.append(clue)
+                    if code == self.__story.safe_code:
+                        clue = self.__lodge_rooms_clues[self.__location].get(self.__story.safe_clue)
+                        self.__print("You opened the safe")
+                        self.__say(FOUND_ITEM, clue)
+                        self.__add_clue(clue)
                         self.__safe_opened = True
-                        self.update()
+                        return self.update
 
                 elif safe_choice.lower() == "no":
-                    self.update()
+                    return self.update
 
                 else:
-                    print("Invalid Input")
-                    self.update()
+                    self.__print("Invalid Input")
+                    return self.update
             if self.__game_choice == "1":
-                print("You have already examined this room, review your clues")
+                self.__print("You have already examined this room, review your clues")
 
             elif self.__game_choice == "2":
-                print("You have already examined this room")
+                self.__print("You have already examined this room")
 
         else:
-            print("You Examine the Room")
+            self.__print("You Examine the Room")
 
             # DETECTIVE
             if self.__game_choice == "1":
-                clue = self.__lodge_rooms_clues["Lonely Lodge"].get(self.current_room)
+                clue = self.__lodge_rooms_clues[self.__location].get(self.current_room)
 
                 if clue:
-
-                    if self.current_room == 2:
-                        self.__boyfriend = Boyfriend("John(Boyfriend)", "I gave the bracelet to Valerie as an"
-                                                                        " anniversy gift\n for when we met on the 22nd of April")
-                        self.__boyfriend.re_interact()
-                    print(f"You found a {clue.name}")
-                    self.__examined_clues.append(clue)
-                    self.__lodge_rooms[self.current_room].examine()
+                    self.__say(FOUND_ITEM, clue)
+                    self.__add_clue(clue)
+                    self.__rooms_examined |= 1 << self.current_room
 
                 else:
-                    print("You find nothing in this room.")
+                    self.__print("You find nothing in this room.")
 
                 # MURDERER
             elif self.__game_choice == "2":
-                tool = self.__lodge_rooms_tools["Lonely Lodge"].get(self.current_room)
-                flashlight = self.__lodge_rooms_tools["Lonely Lodge"].get(4)
+                tool = self.__lodge_rooms_tools[self.__location].get(self.current_room)
 
                 if tool:
-                    print(f"You found a {tool.name}")
+                    self.__say(FOUND_ITEM, tool)
                     self.__examined_tools.append(tool)
-                    tool.add_tool()
-                    self.__lodge_rooms[self.current_room].examine()
+                    self.__tools_found |= 1 << tool.key
+                    self.__rooms_examined |= 1 << self.current_room
 
-        self.update()
+        return self.update
 
     def move_forward(self):
 
-        knife = self.__lodge_rooms_tools["Lonely Lodge"].get(5)
-        flashlight = self.__lodge_rooms_tools["Lonely Lodge"].get(4)
-        berry = self.__lodge_rooms_tools["Lonely Lodge"].get(3)
-        car_keys = self.__lodge_rooms_tools["Lonely Lodge"].get(0)
-
-        if self.current_room == 5 and not knife.found:
-            print("You need to find a weapon before continuing")
-            self.update()
+        # Whether the way is open was worked out for every room when the game was loaded
+        message, move_by = self.__content.forward_table[self.current_room][self.__murderer_conditions()]
+        if move_by is None:
+            self.__print(message)
+            return self.update
 
-        elif self.current_room == 3 and not self.__flashlight:
-            print("The woods are too dark to navigate,you need to use a flashlight")
-            self.update()
+        self.current_room += move_by
+        self.__say(WALK_INTO_ROOM, self.__lodge_rooms[self.current_room])
 
+        if self.current_room == self.__story.bar:
+            self.__print("You see Valerie Kiss another guy, You get really angry")
+            self.__print("She then walks away to use the bathroom.")
+            val_choice = self.__input("Do you want to pursue her? Yes/No:")
 
-        if self.current_room == 0:
-            print("You cannot move forward a room")
+            # Pursue Valerie to the next room
+            if val_choice.lower() == "yes":
+                self.current_room -=1
+                self.__say(WALK_INTO_ROOM, self.__lodge_rooms[self.current_room])
+                self.__print("Valerie is shocked to see you as you enter the Porta Potty behind her")
+                return self.use_tool
 
-        else:
-
-            if self.current_room == 2 and not (self.__valerie_dead or self.__valerie_choked):
-                print("You decide to wait for Valerie, maybe you can use one of your tools while she is gone")
-                self.update()
-
-            elif self.current_room == 2 and (self.__valerie_dead or self.__valerie_choked):
-                self.current_room -= 1
-
-            # Decrement the current room
-            self.current_room -= 1
-            print(f"You enter the {self.__lodge_rooms[self.current_room].name}. "
-                  f"Description:{self.__lodge_rooms[self.current_room].description}")
-
-            if self.current_room == 3 and not flashlight.found:
-                # Allows for the flashlight to either be in tool slot 2 or 3
-                self.__berry2 = True
-
-            elif self.current_room == 3 and flashlight.found:
-                self.__berry2 = False
-
-            if self.current_room == 2:
-                print("You see Valerie Kiss another guy, You get really angry")
-                print("She then walks away to use the bathroom.")
-                val_choice = input("Do you want to pursue her? Yes/No:")
-
-                # Pursue Valerie to the next room
-                if val_choice.lower() == "yes":
-                    self.current_room -=1
-                    print(f"You enter the {self.__lodge_rooms[self.current_room].name}. "
-                          f"Description:{self.__lodge_rooms[self.current_room].description}")
-                    print("Valerie is shocked to see you as you enter the Porta Potty behind her")
-                    self.use_tool()
-
-                # You stay in the bar
-                else:
-                    print("You decide not to pursue Valerie")
+            # You stay in the bar
+            else:
+                self.__print("You decide not to pursue Valerie")
 
-            elif self.current_room == 0:
-                print("You must now escape using one of your tools.")
+        elif self.current_room == self.__story.escape:
+            self.__print("You must now escape using one of your tools.")
 
-        self.update()
+        return self.update
 
     def move_back(self):
         # Checks if Valerie is dead and removes catching feature
@@ -643,23 +1460,22 @@ class Game:
             self.__caught = -1
         # if you move back 3 times you get caught
         elif self.__caught == 0:
-            self.caught()
+            return self.caught
 
         elif not self.__valerie_dead or not self.__valerie_choked:
             # Print how many times you can move back before being caught
-            print(f"You can move back {self.__caught - 1} times before getting caught")
+            self.__print(f"You can move back {self.__caught - 1} times before getting caught")
 
-        if self.current_room == 5:
+        if self.current_room == self.__story.murderer_start:
             # Doesn't allow user to go beyond the length of the array of rooms
-            print("You cannot move back a room")
-            self.update()
+            self.__print("You cannot move back a room")
+            return self.update
 
-        elif self.current_room == 0 and (self.__valerie_dead or self.__valerie_choked):
-            print(f"You enter the {self.__lodge_rooms[self.current_room].name}. "
-                  f"Description:{self.__lodge_rooms[self.current_room].description}")
-            self.caught()
-        elif self.current_room == 5 and (self.__valerie_dead or self.__valerie_choked):
-            self.escape()
+        elif self.current_room == self.__story.escape and (self.__valerie_dead or self.__valerie_choked):
+            self.__say(WALK_INTO_ROOM, self.__lodge_rooms[self.current_room])
+            return self.caught
+        elif self.current_room == self.__story.murderer_start and (self.__valerie_dead or self.__valerie_choked):
+            return self.escape
 
 
         else:
@@ -669,80 +1485,132 @@ class Game:
 
             # Increment the current room
             self.current_room += 1
-            print(f"You enter the {self.__lodge_rooms[self.current_room].name}. "
-                  f"Description:{self.__lodge_rooms[self.current_room].description}")
-            if self.current_room == 5 and (self.__valerie_dead or self.__valerie_choked):
-                self.__running = False
-                self.escape()
-            self.update()
+            self.__say(WALK_INTO_ROOM, self.__lodge_rooms[self.current_room])
+            if self.current_room == self.__story.murderer_start and (self.__valerie_dead or self.__valerie_choked):
+                return self.escape
+            return self.update
 
     # Method for using murderers tools
     def use_tool(self):
-        car_keys = self.__lodge_rooms_tools["Lonely Lodge"].get(0)
-        berry = self.__lodge_rooms_tools["Lonely Lodge"].get(3)
         if self.__examined_tools:
             for i, tool in enumerate(self.__examined_tools, start=1):
-                print(f"{i}. {tool.name}: {tool.description}")
+                self.__say(NUMBERED_TOOL, i, tool)
 
-            tool_choice = input("\nSelect the tool you would like to use:")
-            if self.current_room == 1:
-                if tool_choice == "1" and not self.__valerie_dead:
-                    print("You stab Valerie Multiple times now you must escape")
-                    self.__valerie_dead = True
+            tool_choice = self.__input("\nSelect the tool you would like to use:")
 
-                else:
-                    print("You have no tools to kill Valerie with..")
-                    self.caught()
-
-            elif tool_choice == "2" and self.current_room == 3 and not self.__berry2:
+            # Tools are told apart by what they are, not by where they sit in the list
+            effect = None
+            if tool_choice.isdecimal() and 0 < int(tool_choice) <= len(self.__examined_tools):
+                tool = self.__examined_tools[int(tool_choice) - 1]
+                effect, needed = self.__content.tool_effects.get((self.current_room, tool.key), (None, 0))
+                if self.__murderer_conditions() & needed != needed:
+                    effect = None
 
-                print("You can now navigate through the woods")
-                self.__flashlight = True
+            if self.current_room == self.__story.porta_potty:
+                if effect == "stab" and not self.__valerie_dead:
+                    self.__print("You stab Valerie Multiple times now you must escape")
+                    self.__valerie_dead = True
 
-            elif tool_choice == "3" and self.current_room == 3 and self.__berry2:
+                else:
+                    self.__print("You have no tools to kill Valerie with..")
+                    return self.caught
 
-                print("You can now navigate through the woods")
+            elif effect == "light":
+                self.__print("You can now navigate through the woods")
                 self.__flashlight = True
 
-            # allows for the berry to be in slot 2 or 3
-            elif tool_choice == "3" and self.current_room == 2 and not self.__berry2:
-                print("You have spiked Valerie's drink")
-                print("Valerie comes back and starts choking on her drink, you must escape")
-                self.__valerie_choked = True
-
-            elif tool_choice == "2" and self.current_room == 2 and self.__berry2:
-                print("You have spiked Valerie's drink")
-                print("Valerie comes back and starts choking on her drink, you must escape")
+            elif effect == "spike":
+                self.__print("You have spiked Valerie's drink")
+                self.__print("Valerie comes back and starts choking on her drink, you must escape")
                 self.__valerie_choked = True
 
             # You can only use the car keys in the last room to escape after valerie has been killed
-            elif (tool_choice == "4" or tool_choice == "3") and self.current_room == 0 and (self.__valerie_dead or self.__valerie_choked) and car_keys.found:
-                print("You use the keys to start the strangers car")
-                self.escape()
+            elif effect == "drive":
+                self.__print("You use the keys to start the strangers car")
+                self.__car_used = True
+                return self.escape
 
             else:
-                print("Tool cannot be used")
+                self.__print("Tool cannot be used")
 
-        self.update()
+        return self.update
 
-    # Method for detective to review clues found
-    def review_clues(self):
-        print("\nExamined Clues:")
-        if self.__examined_clues:
-            for clue in self.__examined_clues:
-                print(f"{clue.name}: {clue.description}")
+    # Method to return the conditions that decide what the Murderer can do, as bits
+    def __murderer_conditions(self):
+        return ((HAS_KNIFE if self.__tools_found >> self.__story.knife & 1 else 0)
+                | (WOODS_LIT if self.__flashlight else 0)
+                | (VALERIE_DOWN if self.__valerie_dead or self.__valerie_choked else 0)
+                | (VALERIE_DEAD if self.__valerie_dead else 0))
 
-        else:
-            print("No clues have been examined yet.")
+    # Method to list what the player can do next, for bots and other front ends.
+    # Each action is the list of answers that carries it out, e.g. ["u", "2"]
+    def available_actions(self):
+        room = self.current_room
+        actions = []
 
-        self.update()
+        if self.__game_choice == "2":
+            can_move_forward, can_move_back, usable = \
+                self.__content.murderer_actions[room][self.__murderer_conditions()]
+            tools = self.__lodge_rooms_tools[self.__location]
+            if room in tools and not self.__rooms_examined >> room & 1:
+                actions.append(["e"])
+            for slot, tool in enumerate(self.__examined_tools, start=1):
+                if tool.key in usable:
+                    actions.append(["u", str(slot)])
+            if can_move_forward:
+                actions.append(["f"])
+            if can_move_back:
+                actions.append(["b"])
+
+        elif self.__game_choice == "1":
+            for number in range(1, len(self.__keys_in_room(room)) + 1):
+                actions.append(["i", str(number)])
+            if room in self.__lodge_rooms_clues[self.__location] and not self.__rooms_examined >> room & 1:
+                actions.append(["e"])
+            elif room == self.__story.safe_room and self.__rooms_examined >> room & 1 and not self.__safe_opened:
+                actions.append(["e", "yes", self.__story.safe_code])
+            actions.append(["r"])
+            for number in range(1, len(self.__lodge_rooms) + 1):
+                if number - 1 != room:
+                    actions.append(["m", str(number)])
+            if "can arrest" in self.__deduction:
+                for number in range(1, len(self.__world.case.suspects) + 1):
+                    actions.append(["a", str(number)])
+
+        return actions
+
+    # Method for detective to review clues found
+    def review_clues(self):
+        self.__show_clues()
+        return self.update
+
+    # Method to show the clues found, or only those mentioning every word of keywords.
+    # Long lists are shown a page at a time
+    def __show_clues(self, keywords=""):
+        self.__print("\nExamined Clues:")
+        if not self.__examined_clues:
+            self.__print("No clues have been examined yet.")
+            return
+
+        clues = self.__examined_clues.search(keywords, self.__content.clue_index)
+        if not clues:
+            self.__print(f"No clues mention {keywords.strip()}.")
+            return
+
+        for shown, clue in enumerate(clues):
+            if shown and shown % CLUE_PAGE_SIZE == 0:
+                more = self.__input(f"Showing {shown} of {len(clues)} clues, press Enter for more or 'q' to stop:")
+                if more.lower() == "q":
+                    return
+            self.__say(CLUE_DETAILS, clue)
 
     # Method for murderer to escape
     def escape(self):
-        choice = input("You have Escaped!\nDo you want to start a new game? Yes/No:")
+        self.__outcomes.append("escaped")
+        choice = self.__input("You have Escaped!\nDo you want to start a new game? Yes/No:")
         if choice.lower() == "yes":
             self.__game_started = False
-            self.run()
+            return self.new_game
 
         elif choice.lower() == "no":
             self.__game_started = False
@@ -750,79 +1618,97 @@ class Game:
 
         else:
             self.__game_started = False
-            self.run()
+            return self.new_game
 
     # Method for murderer to be caught
     def caught(self):
-        choice = input("You have been caught!\nDo you want to start a new game? Yes/No:")
+        self.__outcomes.append("caught")
+        choice = self.__input("You have been caught!\nDo you want to start a new game? Yes/No:")
         if choice.lower() == "yes":
             self.__game_started = False
-            self.run()
+            return self.new_game
         elif choice.lower() == "no":
             self.__game_started = False
             self.__running = False
 
         else:
             self.__game_started = False
-            self.run()
+            return self.new_game
 
+    # Method for detective to arrest a suspect, the case's rules decide whether it was the murderer
     def arrest(self):
-        # you have to at least examine 4 clues before making an arrest
-        if len(self.__examined_clues) >= 4:
-            print(f"1.{self.__boyfriend.get_name()}")
-            print(f"2.{self.__ex_bestfriend.get_name()}")
-            print(f"3.{self.__bar_man.get_name()}")
-            print(f"4.{self.__receptionist.get_name()}")
-            selection = input("Choose a Character to arrest:")
-
-            if selection == "1":
-                print(f"You arrest John(Boyfriend) for the murder of Valerie")
-                print("Great Work!, Case closed!")
-                choice = input("Do you want to start a new game? Yes/No :")
-                if choice.lower() == "yes":
-                    self.__game_started = False
-                    self.run()
-
-                elif choice.lower() == "no":
-                    self.__game_started = False
-                    self.__running = False
-
-                else:
-                    self.__game_started = False
-                    self.run()
-
-            elif selection == "2" or "3" or "4":
-                print("You have arrested the wrong person and the murderer has escaped!")
-                choice = input("Do you want to start a new game? Yes/No :")
-                if choice.lower() == "yes":
-                    self.__game_started = False
-                    self.run()
-
-                elif choice.lower() == "no":
-                    self.__game_started = False
-                    self.__running = False
-
-                else:
-                    self.__game_started = False
-                    self.run()
+        # you have to have found enough clues before making an arrest
+        if "can arrest" not in self.__deduction:
+            self.__print("You need to find more clues before you arrest someone")
+            return self.update
+
+        suspects = self.__suspects()
+        for number, character in enumerate(suspects, start=1):
+            self.__say(NUMBERED_NAME, number, character.get_name())
+        selection = self.__input("Choose a Character to arrest:")
+        if not (selection.isdecimal() and 0 < int(selection) <= len(suspects)):
+            self.__print("invalid option")
+            return self.update
+
+        self.__deduction.add(f"arrest {self.__world.case.suspects[int(selection) - 1]}")
+        if "case closed" in self.__deduction:
+            self.__print(f"You arrest {suspects[int(selection) - 1].get_name()} for the murder of Valerie")
+            self.__print("Great Work!, Case closed!")
+            self.__outcomes.append("correct_arrest")
         else:
-            print("You need to find more clues before you arrest someone")
-            self.update()
+            self.__print("You have arrested the wrong person and the murderer has escaped!")
+            self.__outcomes.append("wrong_arrest")
+
+        choice = self.__input("Do you want to start a new game? Yes/No :")
+        self.__game_started = False
+        if choice.lower() == "no":
+            self.__running = False
+            return None
+        return self.new_game
 
     # Method to continue current game after going back to the menu
     def continue_game(self):
         if self.__game_choice == "1":
 
-            print("You continue your investigation, determined to solve the mystery...")
-            self.update()
+            self.__print("You continue your investigation, determined to solve the mystery...")
+            return self.update
 
         elif self.__game_choice == "2":
-            print("You continue your hunt, determined to catch your prey...")
-            self.update()
+            self.__print("You continue your hunt, determined to catch your prey...")
+            return self.update
         # Additional game content and interactions could go here
 
 
-# Running the game in main
+# Runs the game in the terminal. "--profile PREFIX" times the session and writes
+# PREFIX.folded and PREFIX.pstats when it ends, "--journal PATH" records it for replaying
+# and "--world PATH" plays another world file
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = dict(zip(argv[::2], argv[1::2]))
+    world = load_world(options["--world"]) if "--world" in options else None
+    if "--pack" in options:
+        from Location_Pack import LocationPack
+        pack = LocationPack(options["--pack"])
+        world = pack.world(options.get("--location", pack.locations()[0]))
+
+    instrumentation = None
+    if "--profile" in options:
+        from Instrumentation import Instrumentation
+        instrumentation = Instrumentation(profile=True, dump_prefix=options["--profile"])
+
+    journal = None
+    if "--journal" in options:
+        from Journal import Journal
+        journal = Journal(options["--journal"])
+
+    renderer = Renderer()
+    game = Game(renderer.input, renderer, world=world, instrumentation=instrumentation, journal=journal)
+    try:
+        game.run()
+    finally:
+        if journal is not None:
+            journal.close()
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    main()
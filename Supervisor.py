@@ -0,0 +1,365 @@
+
+# Description: Hosts many headless game sessions in a pool of worker processes, so a session
+# that crashes its process only takes down the sessions sharing that worker, and only until
+# they are put back. The world is loaded before the workers are forked so they share it.
+#
+# Every session lives on the worker its id hashes to. After each answer the worker sends back
+# the session's snapshot and the lines given so far to the step it is waiting in, and the
+# supervisor keeps the latest of them. When a worker dies the supervisor starts a new one in
+# its place and restores each of its sessions. The player whose answer crashed it is told,
+# and is asked the same question again. A saved state that crashes every worker it is
+# restored in is dropped after a few tries, and its player is told the game was lost.
+#
+# Usage: python Game_Server.py --workers 4            (serve players through a pool)
+#        python Supervisor.py [--workers 4] [--sessions 1000]   (play bots, killing workers as they go)
+
+
+import argparse
+import multiprocessing
+import os
+import random
+import signal
+import threading
+import zlib
+
+from Session import Session
+from Story_Mode import GameSnapshot, load_world, shared_content
+
+
+# Shown to a player whose answer crashed their worker
+CRASHED = "\nSomething went wrong and your game was restored to before that answer.\n"
+
+# Shown to a player whose game could not be restored
+LOST = "\nSomething went wrong and your game could not be restored, please start a new one.\n"
+
+# Times a worker is started again for the same crash before the state that causes it is dropped
+RESTORE_ATTEMPTS = 3
+
+
+# Runs in each worker process: hosts sessions and answers the supervisor's requests
+def _serve(connection):
+    # Ctrl-C reaches the whole process group, the supervisor decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sessions = {}
+
+    # Creates a session from its saved state, a (snapshot bytes, pending lines) pair or None.
+    # Returns the text of the question it is waiting on
+    def open_session(session_id, state):
+        if state is None:
+            session = sessions[session_id] = Session(session_id)
+            return session.start()
+        snapshot, pending = state
+        session = sessions[session_id] = Session(session_id, GameSnapshot.from_bytes(snapshot))
+        return session.start() + "".join(session.feed(line) for line in pending)
+
+    # Returns the reply for a session that has just run: its text, its state and whether it is over
+    def reply(session_id, text):
+        session = sessions[session_id]
+        if session.finished():
+            del sessions[session_id]
+            return text, None, True
+        return text, (session.snapshot().to_bytes(), session.pending()), False
+
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        kind = request[0]
+
+        if kind == "open":
+            _, session_id, state = request
+            connection.send(reply(session_id, open_session(session_id, state)))
+
+        elif kind == "feed":
+            _, session_id, line = request
+            connection.send(reply(session_id, sessions[session_id].feed(line)))
+
+        elif kind == "restore":
+            # The text was already shown to the players before the crash
+            for session_id, state in request[1]:
+                open_session(session_id, state)
+            connection.send(len(sessions))
+
+        elif kind == "close":
+            sessions.pop(request[1], None)
+            connection.send(len(sessions))
+
+        elif kind == "stop":
+            connection.send(len(sessions))
+            return
+
+
+# One worker process and the sessions it hosts
+class _Worker:
+
+    def __init__(self, context):
+        self.__context = context
+        self.lock = threading.Lock()  # One request at a time on the pipe
+        self.states = {}  # Session id to its latest (snapshot bytes, pending lines)
+        self.lost = set()  # Sessions dropped because their state crashed the worker, not told yet
+        self.restarts = 0
+        self.connection = None
+        self.process = None
+        self.start()
+
+    # Method to start the worker process
+    def start(self):
+        connection, worker_end = self.__context.Pipe()
+        self.process = self.__context.Process(target=_serve, args=(worker_end,), daemon=True)
+        self.process.start()
+        worker_end.close()
+        self.connection = connection
+
+    # Method to send a request and return the reply, raises EOFError if the worker died
+    def call(self, request):
+        try:
+            self.connection.send(request)
+            return self.connection.recv()
+        except (EOFError, OSError):
+            raise EOFError("worker died") from None
+
+    # Method to replace a dead worker with a new one, which hosts no sessions yet
+    def __replace(self):
+        self.connection.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.restarts += 1
+        self.start()
+
+    # Method to replace a dead worker and restore its sessions. If every try crashes the new
+    # worker, the sessions are restored one at a time and those that crash it are put in lost
+    def restart(self):
+        for _ in range(RESTORE_ATTEMPTS):
+            self.__replace()
+            try:
+                if self.states:
+                    self.call(("restore", list(self.states.items())))
+                return
+            except EOFError:
+                pass
+
+        pending = list(self.states.items())
+        restored = []
+        self.__replace()
+        while pending:
+            session_id, state = pending.pop(0)
+            try:
+                self.call(("restore", [(session_id, state)]))
+                restored.append((session_id, state))
+                continue
+            except EOFError:
+                pass
+            del self.states[session_id]
+            self.lost.add(session_id)
+            # The sessions restored so far went down with the worker
+            self.__replace()
+            pending[:0] = restored
+            restored = []
+
+
+# Runs sessions in a pool of worker processes
+class Supervisor:
+
+    # Constructor loading the world and forking `workers` processes. The fork start method is
+    # used where there is one, so the workers start with the world already loaded.
+    # store is an optional Session_Store.SessionStore every session's state is saved in
+    def __init__(self, workers=4, world_path=None, store=None):
+        self.__store = store
+        shared_content(load_world(world_path) if world_path else load_world())
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        self.__workers = [_Worker(context) for _ in range(workers)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    # Method to return the worker hosting a session, the same one for the same id every time
+    def __worker(self, session_id):
+        return self.__workers[zlib.crc32(str(session_id).encode("utf-8")) % len(self.__workers)]
+
+    # Method to send a session's request to its worker and keep the state sent back.
+    # Returns the text to show, and whether the game is over
+    def __run(self, session_id, request):
+        worker = self.__worker(session_id)
+        with worker.lock:
+            if request[0] == "open":
+                # A worker that crashes opening the session is recovered with the state being opened
+                worker.lost.discard(session_id)
+                worker.states.pop(session_id, None)
+                if request[2] is not None:
+                    worker.states[session_id] = request[2]
+            reply = None
+            if session_id not in worker.lost:
+                try:
+                    reply = worker.call(request)
+                except EOFError:
+                    pass
+                # Started outside the except block, so the new worker is not forked while handling it
+                if reply is None:
+                    reply = self.__recover(worker, session_id)
+            if reply is None:
+                worker.lost.discard(session_id)
+                reply = LOST, None, True
+
+            text, state, finished = reply
+            if finished:
+                worker.states.pop(session_id, None)
+            else:
+                worker.states[session_id] = state
+            if self.__store is not None:
+                if finished:
+                    self.__store.delete(session_id)
+                else:
+                    self.__store.save(session_id, *state)
+        return text, finished
+
+    # Method to restart a worker that died running a session's request and ask the player the
+    # question they were answering again. Returns the reply, or None if the session was lost
+    def __recover(self, worker, session_id):
+        for _ in range(RESTORE_ATTEMPTS):
+            worker.restart()
+            if session_id in worker.lost:
+                return None
+            try:
+                text, state, finished = worker.call(("open", session_id, worker.states.get(session_id)))
+                return CRASHED + text, state, finished
+            except EOFError:
+                pass
+        worker.states.pop(session_id, None)
+        return None
+
+    # Method to start a session, or carry one on from a GameSnapshot and the lines given since.
+    # Returns the text to show, and whether the game is over
+    def open(self, session_id, snapshot=None, pending=()):
+        return self.__run(session_id, ("open", session_id, (snapshot.to_bytes(), list(pending)) if snapshot else None))
+
+    # Method to hand a session one line typed by the player.
+    # Returns the text to show, and whether the game is over
+    def feed(self, session_id, line):
+        return self.__run(session_id, ("feed", session_id, line))
+
+    # Method to end a session the player has left
+    def close(self, session_id):
+        worker = self.__worker(session_id)
+        with worker.lock:
+            worker.lost.discard(session_id)
+            if worker.states.pop(session_id, None) is not None:
+                try:
+                    worker.call(("close", session_id))
+                    return
+                except EOFError:
+                    pass
+                worker.restart()
+
+    # Method to return the sessions and restarts of every worker
+    def stats(self):
+        workers = [{"pid": worker.process.pid, "sessions": len(worker.states), "restarts": worker.restarts}
+                   for worker in self.__workers]
+        return {
+            "workers": workers,
+            "sessions": sum(worker["sessions"] for worker in workers),
+            "restarts": sum(worker["restarts"] for worker in workers),
+        }
+
+    # Method to return the process ids of the workers, for tests that kill one
+    def worker_pids(self):
+        return [worker.process.pid for worker in self.__workers]
+
+    # Method to stop every worker
+    def shutdown(self):
+        for worker in self.__workers:
+            with worker.lock:
+                try:
+                    worker.call(("stop",))
+                except EOFError:
+                    pass
+                worker.connection.close()
+                worker.process.join(timeout=1)
+
+
+# A session hosted by a Supervisor, with the methods of Session.Session
+class SupervisedSession:
+
+    def __init__(self, supervisor, session_id):
+        self.session_id = session_id
+        self.__supervisor = supervisor
+        self.__finished = False
+
+    # Method to check if the game is over
+    def finished(self):
+        return self.__finished
+
+    # Method to start the game, or carry it on from a GameSnapshot and the lines given since.
+    # Returns the text to show
+    def start(self, snapshot=None, pending=()):
+        text, self.__finished = self.__supervisor.open(self.session_id, snapshot, pending)
+        return text
+
+    # Method to hand the game one line typed by the player, returns the text to show
+    def feed(self, line):
+        if self.__finished:
+            return ""
+        text, self.__finished = self.__supervisor.feed(self.session_id, line)
+        return text
+
+    # Method to let the supervisor forget the session
+    def close(self):
+        self.__supervisor.close(self.session_id)
+
+
+# Plays bots in every session while killing a worker now and then, and checks every game
+# still reaches its ending
+def soak(workers, sessions, kills, seed=0):
+    from World_Generator import detective_route, murderer_route
+
+    rng = random.Random(seed)
+    world = load_world()
+    routes = [detective_route(world), murderer_route(world)]
+    finished = 0
+    with Supervisor(workers) as supervisor:
+        answers = {}
+        for session_id in range(sessions):
+            supervisor.open(session_id)
+            answers[session_id] = list(routes[session_id % 2])
+
+        steps = sum(len(route) for route in answers.values())
+        kill_at = set(rng.sample(range(steps), min(kills, steps)))
+        step = 0
+        while answers:
+            for session_id in list(answers):
+                if step in kill_at:
+                    os.kill(rng.choice(supervisor.worker_pids()), 9)
+                step += 1
+                text, over = supervisor.feed(session_id, answers[session_id][0])
+                # A crash undoes the answer, so the same answer is given again
+                if not text.startswith(CRASHED):
+                    answers[session_id].pop(0)
+                if over or not answers[session_id]:
+                    finished += over
+                    del answers[session_id]
+                    supervisor.close(session_id)
+        stats = supervisor.stats()
+    return finished, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play bot sessions in a pool of workers, killing some of them.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--kills", type=int, default=10, help="workers to kill while the bots play")
+    args = parser.parse_args(argv)
+
+    finished, stats = soak(args.workers, args.sessions, args.kills)
+    print(f"{finished} of {args.sessions} games finished, {stats['restarts']} worker restarts")
+    for number, worker in enumerate(stats["workers"]):
+        print(f"worker {number}: pid {worker['pid']}, {worker['sessions']} sessions, {worker['restarts']} restarts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+
+# Description: Builds lodges of any size from a seed, for testing how the game copes with big
+# worlds. A generated world has the same layout as worlds/lonely_lodge.json: both storylines
+# can be won, with the story rooms, tools, clues and characters spread over the rooms and
+# plenty of ordinary rooms, clues, tools and characters around them. The same seed always
+# builds the same world.
+#
+# Usage: python World_Generator.py --rooms 10000 [--seed 1] [--output worlds/big_lodge.json]
+#        python Story_Mode.py --world worlds/big_lodge.json
+
+
+import argparse
+import json
+import random
+
+from World_Loader import MAX_ROOMS, world_from_data
+
+
+# The fewest rooms the Murderer's way fits in
+MIN_ROOMS = 5
+
+ADJECTIVES = ("Dusty", "Quiet", "Cold", "Narrow", "Grand", "Hidden", "Old", "Damp", "Bright", "Crooked")
+PLACES = ("Hallway", "Cellar", "Attic", "Kitchen", "Library", "Porch", "Study", "Pantry", "Lounge", "Stairwell")
+FEELINGS = ("It smells of pine.", "The floorboards creak.", "Someone was here recently.",
+            "It is colder than it should be.", "A clock ticks somewhere.")
+FIRST_NAMES = ("Ava", "Ben", "Cleo", "Dev", "Eli", "Fay", "Gus", "Hana", "Ivo", "Jude")
+OBJECTS = ("Torn Ticket", "Muddy Boot", "Wine Glass", "Lost Glove", "Broken Watch", "Scrap of Paper")
+GADGETS = ("Rope", "Umbrella", "Matches", "Spoon", "Map", "Whistle")
+SMALL_TALK = ("I was at the party all night.", "I didn't see anything.", "Ask the others, not me.",
+              "It has been a strange evening.")
+ROUTINES = ("is looking for somewhere to sit.", "is pacing up and down.", "is humming to themselves.",
+            "is looking out of the window.", None)
+
+# Classes a generated character can have, from Story_Mode.CHARACTER_CLASSES
+CLASSES = ("BarMan", "Boyfriend", "ExBestFriend", "Receptionist")
+
+# The most guests who are also suspects in a generated case
+MAX_GUEST_SUSPECTS = 4
+
+
+# Returns the JSON data of a world with the given number of rooms. By default about half the
+# rooms have a clue, a quarter a tool and there is a character for every third room.
+# Guests who are not suspects wander between the room they start in and the rooms next to it.
+# Raises ValueError if the world cannot hold the storylines
+def generate_world(rooms, seed=0, clues=None, tools=None, characters=None):
+    if not MIN_ROOMS <= rooms <= MAX_ROOMS:
+        raise ValueError(f"a generated world needs {MIN_ROOMS} to {MAX_ROOMS} rooms")
+    rng = random.Random(seed)
+    clues = max(3, rooms // 2) if clues is None else clues
+    tools = rooms // 4 if tools is None else tools
+    characters = rooms // 3 if characters is None else characters
+
+    # The Murderer walks from the top room down to room 0, with the Bar, Woods and their tools
+    # placed so the way can always be opened in time
+    start = rooms - 1
+    bar = rng.randint(2, rooms - 3)
+    woods = rng.randint(bar + 1, rooms - 2)
+    flashlight = rng.randint(woods, rooms - 2)
+    berry = flashlight
+    while berry == flashlight:
+        berry = rng.randint(bar, rooms - 2)
+    story_rooms = {0: "Slippery Slope", bar - 1: "Porta-Potty", bar: "Bar", woods: "Woods", start: "The Couple's Room"}
+
+    room_data = []
+    for number in range(rooms):
+        name = story_rooms.get(number) or f"{rng.choice(ADJECTIVES)} {rng.choice(PLACES)} {number}"
+        room_data.append({"name": name, "description": rng.choice(FEELINGS)})
+
+    # The Detective needs a bracelet hinting at the safe code and a safe, in two different rooms
+    code = f"{rng.randint(0, 9999):04d}"
+    hidden = rng.randrange(4)
+    bracelet_room, safe_room = rng.sample(range(rooms), 2)
+    clue_rooms = {bracelet_room, safe_room}
+    clue_data = {
+        str(bracelet_room): {"name": "Bracelet",
+                             "description": f"A 4 digit number with 1 number illegible "
+                                            f"{code[:hidden]}*{code[hidden + 1:]}. Who gave it to Valerie?"},
+        str(safe_room): {"name": "Safe", "description": "Examine the room again to enter the 4 digit code."},
+        str(rooms): {"name": "Bloody Knife", "description": "Found inside the safe."},
+    }
+    for room in rng.sample(range(rooms), rooms):
+        if len(clue_rooms) >= clues:
+            break
+        if room not in clue_rooms:
+            clue_rooms.add(room)
+            clue_data[str(room)] = {"name": rng.choice(OBJECTS), "description": f"Found in {room_data[room]['name']}."}
+
+    # Tools are keyed by the room they are found in
+    tool_data = {
+        str(start): {"name": "Kitchen knife", "description": "A perfect weapon for murdering"},
+        str(flashlight): {"name": "Flashlight", "description": "Can be used in dark places"},
+        str(berry): {"name": "Poisonous berry", "description": "Can be used to spike drinks"},
+        "0": {"name": "Car keys", "description": "Keys to a strangers car"},
+    }
+    for room in rng.sample(range(rooms), rooms):
+        if len(tool_data) >= tools:
+            break
+        tool_data.setdefault(str(room), {"name": rng.choice(GADGETS), "description": "Not much use to anyone"})
+
+    character_data = {
+        "boyfriend": {"class": "Boyfriend", "name": "John(Boyfriend)", "tree": "boyfriend"},
+        "ex_bestfriend": {"class": "ExBestFriend", "name": "Samantha(Ex Best Friend)",
+                          "dialogue": "I seen her drop her bracelet somewhere"},
+        "bar_man": {"class": "BarMan", "name": "Ned(Bartender)",
+                    "dialogue": "He saw Valerie(Girlfriend) kissing another guy"},
+        "receptionist": {"class": "Receptionist", "name": "Linda(Receptionist)",
+                         "dialogue": "She didn't notice anything suspicious around the time of the murder."},
+    }
+    for number in range(max(0, characters - len(character_data))):
+        character_data[f"guest_{number}"] = {"class": rng.choice(CLASSES),
+                                             "name": f"{rng.choice(FIRST_NAMES)}(Guest {number})",
+                                             "dialogue": rng.choice(SMALL_TALK)}
+
+    # John tells the code once the bracelet has been found
+    dialogues = {
+        "boyfriend": {"start": "hello", "nodes": {
+            "hello": {"lines": [{"text": f"I gave the bracelet to Valerie, the code is {code}",
+                                 "if": f"clue {bracelet_room}"},
+                                {"text": "I can't believe she's missing."}],
+                      "choices": [{"text": "Where were you tonight?", "goto": "alibi"}]},
+            "alibi": {"lines": [{"text": "In our room, I never left it.", "unless": f"clue {rooms}"},
+                                {"text": "Alright, I went out for a while. Ask anyone."}]},
+        }},
+    }
+
+    character_rooms = {}
+    starts = {}
+    for key in character_data:
+        starts[key] = rng.randrange(rooms)
+        character_rooms.setdefault(str(starts[key]), []).append(key)
+
+    # John did it, which the bracelet and the knife in the safe point to. Some guests are
+    # suspects too, each pointed at by a clue of their own
+    guests = [key for key in character_data if key.startswith("guest_")][:MAX_GUEST_SUSPECTS]
+    other_clues = [key for key in clue_data if int(key) not in (bracelet_room, safe_room, rooms)]
+    rules = [
+        {"when": ["clue *"], "need": 4, "then": "can arrest"},
+        {"when": [f"clue {bracelet_room}"], "then": "evidence boyfriend"},
+        {"when": [f"clue {rooms}"], "then": "evidence boyfriend"},
+        {"when": ["arrest boyfriend", "evidence boyfriend"], "then": "case closed"},
+    ]
+    for guest in guests:
+        if other_clues:
+            rules.append({"when": [f"clue {rng.choice(other_clues)}"], "then": f"evidence {guest}"})
+
+    # Routines have their own generator, so the rest of a world is the same as before they were added
+    walks = random.Random(f"routines {seed}")
+    for key in character_data:
+        if not key.startswith("guest_") or key in guests:
+            continue
+        room = starts[key]
+        character_rooms[str(room)].remove(key)
+        stops = [{"room": room, "turns": walks.randint(2, 6)}]
+        for _ in range(walks.randint(1, 3)):
+            room = min(rooms - 1, max(0, room + walks.choice((-1, 1))))
+            stops.append({"room": room, "turns": walks.randint(1, 4), "action": walks.choice(ROUTINES)})
+        character_data[key]["routine"] = [{field: value for field, value in stop.items() if value is not None}
+                                          for stop in stops]
+    character_rooms = {room: keys for room, keys in character_rooms.items() if keys}
+
+    return {
+        "location": f"Generated Lodge {seed}",
+        "rooms": room_data,
+        "clues": clue_data,
+        "tools": tool_data,
+        "characters": character_data,
+        "character_rooms": character_rooms,
+        "dialogues": dialogues,
+        "story": {
+            "detective_start": 0,
+            "safe_room": safe_room,
+            "safe_clue": rooms,
+            "safe_code": code,
+            "bracelet_room": bracelet_room,
+            "murderer_start": start,
+            "woods": woods,
+            "bar": bar,
+            "porta_potty": bar - 1,
+            "escape": 0,
+            "knife": start,
+            "flashlight": flashlight,
+            "berry": berry,
+            "car_keys": 0,
+        },
+        "case": {
+            "suspects": ["boyfriend", "ex_bestfriend", "bar_man", "receptionist"] + guests,
+            "rules": rules,
+        },
+    }
+
+
+# Returns a generated World ready to give to Game, without writing it to a file
+def generate(rooms, seed=0, **counts):
+    return world_from_data(generate_world(rooms, seed, **counts), f"generated world {seed}")
+
+
+# Returns answers that win the Detective storyline of a world: find the bracelet, one other
+# clue and the safe, open the safe and arrest John
+def detective_route(world, name="Bot"):
+    story = world.story
+    other = next(room for room in world.clues
+                 if room < len(world.rooms) and room not in (story.bracelet_room, story.safe_room))
+    route = ["1", name, "s"]
+    for room in (story.bracelet_room, other, story.safe_room):
+        route += ["m", str(room + 1), "e"]
+    return route + ["e", "yes", story.safe_code, "a", "1", "no"]
+
+
+# Returns answers that win the Murderer storyline of a world: walk forward through every room,
+# picking up every tool, light the woods, spike Valerie's drink and drive away
+def murderer_route(world, name="Bot"):
+    story = world.story
+    route = ["2", name, "s"]
+    found = []
+    room = story.murderer_start
+    while True:
+        if room in world.tools:
+            route.append("e")
+            found.append(room)
+        if room == story.woods:
+            route += ["u", str(found.index(story.flashlight) + 1)]
+        elif room == story.bar:
+            route += ["u", str(found.index(story.berry) + 1)]
+        elif room == story.escape:
+            return route + ["u", str(found.index(story.car_keys) + 1), "no"]
+        route.append("f")
+        if room == story.bar + 1:
+            route.append("no")  # Do not chase Valerie
+        room -= 2 if room == story.bar else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a lodge for scale testing.")
+    parser.add_argument("--rooms", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clues", type=int)
+    parser.add_argument("--tools", type=int)
+    parser.add_argument("--characters", type=int)
+    parser.add_argument("--output", help="file to write the world to (default: print it)")
+    args = parser.parse_args(argv)
+
+    try:
+        data = generate_world(args.rooms, args.seed, args.clues, args.tools, args.characters)
+    except ValueError as error:
+        parser.error(str(error))
+
+    text = json.dumps(data, separators=(",", ":"))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as world_file:
+            world_file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+
+# Description: Loads the rooms, clues, tools and characters of a location from a JSON file.
+# Each file is loaded once per process into read-only tables that every game shares, and
+# the checked tables are cached next to the file (in __pycache__) so later processes skip
+# parsing and checking. The cache is used while the file's modification time and size are
+# unchanged, or when its contents still hash to the same value.
+
+
+import marshal
+import os
+import sys
+from collections import namedtuple
+from types import MappingProxyType
+
+
+# The world shipped with the game
+DEFAULT_WORLD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worlds", "lonely_lodge.json")
+
+# Bump when the layout of the cached tables changes
+CACHE_VERSION = 5
+
+# Character entries that the Detective storyline needs
+REQUIRED_CHARACTERS = ("boyfriend", "ex_bestfriend", "bar_man", "receptionist")
+
+# Room numbers are stored in 16 bits in snapshots, with one value kept free
+MAX_ROOMS = 65534
+
+# Clue and tool keys are stored plus one in 16 bits in snapshots (see Story_Mode.pack_keys),
+# so they must be below this
+MAX_KEYS = 65535
+
+
+# The rooms where the storylines happen, and what is needed there.
+# Every field is a room number, apart from safe_clue (a clue key) and safe_code.
+# The Murderer starts in murderer_start and moves forward one room number down at a time,
+# towards the escape room. Clues and tools are keyed by the room they are found in
+Story = namedtuple("Story", "detective_start safe_room safe_clue safe_code bracelet_room "
+                            "murderer_start woods bar porta_potty escape knife flashlight berry car_keys")
+
+
+# The Detective's case: the character keys that can be arrested, in the order of the arrest
+# menu, and the rules deducing from what has been found who did it, as (when, need, then)
+# tuples for Deduction.RuleSet. The game reads two conclusions: "can arrest", which opens the
+# arrest menu, and "case closed", which makes an arrest correct
+Case = namedtuple("Case", "suspects rules")
+
+
+# The tables of one location.
+# rooms is a tuple of (name, description), clues and tools map a key to (name, description),
+# characters maps a character key to a read-only dict of its fields, character_rooms maps a
+# room number to the keys of the characters that stay in it, story is a Story and case is a Case.
+# routines maps the key of a character that walks around to its stops, each a (room, turns,
+# action) tuple: the character spends that many turns in the room, doing action (a line of
+# text, or None for what its class does), then goes on to the next stop and back to the first.
+# dialogues is where the characters' dialogue trees are: the path of a dialogue file, an object
+# mapping tree ids to their JSON, or None (see Dialogue.DialogueLibrary)
+World = namedtuple("World", "location rooms clues tools characters character_rooms story case routines "
+                             "dialogues")
+
+
+# Worlds already loaded by this process, keyed by path
+_loaded = {}
+
+
+# Loads the world stored at path, returning the shared copy if the file has not changed
+def load_world(path=DEFAULT_WORLD):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    loaded = _loaded.get(path)
+    if loaded is not None and loaded[0] == stamp:
+        return loaded[1]
+
+    tables = _read_cache(path, stamp)
+    if tables is None:
+        import hashlib  # Only needed when the cache is stale, so most starts skip it
+
+        with open(path, "rb") as world_file:
+            data = world_file.read()
+        digest = hashlib.sha256(data).hexdigest()
+
+        cached = _read_cache(path, stamp, digest)
+        if cached is not None:
+            tables = cached
+        else:
+            import json
+            tables = build_tables(json.loads(data), path)
+        _write_cache(path, stamp, digest, tables)
+
+    world = _freeze(tables, os.path.dirname(path))
+    _loaded[path] = (stamp, world)
+    return world
+
+
+# Checks the parsed JSON of a world and turns it into plain tables that marshal can store.
+# Raises ValueError naming the first problem found
+def build_tables(data, source="world"):
+    def fail(message):
+        raise ValueError(f"{source}: {message}")
+
+    def text(value, where):
+        if not isinstance(value, str) or not value:
+            fail(f"{where} must be a non-empty string")
+        return sys.intern(value)
+
+    def entry(value, where):
+        if not isinstance(value, dict):
+            fail(f"{where} must be an object with a name and description")
+        return text(value.get("name"), f"{where}.name"), text(value.get("description"), f"{where}.description")
+
+    def keyed(section, read=entry):
+        values = data.get(section)
+        if not isinstance(values, dict):
+            fail(f"'{section}' must be an object keyed by number")
+        table = {}
+        for key, value in values.items():
+            if not key.isdigit():
+                fail(f"{section} key {key!r} is not a number")
+            if int(key) >= MAX_KEYS:
+                fail(f"{section} key {key} is too big, keys must be below {MAX_KEYS}")
+            table[int(key)] = read(value, f"{section}[{key}]")
+        return table
+
+    def room(value, where):
+        if not isinstance(value, int) or not 0 <= value < len(rooms):
+            fail(f"{where} must be a room number")
+        return value
+
+    if not isinstance(data, dict):
+        fail("the world must be a JSON object")
+
+    location = text(data.get("location"), "location")
+
+    rooms = data.get("rooms")
+    if not isinstance(rooms, list) or not rooms:
+        fail("'rooms' must be a non-empty list")
+    if len(rooms) > MAX_ROOMS:
+        fail(f"a world can have at most {MAX_ROOMS} rooms")
+    rooms = tuple(entry(value, f"rooms[{index}]") for index, value in enumerate(rooms))
+
+    tools = keyed("tools")
+    for key in tools:
+        if key >= len(rooms):
+            fail(f"tool {key} is in room {key}, which does not exist")
+    clues = keyed("clues")
+
+    characters = data.get("characters")
+    if not isinstance(characters, dict):
+        fail("'characters' must be an object")
+    for key in REQUIRED_CHARACTERS:
+        if key not in characters:
+            fail(f"character {key!r} is missing")
+    character_tables = {}
+    routine_data = {}
+    for key, fields in characters.items():
+        if not isinstance(fields, dict):
+            fail(f"characters[{key}] must be an object")
+        if "routine" in fields:
+            fields = dict(fields)
+            routine_data[sys.intern(key)] = fields.pop("routine")
+        character_tables[sys.intern(key)] = {
+            sys.intern(field): text(value, f"characters[{key}].{field}") for field, value in fields.items()
+        }
+        for field in ("class", "name"):
+            if field not in fields:
+                fail(f"characters[{key}] has no {field!r}")
+        if "dialogue" not in fields and "tree" not in fields:
+            fail(f"characters[{key}] needs a 'dialogue' or a dialogue 'tree'")
+
+    def character_keys(value, where):
+        if not isinstance(value, list) or any(key not in character_tables for key in value):
+            fail(f"{where} must be a list of character keys")
+        return tuple(sys.intern(key) for key in value)
+
+    character_rooms = keyed("character_rooms", character_keys)
+    for key in character_rooms:
+        room(key, f"character_rooms key {key}")
+
+    # Characters with a routine are wherever it has taken them, not in one room
+    routines = {}
+    for key, stops in routine_data.items():
+        where = f"characters[{key}].routine"
+        if not isinstance(stops, list) or not stops:
+            fail(f"{where} must be a non-empty list of stops")
+        if any(key in keys for keys in character_rooms.values()):
+            fail(f"character {key!r} has a routine, so it cannot also be in character_rooms")
+        routine = []
+        for number, stop in enumerate(stops):
+            stop_where = f"{where}[{number}]"
+            if not isinstance(stop, dict):
+                fail(f"{stop_where} must be an object with a room and a number of turns")
+            turns = stop.get("turns", 1)
+            if not isinstance(turns, int) or turns < 1:
+                fail(f"{stop_where}.turns must be a whole number of at least 1")
+            action = stop.get("action")
+            routine.append((room(stop.get("room"), f"{stop_where}.room"), turns,
+                            None if action is None else text(action, f"{stop_where}.action")))
+        routines[key] = tuple(routine)
+
+    story = data.get("story")
+    if not isinstance(story, dict):
+        fail("'story' must be an object")
+    for field in Story._fields:
+        if field not in story:
+            fail(f"story has no {field!r}")
+    story_values = []
+    for field in Story._fields:
+        if field == "safe_code":
+            story_values.append(text(story[field], "story.safe_code"))
+        elif field == "safe_clue":
+            if story[field] not in clues:
+                fail("story.safe_clue must be a clue key")
+            story_values.append(story[field])
+        else:
+            story_values.append(room(story[field], f"story.{field}"))
+    story_values = Story(*story_values)
+
+    # The Murderer's way runs down the room numbers, the chase goes from the Bar to the room below
+    if not (story_values.escape < story_values.porta_potty < story_values.bar < story_values.woods
+            < story_values.murderer_start):
+        fail("story rooms must run escape < porta_potty < bar < woods < murderer_start")
+    if story_values.porta_potty != story_values.bar - 1:
+        fail("story.porta_potty must be the room before story.bar")
+    for field in ("knife", "flashlight", "berry", "car_keys"):
+        if getattr(story_values, field) not in tools:
+            fail(f"story.{field} must be the room of a tool")
+
+    case = data.get("case")
+    if not isinstance(case, dict):
+        fail("'case' must be an object")
+    suspects = case.get("suspects")
+    if not isinstance(suspects, list) or not suspects:
+        fail("case.suspects must be a non-empty list of character keys")
+    suspects = character_keys(suspects, "case.suspects")
+
+    # Facts naming a clue or a character must name one the world has
+    def fact(value, where, premise=False):
+        kind, _, subject = text(value, where).partition(" ")
+        if not subject or (subject == "*" and not premise):
+            fail(f"{where} must be a fact such as 'clue 2'" + (" or 'clue *'" if premise else ""))
+        if subject != "*":
+            if kind == "clue" and (not subject.isdigit() or int(subject) not in clues):
+                fail(f"{where} names clue {subject}, which does not exist")
+            if kind in ("talked", "arrest", "culprit", "evidence") and subject not in character_tables:
+                fail(f"{where} names character {subject!r}, which does not exist")
+        return sys.intern(value)
+
+    rules = case.get("rules")
+    if not isinstance(rules, list):
+        fail("case.rules must be a list")
+    rule_tables = []
+    for index, rule in enumerate(rules):
+        where = f"case.rules[{index}]"
+        if not isinstance(rule, dict) or not isinstance(rule.get("when"), list):
+            fail(f"{where} must be an object with a 'when' list and a 'then' fact")
+        when = tuple(fact(value, f"{where}.when[{number}]", premise=True)
+                     for number, value in enumerate(rule["when"]))
+        # A "kind *" premise can be met by any number of facts
+        need = rule.get("need", len(when))
+        most = float("inf") if any(premise.endswith(" *") for premise in when) else len(when)
+        if not isinstance(need, int) or not 0 <= need <= most or (need == 0) != (not when):
+            fail(f"{where}.need must be between 1 and the number of premises")
+        rule_tables.append((when, need, fact(rule.get("then"), f"{where}.then")))
+
+    # Dialogue trees are only checked when they are first talked from
+    dialogues = data.get("dialogue_file", data.get("dialogues"))
+    if dialogues is not None and not isinstance(dialogues, (str, dict)):
+        fail("'dialogue_file' must be a file name, or 'dialogues' an object of dialogue trees")
+    if not dialogues and any("tree" in fields for fields in character_tables.values()):
+        fail("characters have dialogue trees but the world has no 'dialogue_file' or 'dialogues'")
+
+    return (location, rooms, clues, tools, character_tables, character_rooms, tuple(story_values),
+            (suspects, tuple(rule_tables)), routines, dialogues)
+
+
+# Turns the parsed JSON of a world into a World without caching it, for worlds that are
+# made in memory such as generated ones. Raises ValueError like build_tables()
+def world_from_data(data, source="world"):
+    return _freeze(build_tables(data, source), os.getcwd())
+
+
+# Wraps plain tables in read-only containers, a dialogue file is found from directory
+def _freeze(tables, directory):
+    location, rooms, clues, tools, characters, character_rooms, story, (suspects, rules), routines, dialogues = tables
+    if isinstance(dialogues, str):
+        dialogues = os.path.join(directory, dialogues)
+    elif dialogues is not None:
+        dialogues = MappingProxyType(dialogues)
+    return World(location, rooms, MappingProxyType(clues), MappingProxyType(tools),
+                 MappingProxyType({key: MappingProxyType(fields) for key, fields in characters.items()}),
+                 MappingProxyType(character_rooms), Story(*story), Case(suspects, rules),
+                 MappingProxyType(routines), dialogues)
+
+
+# Path of the cache kept for a world file
+def _cache_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, "__pycache__", f"{name}.marshal")
+
+
+# Returns the cached tables if they were built from the same file.
+# Without a digest the file's modification time and size must match, with one the contents must
+def _read_cache(path, stamp, digest=None):
+    try:
+        with open(_cache_path(path), "rb") as cache_file:
+            version, cached_stamp, cached_digest, tables = marshal.load(cache_file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if version != CACHE_VERSION:
+        return None
+    if digest is None:
+        return tables if tuple(cached_stamp) == stamp else None
+    return tables if cached_digest == digest else None
+
+
+# Stores the tables for the next process, a cache that cannot be written is skipped
+def _write_cache(path, stamp, digest, tables):
+    cache_path = _cache_path(path)
+    temporary = f"{cache_path}.{os.getpid()}"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(temporary, "wb") as cache_file:
+            marshal.dump((CACHE_VERSION, stamp, digest, tables), cache_file)
+        os.replace(temporary, cache_path)
+    except OSError:
+        pass
@@ -0,0 +1,94 @@
+from Session import Session
+from Story_Mode import Game
+
+
+def play(lines):
+    text = []
+    game = Game(list(lines), text.append)
+    try:
+        while game.step():
+            pass
+    except EOFError:
+        pass
+    return game, text
+
+
+def test_chain_plays_several_turns():
+    game, _ = play(["1", "Tester", "s", "m 2; e; m 3"])
+    snapshot = game.snapshot()
+    assert snapshot.room == 2
+    assert snapshot.rooms_examined == 1 << 1
+    assert snapshot.turns == 3
+
+
+def test_chain_takes_what_the_turn_prompt_takes():
+    # Moving to the room the player is in, and using a tool that does nothing here
+    game, text = play(["1", "Tester", "s", "m 1; e"])
+    assert game.snapshot().turns == 2
+    game, text = play(["2", "Tester", "s", "e; u 1; f"])
+    assert "Tool cannot be used" in text
+    assert game.snapshot().turns == 3
+
+
+def test_chain_stops_at_a_command_the_prompt_does_not_take():
+    game, text = play(["1", "Tester", "s", "x; m 2"])
+    assert "'x' cannot be done now, the commands after it were skipped." in text
+    assert game.snapshot().room == 0
+
+
+def test_chain_stops_when_a_command_runs_out_of_answers():
+    game, text = play(["1", "Tester", "s", "e; m; m 3", "m 2"])
+    assert "'m' needs more answers, the commands after it were skipped." in text
+    # The half run move is undone, and the next line is read at the turn prompt
+    snapshot = game.snapshot()
+    assert snapshot.room == 1
+    assert snapshot.turns == 2
+
+
+def test_chain_runs_out_of_answers_in_one_session_reply():
+    session = Session()
+    session.start()
+    for line in ["1", "Tester", "s"]:
+        session.feed(line)
+    reply = session.feed("e; m")
+    assert "'m' needs more answers" in reply
+    assert session.pending() == []
+    assert session.snapshot().turns == 1
+
+
+def test_player_is_asked_once_the_chain_reaches_an_ending():
+    game, text = play(["1", "Tester", "s", "m 2; e; m 3; e; m 6; e; e yes 2204; a 1", "no"])
+    assert game.get_outcomes() == ["correct_arrest"]
+    assert not game.step()
+
+
+def test_text_of_an_undone_command_is_not_shown():
+    game, text = play(["2", "Tester", "s", "e; f; e; f; u 2; f; yes 1"])
+    assert "'f' needs more answers, the commands after it were skipped." in text
+    assert not any(line.startswith("You enter the Bar") for line in text)
+    assert game.snapshot().room == 3
+
+
+def test_chain_stops_at_a_command_given_too_many_answers():
+    game, text = play(["1", "Tester", "s", "e; m 3 4; e"])
+    assert text[-1] == "'m 3 4' was given more answers than it needs, the commands after it were skipped."
+    assert not any(line.startswith("You enter the Bar") for line in text)
+    snapshot = game.snapshot()
+    assert snapshot.room == 0
+    assert snapshot.turns == 1
+
+
+def test_text_of_a_chain_is_shown_in_order_before_the_player_is_asked():
+    lines = []
+
+    def read(prompt=""):
+        lines.append(prompt)
+        return answers.pop(0)
+
+    answers = ["1", "Tester", "s", "m 2; e; m 3; e; m 6; e; e yes 2204; a 1", "no"]
+    game = Game(read, lines.append)
+    while game.step():
+        pass
+    closed = lines.index("Great Work!, Case closed!")
+    assert lines[closed + 1] == "Do you want to start a new game? Yes/No :"
+    assert lines.index("You enter the Bar. Description: An old fashioned Bar.") < closed
@@ -0,0 +1,43 @@
+from Story_Mode import Clue, ClueJournal, build_clue_index
+
+CLUES = {
+    1: ("Bloody Knife", "A kitchen knife with blood on the blade"),
+    2: ("Bracelet", "A silver bracelet with a broken clasp"),
+    3: ("Torn Note", "A note torn in half, the blood has dried"),
+}
+
+
+def journal(*keys):
+    return ClueJournal(Clue(*CLUES[key], key=key) for key in keys)
+
+
+def names(clues):
+    return [clue.name for clue in clues]
+
+
+def test_search_needs_every_word():
+    index = build_clue_index(CLUES)
+    clues = journal(3, 1, 2)
+    assert names(clues.search("blood", index)) == ["Torn Note", "Bloody Knife"]
+    assert names(clues.search("blood knife", index)) == ["Bloody Knife"]
+    assert clues.search("blood bracelet", index) == []
+
+
+def test_search_ignores_case_punctuation_and_clues_not_found():
+    index = build_clue_index(CLUES)
+    clues = journal(2)
+    assert names(clues.search("SILVER, bracelet!", index)) == ["Bracelet"]
+    assert clues.search("blood", index) == []
+    assert clues.search("nothing", index) == []
+
+
+def test_empty_search_lists_every_clue_in_order():
+    index = build_clue_index(CLUES)
+    assert names(journal(2, 3).search("  ", index)) == ["Bracelet", "Torn Note"]
+
+
+def test_clue_is_added_once():
+    clues = journal(1)
+    assert not clues.add(Clue(*CLUES[1], key=1))
+    assert clues.add(Clue(*CLUES[2], key=2))
+    assert len(clues) == 2 and Clue(*CLUES[2], key=2) in clues
@@ -0,0 +1,82 @@
+from Deduction import Deduction, RuleSet, any_of_kind
+
+
+def test_any_of_kind():
+    assert any_of_kind("clue 2") == "clue *"
+    assert any_of_kind("talked boyfriend") == "talked *"
+
+
+def test_rule_fires_once_every_premise_is_known():
+    rule_set = RuleSet([(("clue 1", "clue 2"), 2, "motive")])
+    deduction = Deduction(rule_set, ["clue 1"])
+    assert "motive" not in deduction
+    assert deduction.add("clue 2")
+    assert "motive" in deduction
+
+
+def test_known_fact_is_not_counted_twice():
+    rule_set = RuleSet([(("clue 1", "clue 2"), 2, "motive")])
+    deduction = Deduction(rule_set, ["clue 1"])
+    assert not deduction.add("clue 1")
+    assert "motive" not in deduction
+
+
+def test_need_fires_on_some_of_the_premises():
+    rule_set = RuleSet([(("clue 1", "clue 2", "clue 3"), 2, "hunch")])
+    deduction = Deduction(rule_set, ["clue 3"])
+    assert "hunch" not in deduction
+    deduction.add("clue 1")
+    assert "hunch" in deduction
+
+
+def test_any_of_kind_premise_counts_each_fact_of_the_kind():
+    rule_set = RuleSet([(("clue *",), 3, "lead")])
+    deduction = Deduction(rule_set, ["clue 5", "talked boyfriend", "clue 6"])
+    assert "lead" not in deduction
+    deduction.add("clue 6")
+    assert "lead" not in deduction
+    deduction.add("clue 1")
+    assert "lead" in deduction
+
+
+def test_conclusions_chain_and_axioms_hold_from_the_start():
+    rule_set = RuleSet([
+        ((), 0, "suspect boyfriend"),
+        (("clue 2", "suspect boyfriend"), 2, "evidence boyfriend"),
+        (("arrest boyfriend", "evidence boyfriend"), 2, "case closed"),
+    ])
+    deduction = Deduction(rule_set)
+    assert "suspect boyfriend" in deduction
+    deduction.add("arrest boyfriend")
+    assert "case closed" not in deduction
+    deduction.add("clue 2")
+    assert "evidence boyfriend" in deduction
+    assert "case closed" in deduction
+    assert len(deduction) == 5
+
+
+def test_lodge_case_closes_on_the_arrest_of_the_boyfriend():
+    from World_Loader import load_world
+
+    rule_set = RuleSet(load_world().case.rules)
+    deduction = Deduction(rule_set, ["clue 1", "clue 3", "clue 5"])
+    assert "can arrest" not in deduction
+    deduction.add("clue 2")
+    assert "can arrest" in deduction and "evidence boyfriend" in deduction
+    deduction.add("arrest boyfriend")
+    assert "case closed" in deduction
+    assert "case closed" not in Deduction(rule_set, ["clue 1", "clue 2", "clue 3", "clue 5", "arrest bar_man"])
+
+
+def test_arrest_without_evidence_does_not_close_the_case():
+    # Every four clues of the lodge include evidence, so the lodge's closing rule is tried on its own
+    rule_set = RuleSet([
+        (("clue *",), 2, "can arrest"),
+        (("clue 6",), 1, "evidence boyfriend"),
+        (("arrest boyfriend", "evidence boyfriend"), 2, "case closed"),
+    ])
+    deduction = Deduction(rule_set, ["clue 1", "clue 3", "arrest boyfriend"])
+    assert "can arrest" in deduction
+    assert "case closed" not in deduction
+    deduction.add("clue 6")
+    assert "case closed" in deduction
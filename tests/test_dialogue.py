@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from Dialogue import DialogueLibrary, choices_at, line_at
+from World_Loader import DEFAULT_WORLD
+
+LODGE_DIALOGUES = os.path.join(os.path.dirname(DEFAULT_WORLD), "lonely_lodge.dialogues.jsonl")
+
+
+def test_trees_are_read_from_the_lodge_file_when_first_talked_from():
+    library = DialogueLibrary(LODGE_DIALOGUES)
+    assert library.cache_info().currsize == 0
+
+    tree = library.tree("receptionist")
+    assert tree.key == "receptionist"
+    assert line_at(tree.nodes[tree.start], set()).startswith("She didn't notice anything")
+    assert library.tree("receptionist") is tree
+    assert (library.cache_info().hits, library.cache_info().misses) == (1, 1)
+
+    with pytest.raises(ValueError, match="no dialogue tree 'valerie'"):
+        library.tree("valerie")
+
+
+def test_only_the_line_of_the_tree_talked_from_is_parsed(tmp_path):
+    with open(LODGE_DIALOGUES, encoding="utf-8") as dialogue_file:
+        lines = dialogue_file.readlines()
+    # A broken tree only fails once somebody talks from it
+    lines[0] = '{"id": "boyfriend", "nodes": not json\n'
+    path = tmp_path / "dialogues.jsonl"
+    path.write_text("".join(lines), encoding="utf-8")
+
+    library = DialogueLibrary(str(path))
+    tree = library.tree("bar_man")
+    assert line_at(tree.nodes["start"], set()) == "He saw Valerie(Girlfriend) kissing another guy"
+    with pytest.raises(ValueError):
+        library.tree("boyfriend")
+
+
+def test_boyfriend_only_talks_about_the_bracelet_once_it_is_found():
+    node = DialogueLibrary(LODGE_DIALOGUES).tree("boyfriend").nodes["start"]
+    assert line_at(node, set()) == "I can't believe she's missing."
+    assert line_at(node, {"clue 1"}) == "I can't believe she's missing."
+    assert line_at(node, {"clue 2"}).startswith("I gave the bracelet to Valerie")
+
+
+def test_unless_lines_and_choices_are_only_used_before_the_fact_is_known():
+    library = DialogueLibrary({"bar_man": {"start": "hello", "nodes": {
+        "hello": {"lines": [{"text": "Seen the bracelet?", "unless": "clue 2"},
+                            {"text": "So you found it.", "if": "clue 2"},
+                            {"text": "Evening."}],
+                  "choices": [{"text": "What bracelet?", "goto": "bracelet", "unless": "clue 2"},
+                              {"text": "Who dropped it?", "goto": "bracelet", "if": "clue 2"},
+                              {"text": "Bye", "goto": "bye"}]},
+        "bracelet": {"lines": [{"text": "Ask her ex."}]},
+        "bye": {"lines": [{"text": "Bye."}]}}}})
+    node = library.tree("bar_man").nodes["hello"]
+
+    assert line_at(node, set()) == "Seen the bracelet?"
+    assert [choice.text for choice in choices_at(node, set())] == ["What bracelet?", "Bye"]
+    assert line_at(node, {"clue 2"}) == "So you found it."
+    assert [choice.text for choice in choices_at(node, {"clue 2"})] == ["Who dropped it?", "Bye"]
+
+
+def test_last_line_of_a_node_must_always_hold():
+    library = DialogueLibrary({"bar_man": {"nodes": {"start": {"lines": [{"text": "Hi", "unless": "clue 2"}]}}}})
+    with pytest.raises(ValueError, match="the last line of nodes\\[start\\] must not have a condition"):
+        library.tree("bar_man")
@@ -0,0 +1,20 @@
+import io
+
+from Instrumentation import Instrumentation
+from Story_Mode import Game, Renderer
+
+
+def test_renderer_flushes_are_timed_as_output():
+    answers = iter(["1", "Tester", "s", "m", "3"])
+    stream = io.StringIO()
+    renderer = Renderer(stream, lambda: next(answers))
+    instrumentation = Instrumentation()
+    game = Game(renderer.input, renderer, instrumentation=instrumentation)
+    for _ in range(5):
+        game.step()
+
+    assert "You enter the Bar." in stream.getvalue()
+    # The only output outside the handlers is the flush after each step
+    outside = instrumentation.metrics()["actions"]["<outside>"]
+    assert outside["output_calls"] == 5
+    assert outside["handler_ms"] == 0.0
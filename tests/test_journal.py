@@ -0,0 +1,47 @@
+from Journal import Journal, Replay, read_journal
+from Story_Mode import STEPS, Game
+
+UPDATE = STEPS.index("update")
+
+SCRIPT = ["2", "Tester", "s", "e", "f", "e", "f", "e", "u", "2", "f", "no", "u", "3", "f", "e", "u", "4", "no"]
+
+
+def record(path, checkpoint_every):
+    starts = []  # Snapshot at the start of each turn
+    with Journal(path, checkpoint_every) as journal:
+        game = Game(list(SCRIPT), None, journal=journal)
+        while True:
+            snapshot = game.snapshot()
+            if snapshot.step == UPDATE:
+                starts.append(snapshot)
+            if not game.step():
+                break
+    return starts
+
+
+def test_seek_puts_the_game_at_the_start_of_each_turn(tmp_path):
+    path = tmp_path / "game.journal"
+    starts = record(path, checkpoint_every=3)
+    contents = read_journal(path)
+    assert len(contents.turns) == len(starts)
+    assert contents.checkpoints
+
+    replay = Replay(path)
+    # Backwards and forwards, so seeks go both from checkpoints and from where the game is
+    for turn in [len(starts), 1, 4, 3, 5, 2]:
+        assert replay.seek(turn)
+        assert replay.game().snapshot() == starts[turn - 1]
+
+
+def test_seek_past_the_end(tmp_path):
+    path = tmp_path / "game.journal"
+    starts = record(path, checkpoint_every=20)
+    assert not Replay(path).seek(len(starts) + 1)
+
+
+def test_play_to_end_finishes_the_game(tmp_path):
+    path = tmp_path / "game.journal"
+    record(path, checkpoint_every=2)
+    replay = Replay(path)
+    replay.play_to_end()
+    assert "escaped" in replay.game().get_outcomes()
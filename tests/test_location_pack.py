@@ -0,0 +1,91 @@
+import json
+import os
+
+import pytest
+
+from Location_Pack import LocationPack, build_pack
+from Story_Mode import Game, shared_content
+from World_Loader import DEFAULT_WORLD, load_world
+
+
+# Writes copies of the lodge under other location names, returns the paths of the lodge and the copies
+def lodge_worlds(directory, names):
+    with open(DEFAULT_WORLD, encoding="utf-8") as world_file:
+        data = json.load(world_file)
+    data["dialogue_file"] = os.path.join(os.path.dirname(DEFAULT_WORLD), data["dialogue_file"])
+    paths = [DEFAULT_WORLD]
+    for name in names:
+        data["location"] = name
+        path = directory / f"{name}.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def transcript(world):
+    text = []
+    game = Game(["1", "Tester", "s", "m 2; e; i 1; 1", "m 3; e", "r"], text.append, world=world)
+    try:
+        while game.step():
+            pass
+    except EOFError:
+        pass
+    return text, game.snapshot()
+
+
+def test_pack_decodes_the_lodge_as_it_was_built(tmp_path):
+    path = str(tmp_path / "lodges.pack")
+    assert build_pack(path, lodge_worlds(tmp_path, ["Second Lodge"])) == ["Lonely Lodge", "Second Lodge"]
+
+    with LocationPack(path) as pack:
+        assert pack.locations() == ["Lonely Lodge", "Second Lodge"]
+        assert len(pack) == 2
+        assert "Second Lodge" in pack and "Nowhere" not in pack
+        world = pack.world("Lonely Lodge")
+
+    # The dialogue trees are carried in the pack instead of being read from their file
+    loaded = load_world()
+    assert world._replace(dialogues=None) == loaded._replace(dialogues=None)
+    assert sorted(world.dialogues) == sorted(loaded.characters)
+    assert transcript(world) == transcript(loaded)
+
+
+def test_least_recently_used_location_is_dropped(tmp_path):
+    path = str(tmp_path / "lodges.pack")
+    build_pack(path, lodge_worlds(tmp_path, ["Second Lodge", "Third Lodge"]))
+
+    with LocationPack(path, cache_size=2) as pack:
+        first = pack.world("Lonely Lodge")
+        second = pack.world("Second Lodge")
+        second_content = shared_content(second)
+        assert pack.world("Lonely Lodge") is first
+        assert pack.cache_info() == {"locations": 3, "decoded": 2, "decodes": 2, "cache_size": 2}
+
+        # The Second Lodge was used least recently, so it is dropped with its content
+        pack.world("Third Lodge")
+        assert pack.cache_info()["decoded"] == 2
+        assert pack.world("Lonely Lodge") is first
+        assert pack.cache_info()["decodes"] == 3
+        assert shared_content(second) is not second_content
+
+        # A game still playing the dropped location goes on with it
+        assert transcript(second)[1] == transcript(first)[1]
+
+        again = pack.world("Second Lodge")
+        assert again is not second
+        assert pack.cache_info()["decodes"] == 4
+
+        with pytest.raises(KeyError):
+            pack.world("Nowhere")
+
+
+def test_location_can_only_be_packed_once(tmp_path):
+    with pytest.raises(ValueError, match="already in the pack"):
+        build_pack(str(tmp_path / "lodges.pack"), [DEFAULT_WORLD, DEFAULT_WORLD])
+
+
+def test_file_that_is_not_a_pack_is_turned_down(tmp_path):
+    path = tmp_path / "lodge.pack"
+    path.write_bytes(b"not a pack at all")
+    with pytest.raises(ValueError, match="not a location pack"):
+        LocationPack(str(path))
@@ -0,0 +1,15 @@
+from Monte_Carlo import chunk_seed, run
+
+
+def test_runs_with_nearby_seeds_share_no_chunk_seeds():
+    seeds = {(seed, number): chunk_seed(seed, number) for seed in range(10) for number in range(10)}
+    assert len(set(seeds.values())) == len(seeds)
+    assert chunk_seed(3, 4) == chunk_seed(3, 4)
+
+
+def test_same_seed_plays_the_same_games():
+    first = run(games=40, workers=1, seed=7)
+    second = run(games=40, workers=1, seed=7)
+    for report in (first, second):
+        del report["seconds"], report["games_per_second"]
+    assert first == second
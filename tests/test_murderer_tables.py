@@ -0,0 +1,77 @@
+from Story_Mode import (CONDITION_COMBINATIONS, HAS_KNIFE, VALERIE_DEAD, VALERIE_DOWN, WOODS_LIT,
+                        build_forward_table, build_murderer_actions, tool_effects)
+from World_Loader import load_world
+
+# The lodge as the Murderer's moves were first written for it: rooms and tool keys by number
+COUPLES_ROOM, WOODS, BAR, PORTA_POTTY, SLIPPERY_SLOPE = 5, 3, 2, 1, 0
+KNIFE, FLASHLIGHT, BERRY, CAR_KEYS = 5, 4, 3, 0
+ROOMS = 6
+
+
+# What moving forward did before the table, as (message, None) or (None, rooms to move by)
+def old_move_forward(room, conditions):
+    if room == COUPLES_ROOM and not conditions & HAS_KNIFE:
+        return "You need to find a weapon before continuing", None
+    if room == WOODS and not conditions & WOODS_LIT:
+        return "The woods are too dark to navigate,you need to use a flashlight", None
+    if room == SLIPPERY_SLOPE:
+        return "You cannot move forward a room", None
+    if room == BAR and not conditions & VALERIE_DOWN:
+        return "You decide to wait for Valerie, maybe you can use one of your tools while she is gone", None
+    if room == BAR:
+        return None, -2
+    return None, -1
+
+
+# What using each tool did before the table, tool key to its effect
+def old_tool_effects(room, conditions):
+    effects = {}
+    if room == PORTA_POTTY and not conditions & VALERIE_DEAD:
+        effects[KNIFE] = "stab"
+    if room == WOODS:
+        effects[FLASHLIGHT] = "light"
+    if room == BAR:
+        effects[BERRY] = "spike"
+    if room == SLIPPERY_SLOPE and conditions & VALERIE_DOWN:
+        effects[CAR_KEYS] = "drive"
+    return effects
+
+
+def test_lodge_story_is_the_one_the_old_moves_were_written_for():
+    story = load_world().story
+    assert (story.murderer_start, story.woods, story.bar, story.porta_potty, story.escape) == \
+        (COUPLES_ROOM, WOODS, BAR, PORTA_POTTY, SLIPPERY_SLOPE)
+    assert (story.knife, story.flashlight, story.berry, story.car_keys) == (KNIFE, FLASHLIGHT, BERRY, CAR_KEYS)
+
+
+def test_forward_table_matches_the_old_moves_for_every_condition():
+    table = build_forward_table(ROOMS, load_world().story)
+    for room in range(ROOMS):
+        for conditions in range(CONDITION_COMBINATIONS):
+            assert table[room][conditions] == old_move_forward(room, conditions), (room, conditions)
+
+
+def test_tool_effects_match_the_old_tools_for_every_condition():
+    story = load_world().story
+    effects = tool_effects(story)
+    for room in range(ROOMS):
+        for conditions in range(CONDITION_COMBINATIONS):
+            found = {}
+            for tool_key in (KNIFE, FLASHLIGHT, BERRY, CAR_KEYS):
+                effect, needed = effects.get((room, tool_key), (None, 0))
+                # Stabbing twice is turned down by use_tool itself, as it always was
+                if effect is not None and conditions & needed == needed \
+                        and not (effect == "stab" and conditions & VALERIE_DEAD):
+                    found[tool_key] = effect
+            assert found == old_tool_effects(room, conditions), (room, conditions)
+
+
+def test_murderer_actions_match_the_old_moves_and_tools_for_every_condition():
+    story = load_world().story
+    actions = build_murderer_actions(ROOMS, story, build_forward_table(ROOMS, story))
+    for room in range(ROOMS):
+        for conditions in range(CONDITION_COMBINATIONS):
+            can_move_forward, can_move_back, usable = actions[room][conditions]
+            assert can_move_forward == (old_move_forward(room, conditions)[1] is not None), (room, conditions)
+            assert can_move_back == (room != COUPLES_ROOM)
+            assert sorted(usable) == sorted(old_tool_effects(room, conditions)), (room, conditions)
@@ -0,0 +1,87 @@
+import pytest
+
+from Outcome_Stats import LogHistogram, OutcomeStats
+from Story_Mode import OutcomeEvent
+
+
+def test_games_that_could_not_be_caught_are_counted_apart():
+    stats = OutcomeStats()
+    stats.add(OutcomeEvent("murderer", "escaped", 11, 0, 2, -1))
+    stats.add(OutcomeEvent("murderer", "caught", 9, 0, 0, 0))
+    summary = stats.summary()["roles"]["murderer"]
+    assert summary["uncatchable"] == 1
+    assert stats.histogram("murderer", "caught").count == 1
+    assert summary["caught"]["max"] == 0
+    assert "  1 games ended after catching the Murderer became impossible" in stats.summary_lines()
+
+
+def test_small_values_have_buckets_of_their_own():
+    histogram = LogHistogram()
+    for value in range(64):
+        histogram.add(value)
+    assert histogram.buckets() == [(value, value, 1) for value in range(64)]
+
+
+def test_every_value_lies_within_its_bucket():
+    histogram = LogHistogram()
+    for value in list(range(2000)) + [2 ** 40 + 12345]:
+        low, high = histogram._bounds(histogram._bucket(value))
+        assert low <= value <= high
+        # A bucket is never wider than 1/32 of the values in it
+        assert high - low < max(low, 1) / 32
+
+
+def test_quantiles_are_within_a_bucket_of_the_exact_value():
+    histogram = LogHistogram()
+    values = [value * 7 for value in range(1, 1001)]
+    for value in values:
+        histogram.add(value)
+    assert histogram.count == 1000
+    assert histogram.mean() == sum(values) / 1000
+    assert (histogram.minimum, histogram.maximum) == (7, 7000)
+    for q in (0.5, 0.9, 0.99):
+        exact = values[round(q * 1000) - 1]
+        assert abs(histogram.quantile(q) - exact) <= exact / 32
+    assert 7000 - 7000 / 32 <= histogram.quantile(1) <= 7000
+    assert LogHistogram().quantile(0.5) is None
+
+
+def test_negative_values_are_turned_down():
+    with pytest.raises(ValueError):
+        LogHistogram().add(-1)
+
+
+def test_merged_histograms_count_as_one():
+    whole, first, second = LogHistogram(), LogHistogram(), LogHistogram()
+    for value in range(0, 5000, 3):
+        whole.add(value)
+        (first if value % 2 else second).add(value)
+    first.merge(second)
+    assert first.buckets() == whole.buckets()
+    assert (first.count, first.total, first.minimum, first.maximum) == \
+        (whole.count, whole.total, whole.minimum, whole.maximum)
+
+    with pytest.raises(ValueError):
+        first.merge(LogHistogram(precision_bits=3))
+
+
+def test_merged_stats_match_stats_of_all_the_games():
+    events = [OutcomeEvent("detective", "correct_arrest", 20, 5, 0, 3),
+              OutcomeEvent("detective", "wrong_arrest", 12, 2, 0, 3),
+              OutcomeEvent("murderer", "escaped", 11, 0, 3, 3),
+              OutcomeEvent("murderer", "escaped", 11, 0, 2, -1)]
+    whole, first, second = OutcomeStats(), OutcomeStats(), OutcomeStats()
+    for number, event in enumerate(events):
+        whole.add(event)
+        (first if number % 2 else second).add(event)
+    first.merge(second)
+    assert first.summary() == whole.summary()
+
+    summary = whole.summary()
+    assert summary["games"] == 4
+    detective = summary["roles"]["detective"]
+    assert detective["endings"] == {"correct_arrest": 1, "wrong_arrest": 1}
+    assert detective["win_rate"] == 0.5
+    assert detective["turns"]["mean"] == 16
+    assert detective["turns"]["max"] == 20
+    assert summary["roles"]["murderer"]["win_rate"] == 1
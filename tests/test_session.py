@@ -0,0 +1,65 @@
+from Session import Session
+from Story_Mode import Game
+
+
+def test_line_at_a_time_matches_the_whole_game():
+    lines = ["1", "Bot", "s", "m", "3", "e", "m", "2", "e"]
+    session = Session()
+    session.start()
+    for line in lines:
+        session.feed(line)
+
+    game = Game(list(lines), None)
+    try:
+        while game.step():
+            pass
+    except EOFError:
+        pass
+    assert session.snapshot() == game.snapshot()
+
+
+def test_step_waiting_for_an_answer_is_rolled_back():
+    session = Session()
+    session.start()
+    for line in ["1", "Bot", "s"]:
+        session.feed(line)
+    before = session.snapshot()
+
+    # "m" asks for a room number that has not arrived yet
+    reply = session.feed("m")
+    assert reply.endswith("Enter the number of the room you want to move to: ")
+    assert session.pending() == []
+    assert session.snapshot().room == before.room
+
+    # The step runs again with the number, only the new text is sent
+    reply = session.feed("3")
+    assert reply.startswith("You enter the Bar.")
+    assert session.snapshot().room == 2
+
+
+def test_bad_room_number_is_asked_again():
+    session = Session()
+    session.start()
+    for line in ["1", "Bot", "s", "m"]:
+        session.feed(line)
+
+    reply = session.feed("yes")
+    assert reply == "Invalid room choice.\nEnter the number of the room you want to move to: "
+    reply = session.feed("9")
+    assert reply == "Invalid room choice.\nEnter the number of the room you want to move to: "
+    reply = session.feed("3")
+    assert reply.startswith("You enter the Bar.")
+    assert session.snapshot().room == 2
+    assert session.snapshot().turns == 1
+
+
+def test_answers_are_checked_where_the_game_reads_them():
+    session = Session()
+    session.start()
+    for line in ["2", "Bot", "s", "e", "u"]:
+        session.feed(line)
+
+    # Digits int() cannot read are turned down by the prompt, not by the session
+    assert session.feed("²").startswith("Tool cannot be used")
+    assert session.pending() == []
+    assert session.snapshot().turns == 2
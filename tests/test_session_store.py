@@ -0,0 +1,84 @@
+import sqlite3
+
+from Session import Session
+from Session_Store import SessionStore, resume_session
+from Story_Mode import GameSnapshot
+
+
+def played(lines):
+    session = Session("game-1")
+    session.start()
+    for line in lines:
+        session.feed(line)
+    return session
+
+
+def test_saved_state_is_read_back_after_reopening(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    session = played(["1", "Bot", "s", "m", "3", "e", "m"])
+
+    # Both saves go in the first commit, the writer is only woken by the flush
+    with SessionStore(path, flush_interval=60) as store:
+        store.save("game-1", session.snapshot().to_bytes(), session.pending())
+        store.save("game-2", session.snapshot().to_bytes(), ["i", "1"])
+        store.flush()
+        assert store.stats() == {"commits": 1, "rows": 2, "queued": 0}
+
+    # A fresh store, as after a restart
+    with SessionStore(path) as store:
+        assert store.load("game-1") == (session.snapshot().to_bytes(), [])
+        snapshot, pending = store.load_snapshot("game-2")
+        assert snapshot == session.snapshot()
+        assert pending == ["i", "1"]
+        assert store.load("game-3") is None
+
+        resumed, text = resume_session(store, "game-1")
+        assert text.endswith("Enter the number of the room you want to move to: ")
+        assert resumed.feed("2").startswith("You enter the")
+        assert resumed.snapshot().room == 1
+
+
+def test_queued_state_is_read_before_it_is_written(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = played(["1", "Bot", "s"]).snapshot().to_bytes()
+    latest = played(["1", "Bot", "s", "m", "3"]).snapshot().to_bytes()
+
+    # The writer waits long enough for both saves to be read from the queue
+    with SessionStore(path, flush_interval=60) as store:
+        store.save("game-1", first)
+        store.save("game-1", latest, ["e"])
+        assert store.load("game-1") == (latest, ["e"])
+        assert store.stats()["queued"] == 1
+        store.flush()
+        # Only the latest state of the session is written
+        assert store.stats()["rows"] == 1
+
+    with SessionStore(path) as store:
+        assert store.load("game-1") == (latest, ["e"])
+
+
+def test_deleted_session_is_forgotten(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    with SessionStore(path) as store:
+        store.save("game-1", played(["1", "Bot", "s"]).snapshot().to_bytes())
+        store.flush()
+        store.delete("game-1")
+        assert store.load("game-1") is None
+        store.flush()
+
+    with SessionStore(path) as store:
+        assert store.load("game-1") is None
+        assert resume_session(store, "game-1") is None
+
+
+def test_states_of_another_snapshot_layout_are_dropped(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    with SessionStore(path) as store:
+        store.save("game-1", played(["1", "Bot", "s"]).snapshot().to_bytes())
+
+    connection = sqlite3.connect(path)
+    connection.execute(f"PRAGMA user_version = {GameSnapshot.VERSION - 1}")
+    connection.close()
+
+    with SessionStore(path) as store:
+        assert store.load("game-1") is None
@@ -0,0 +1,140 @@
+from Story_Mode import Game, GameSnapshot, shared_content, unpack_keys
+
+
+# Plays answers up to the next turn prompt
+def play_turn(game):
+    while True:
+        game.step()
+        if game.get_next_step() == "update":
+            return
+
+
+def murderer(history=0):
+    game = Game(["2", "Tester", "s", "e", "f", "e"], None, history=history)
+    play_turn(game)
+    return game
+
+
+def test_snapshot_round_trip():
+    game = murderer()
+    play_turn(game)
+    snapshot = game.snapshot()
+    assert GameSnapshot.from_bytes(snapshot.to_bytes()) == snapshot
+
+
+def test_snapshot_round_trip_keeps_unicode_name_and_big_numbers():
+    snapshot = GameSnapshot(3, 1, 65000, -1, 5, 1 << 70, 3, 1 << 20, (1 << 40) - 1, 0, 2, 123456, "Zoë")
+    assert GameSnapshot.from_bytes(snapshot.to_bytes()) == snapshot
+
+
+def test_snapshot_round_trip_keeps_many_endings():
+    snapshot = GameSnapshot(3, 2, 4, 0, 3, 0, 0, 0, 0, 0, 70000, 1 << 31, "Tester")
+    assert GameSnapshot.from_bytes(snapshot.to_bytes()) == snapshot
+
+
+def test_restore_plays_on_the_same():
+    game = murderer()
+    play_turn(game)
+    snapshot = game.snapshot()
+    play_turn(game)
+    game.restore(snapshot)
+    assert game.snapshot() == snapshot
+
+
+def test_rewind_goes_back_one_turn():
+    game = murderer(history=5)
+    play_turn(game)  # e
+    after_first = game.state_key()
+    play_turn(game)  # f
+    assert game.state_key() != after_first
+
+    assert game.rewind(1)
+    assert game.state_key() == after_first
+
+
+def test_rewind_further_than_remembered():
+    game = murderer(history=5)
+    start = game.state_key()
+    play_turn(game)
+    assert not game.rewind(2)
+    assert game.rewind(1)
+    assert game.state_key() == start
+
+
+def test_rewind_without_history():
+    game = murderer()
+    play_turn(game)
+    assert not game.rewind(1)
+
+
+def test_state_key_holds_the_turn_of_the_routines():
+    from World_Generator import generate
+
+    world = generate(30, characters=12)
+    assert world.routines
+    game = Game(["1", "Tester", "s", "e"], None, world=world)
+    play_turn(game)
+    cycle = shared_content(world).timetable.cycle
+    snapshot = game.snapshot()
+
+    # Characters are elsewhere one turn later, and back where they were a whole cycle later
+    assert game.state_key(snapshot._replace(turns=snapshot.turns + 1)) != game.state_key(snapshot)
+    assert game.state_key(snapshot._replace(turns=snapshot.turns + cycle)) == game.state_key(snapshot)
+
+
+def test_state_key_leaves_turns_out_without_routines():
+    game = murderer()
+    snapshot = game.snapshot()
+    assert game.state_key(snapshot._replace(turns=snapshot.turns + 1)) == game.state_key(snapshot)
+
+
+def test_restore_keeps_talks_whose_line_has_changed_since():
+    import json
+
+    from World_Loader import DEFAULT_WORLD, world_from_data
+
+    with open(DEFAULT_WORLD, encoding="utf-8") as world_file:
+        data = json.load(world_file)
+    data["dialogue_file"] = DEFAULT_WORLD.replace(".json", ".dialogues.jsonl")
+    data["case"]["rules"] = [
+        {"when": ["clue *"], "then": "can arrest"},
+        {"when": ["talked boyfriend"], "then": "evidence boyfriend"},
+        {"when": ["arrest boyfriend", "evidence boyfriend"], "then": "case closed"},
+    ]
+    world = world_from_data(data)
+
+    # John is talked to, then finding the bracelet gives him something new to say
+    game = Game(["1", "Tester", "s", "i 1", "m 3; e"], None, world=world)
+    for _ in range(3):
+        play_turn(game)
+    snapshot = game.snapshot()
+    assert snapshot.clues
+    assert snapshot.interacted == 0
+    assert snapshot.talked
+
+    restored = Game(["a", "1", "no"], None, world=world)
+    restored.restore(snapshot)
+    assert restored.snapshot() == snapshot
+    while restored.step():
+        pass
+    assert restored.get_outcomes() == ["correct_arrest"]
+
+
+def test_state_key_keeps_only_talks_the_case_waits_on():
+    game = Game(["1", "Tester", "s"], None)
+    play_turn(game)
+    snapshot = game.snapshot()
+    # The lodge's rules wait on talking to Samantha (bit 1), not to John (bit 0)
+    assert game.state_key(snapshot._replace(talked=0b01)) == game.state_key(snapshot)
+    assert game.state_key(snapshot._replace(talked=0b10)) != game.state_key(snapshot)
+
+
+def test_state_key_fields_are_named():
+    game = Game(["2", "Tester", "s", "e"], None)
+    for _ in range(4):
+        game.step()
+    key = game.state_key()
+    assert key.room == game.snapshot().room
+    assert key.turn == 0
+    assert unpack_keys(key.tools) == unpack_keys(game.snapshot().tools)
+    assert key.clues_found == 0
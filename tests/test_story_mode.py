@@ -0,0 +1,129 @@
+import json
+
+from Story_Mode import Game, Renderer
+from World_Loader import DEFAULT_WORLD, world_from_data
+
+
+def play(lines, world=None):
+    text = []
+    game = Game(list(lines), text.append, world=world)
+    try:
+        while game.step():
+            pass
+    except EOFError:
+        pass
+    return game, text
+
+
+def test_move_asks_again_until_the_room_is_a_number():
+    text = []
+    game = Game(["1", "Tester", "s", "m", "no", "0", "²", " 2 "], text.append)
+    for _ in range(5):
+        game.step()
+    assert text.count("Invalid room choice.") == 3
+    assert game.snapshot().room == 1
+
+
+def test_interact_turns_down_digits_that_are_not_numbers():
+    game, text = play(["1", "Tester", "s", "i", "²"])
+    assert "invalid option" in text
+    assert game.get_next_step() == "update"
+
+
+def test_conversation_turns_down_digits_that_are_not_numbers():
+    with open(DEFAULT_WORLD, encoding="utf-8") as world_file:
+        data = json.load(world_file)
+    del data["dialogue_file"]
+    data["dialogues"] = {key: {"nodes": {"start": {"lines": [{"text": "Hello."}],
+                                                   "choices": [{"text": "Bye", "goto": "end"}]},
+                                         "end": {"lines": [{"text": "Bye."}]}}}
+                         for key in ("boyfriend", "ex_bestfriend", "bar_man", "receptionist")}
+    game, text = play(["1", "Tester", "s", "i", "1", "²"], world_from_data(data))
+    assert "1.Bye" in text
+    assert "invalid option" in text
+    assert game.get_next_step() == "update"
+
+
+def test_use_tool_turns_down_digits_that_are_not_numbers():
+    game, text = play(["2", "Tester", "s", "e", "u", "²"])
+    assert "Tool cannot be used" in text
+    assert game.get_next_step() == "update"
+
+
+def test_arrest_turns_down_digits_that_are_not_numbers():
+    game, text = play(["1", "Tester", "s", "m 2; e; m 3; e; m 6; e; e yes 2204", "a", "²"])
+    assert "1.John(Boyfriend)" in text
+    assert "invalid option" in text
+    assert game.get_outcomes() == []
+
+
+def play_with_events(lines):
+    events = []
+    game = Game(list(lines), [].append, events=events.append)
+    try:
+        while game.step():
+            pass
+    except EOFError:
+        pass
+    return events
+
+
+def test_outcome_event_counts_the_tools_used_not_found():
+    events = play_with_events(["2", "Tester", "s", "e", "f", "e", "f", "e", "u", "2", "f", "no",
+                               "u", "3", "f", "e", "u", "4", "no"])
+    assert events[0].ending == "escaped"
+    # The flashlight, the berry and the car keys, the knife was found but never used
+    assert events[0].tools == 3
+    assert events[0].caught == 3
+
+
+def test_outcome_event_tells_when_catching_was_impossible():
+    events = play_with_events(["2", "Tester", "s", "e", "f", "e", "f", "e", "u", "2", "f", "no",
+                               "u", "3", "b", "b", "b", "no"])
+    assert events[0].ending == "escaped"
+    assert events[0].tools == 2
+    assert events[0].caught == -1
+
+
+# A stream that remembers each write and how much had been written when it was flushed
+class Stream:
+    def __init__(self):
+        self.writes = []
+        self.flushed = 0
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def flush(self):
+        self.flushed = len(self.writes)
+
+
+def test_renderer_writes_the_text_before_each_question_in_one_go():
+    stream = Stream()
+    answers = iter(["1", "Tester", "s", "m", "3", "e"])
+    asked = []
+
+    def read():
+        # Everything the game wrote so far has reached the stream, the prompt last
+        asked.append((len(stream.writes), stream.flushed, stream.writes[-1]))
+        return next(answers)
+
+    renderer = Renderer(stream, read)
+    game = Game(renderer.input, renderer)
+    for _ in range(6):
+        game.step()
+
+    assert len(asked) == 6
+    for written, flushed, last in asked:
+        assert written == flushed
+        assert last.rstrip().endswith(":")
+    # The lines of a step are written together, at most once as it ends and once with each prompt
+    assert len(stream.writes) <= 12
+    assert stream.writes[0].startswith("Welcome to 'Name of Game'\n")
+    assert stream.writes[0].endswith("Press '1' to choose Detective or '2' for Murderer:")
+    moving = next(text for text in stream.writes if text.startswith("You decide to move"))
+    assert "\nAvailable rooms:\n1. Slippery Slope\n" in moving
+    assert moving.endswith("Enter the number of the room you want to move to: ")
+    # The game's text comes out in the order it was written
+    text = "".join(stream.writes)
+    assert text.index("Welcome Detective Tester") < text.index("You decide to move") < text.index("You enter the Bar.")
@@ -0,0 +1,30 @@
+import os
+
+from Story_Mode import STEPS, GameSnapshot
+from Supervisor import CRASHED, LOST, Supervisor
+
+# A state no worker can restore, its step does not exist
+BROKEN = GameSnapshot(len(STEPS), 1, 0, 3, 3, 0, 0, 0, 0, 0, 0, 0, "Broken")
+
+
+def test_killed_worker_asks_the_question_again():
+    with Supervisor(1) as supervisor:
+        supervisor.open("a")
+        supervisor.feed("a", "1")
+        os.kill(supervisor.worker_pids()[0], 9)
+        text, finished = supervisor.feed("a", "Bot")
+        assert text.startswith(CRASHED) and text.endswith("Enter your Detective's name: ")
+        assert not finished
+        assert supervisor.stats()["restarts"] == 1
+
+
+def test_state_that_keeps_crashing_is_lost():
+    with Supervisor(1) as supervisor:
+        supervisor.open("a")
+        supervisor.feed("a", "1")
+        assert supervisor.open("broken", BROKEN) == (LOST, True)
+
+        # The other session on the worker carries on
+        text, finished = supervisor.feed("a", "Bot")
+        assert "Main Menu" in text and not finished
+        assert supervisor.stats()["sessions"] == 1
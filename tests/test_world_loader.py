@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+from World_Loader import DEFAULT_WORLD, MAX_KEYS, build_tables
+
+
+def lodge():
+    with open(DEFAULT_WORLD, encoding="utf-8") as world_file:
+        return json.load(world_file)
+
+
+def test_lodge_builds():
+    build_tables(lodge(), "lodge")
+
+
+def test_clue_key_must_fit_in_a_snapshot():
+    data = lodge()
+    data["clues"][str(MAX_KEYS - 1)] = {"name": "Last", "description": "The last key there is room for"}
+    build_tables(data, "lodge")
+
+    data["clues"][str(MAX_KEYS)] = {"name": "Too far", "description": "Would wrap around when packed"}
+    with pytest.raises(ValueError, match="too big"):
+        build_tables(data, "lodge")